@@ -73,6 +73,21 @@ if not os.path.exists(app.config["FTP_DIRECTORY"]):
 else:
     logging.getLogger().info("set FTP directory to %s" % app.config["FTP_DIRECTORY"])
 
+# configure the compiled template cache of the config generator
+from app.utils.confgen import compiled_template_cache
+compiled_template_cache.configure(
+    max_size=app.config["MAKO_TEMPLATE_CACHE_SIZE"],
+    module_directory=app.config["MAKO_MODULE_DIRECTORY"]
+)
+
+# configure the SQLite engine profile and the serialization of bulk write transactions
+from app.utils.database import configure_sqlite_engine, get_sqlite_database_file, serialized_write
+configure_sqlite_engine(app.config["SQLITE_PRAGMAS"])
+database_file = get_sqlite_database_file(app.config["SQLALCHEMY_DATABASE_URI"])
+serialized_write.configure(
+    app.config["SQLITE_WRITE_LOCK_FILE"] or (database_file + ".lock" if database_file else None)
+)
+
 # required for gunicorn
 app.wsgi_app = ProxyFix(app.wsgi_app)
 
@@ -1,27 +1,160 @@
-from app import app
-from app.models import Project
+import os
+import threading
+import uuid
+from sqlalchemy import event
+from sqlalchemy.orm import object_session
+from app import app, db
+from app.models import Project, ConfigTemplate
+
+
+class ProjectTreeCache(object):
+    """
+    in-process cache for the Project and Config Template tree of the sidebar
+
+    The cache is shared between all workers using a generation file. Every change of a Project or a Config Template
+    replaces the file after the commit, therefore the inode and modification time of the file identify the current
+    generation of the tree. A worker rebuilds its cached tree if the generation has changed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tree = None
+        self._generation = None
+
+    @staticmethod
+    def get_generation_file():
+        return app.config["PROJECT_TREE_GENERATION_FILE"]
+
+    def get_generation(self):
+        """get the current generation of the tree
+
+        :return: tuple that identifies the generation file, None if the file doesn't exist
+        """
+        try:
+            stat = os.stat(self.get_generation_file())
+            return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+        except FileNotFoundError:
+            return None
+
+    def invalidate(self):
+        """drop the cached tree within all workers
+
+        :return:
+        """
+        with self._lock:
+            self._tree = None
+
+        generation_file = self.get_generation_file()
+        os.makedirs(os.path.dirname(generation_file), exist_ok=True)
+
+        # replace the file, therefore every invalidation creates a new inode
+        tmp_file = "%s.%d.tmp" % (generation_file, os.getpid())
+        with open(tmp_file, "w") as f:
+            f.write(uuid.uuid4().hex)
+        os.replace(tmp_file, generation_file)
+
+    @staticmethod
+    def build_tree():
+        """build the Project and Config Template tree using a single query
+
+        :return: list of dictionaries with the id, name and config_templates of every Project
+        """
+        query = db.session.query(
+            Project.id,
+            Project.name,
+            ConfigTemplate.id,
+            ConfigTemplate.name
+        ).outerjoin(
+            ConfigTemplate, ConfigTemplate.project_id == Project.id
+        ).order_by(
+            Project.id,
+            ConfigTemplate.id
+        )
+
+        result = []
+        for project_id, project_name, config_template_id, config_template_name in query:
+            if not result or result[-1]["id"] != project_id:
+                result.append({
+                    "id": project_id,
+                    "name": project_name,
+                    "config_templates": []
+                })
+
+            if config_template_id is not None:
+                result[-1]["config_templates"].append({
+                    "id": config_template_id,
+                    "name": config_template_name
+                })
+
+        return result
+
+    def get_tree(self):
+        """get the Project and Config Template tree, the tree is rebuilt if the generation has changed
+
+        :return:
+        """
+        generation = self.get_generation()
+        with self._lock:
+            if self._tree is not None and self._generation == generation:
+                return self._tree
+
+        tree = self.build_tree()
+        with self._lock:
+            self._tree = tree
+            self._generation = generation
+
+        return tree
+
+
+project_tree_cache = ProjectTreeCache()
+
+
+def _mark_project_tree_changed(mapper, connection, target):
+    """record that the sidebar tree has changed within the session of the object
+
+    :return:
+    """
+    if isinstance(target, ConfigTemplate):
+        state = db.inspect(target)
+        if not any(state.attrs[attr].history.has_changes() for attr in ("name", "project_id", "project")):
+            # updates of the content or the export timestamps don't affect the tree
+            return
+
+    elif isinstance(target, Project):
+        if not db.inspect(target).attrs.name.history.has_changes():
+            return
+
+    object_session(target).info["project_tree_changed"] = True
+
+
+def _mark_project_tree_created_or_deleted(mapper, connection, target):
+    object_session(target).info["project_tree_changed"] = True
+
+
+def _invalidate_project_tree_after_commit(session):
+    if session.info.pop("project_tree_changed", False):
+        project_tree_cache.invalidate()
+
+
+def _reset_project_tree_changed(session):
+    session.info.pop("project_tree_changed", None)
+
+
+for model in (Project, ConfigTemplate):
+    event.listen(model, "after_insert", _mark_project_tree_created_or_deleted)
+    event.listen(model, "after_update", _mark_project_tree_changed)
+    event.listen(model, "after_delete", _mark_project_tree_created_or_deleted)
+
+# the tree is invalidated after the commit, otherwise another worker may cache the uncommitted state
+event.listen(db.session, "after_commit", _invalidate_project_tree_after_commit)
+event.listen(db.session, "after_rollback", _reset_project_tree_changed)
 
 
 @app.context_processor
 def inject_all_project_data():
     """
-    returns all Project names and ID's from the database to build the sidebar
+    returns all Project names and ID's from the database to build the sidebar (cached, see `ProjectTreeCache`)
     :return:
     """
-    projects = Project.query.all()
-    result = []
-    for p in projects:
-        p_dict = dict()
-        p_dict["id"] = p.id
-        p_dict["name"] = p.name
-        p_dict["config_templates"] = []
-
-        for cfg in p.configtemplates.all():
-            p_dict["config_templates"].append({
-                "id": cfg.id,
-                "name": cfg.name
-            })
-
-        result.append(p_dict)
-
-    return dict(all_project_data=result)
+    return dict(all_project_data=project_tree_cache.get_tree())
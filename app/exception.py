@@ -10,8 +10,23 @@ class TemplateVariableNotFoundException(BaseException):
     pass
 
 
+class TemplateVariableAlreadyExistsException(BaseException):
+    """
+    Exception thrown, if a TemplateVariable with the same name is already defined within a ConfigTemplate
+    """
+    pass
+
+
 class TemplateValueNotFoundException(BaseException):
     """
     Exception thrown, if a TemplateValue was not found within a TemplateValueSet
     """
     pass
+
+
+class ConfigurationExportException(Exception):
+    """
+    Exception thrown, if the configurations of a ConfigTemplate could not be exported (e.g. a configuration could not be
+    rendered with the values of a TemplateValueSet), the export task is not retried
+    """
+    pass
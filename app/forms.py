@@ -2,7 +2,8 @@
 WTF forms for the web service
 """
 from flask_wtf import Form
-from wtforms import ValidationError, StringField, TextAreaField
+from flask_wtf.file import FileField
+from wtforms import ValidationError, StringField, TextAreaField, SelectField, BooleanField
 from wtforms.validators import DataRequired
 from wtforms.ext.sqlalchemy.orm import model_form
 from app import db
@@ -50,10 +51,17 @@ def verify_template_syntax(form, field):
 class ConfigTemplateForm(Form):
     name = StringField("name", validators=[DataRequired()])
     template_content = TextAreaField("template content", validators=[verify_template_syntax])
+    line_ending = SelectField(
+        "line ending",
+        choices=[("crlf", "CR/LF (Windows)"), ("lf", "LF (Unix)")],
+        default="crlf"
+    )
+    strip_trailing_whitespace = BooleanField("strip trailing whitespace", default=False)
 
 
 class EditConfigTemplateValuesForm(Form):
     csv_content = TextAreaField("Template Value Sets")
+    csv_file = FileField("CSV file")
 
 
 ProjectForm = model_form(
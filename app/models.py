@@ -1,10 +1,33 @@
 """
 SQLAlchemy data model for the web service
 """
+import datetime
+import json
+import logging
+from functools import lru_cache, partial
+from itertools import chain
+from sqlalchemy import bindparam
 from slugify.main import Slugify
-from app import db
-from app.exception import TemplateVariableNotFoundException, TemplateValueNotFoundException
+from app import app, db
+from app.exception import TemplateVariableNotFoundException, TemplateValueNotFoundException, \
+    TemplateVariableAlreadyExistsException
 from app.utils import MakoConfigGenerator
+from app.utils.confgen import get_template_digest, get_values_digest, LINE_ENDINGS
+from app.utils.database import serialized_write
+
+logger = logging.getLogger()
+
+_name_slugify = Slugify(to_lower=False)
+
+
+@lru_cache(maxsize=4096)
+def get_name_slug(name):
+    """get the slug of a Project or Config Template name (cached, the slugs are used for every exported file)
+
+    :param name:
+    :return:
+    """
+    return _name_slugify(name)
 
 
 class TemplateValue(db.Model):
@@ -23,7 +46,7 @@ class TemplateValue(db.Model):
         index=True,
         nullable=False
     )
-    value = db.Column(db.String(4096), index=True)
+    value = db.Column(db.String(4096))
 
     template_value_set_id = db.Column(db.Integer, db.ForeignKey('template_value_set.id'), nullable=False)
     template_value_set = db.relationship('TemplateValueSet', backref=db.backref('values',
@@ -73,6 +96,11 @@ class TemplateValueSet(db.Model):
         nullable=False
     )
 
+    # denormalized snapshot of the values as JSON object and the SHA-256 digest of the values (see
+    # `get_values_digest`), both are updated within the same transaction as the Template Values
+    values_json = db.Column(db.UnicodeText())
+    values_digest = db.Column(db.String(64))
+
     config_template_id = db.Column(db.Integer, db.ForeignKey('config_template.id'), nullable=False)
     config_template = db.relationship('ConfigTemplate', backref=db.backref('template_value_sets',
                                                                            cascade="all, delete-orphan",
@@ -104,6 +132,18 @@ class TemplateValueSet(db.Model):
         """
         return Slugify(separator="_", to_lower=False)(string)
 
+    @staticmethod
+    def create_values_snapshot(values):
+        """create the snapshot columns of a Template Value Set for the given values
+
+        :param values: dictionary with the variable names and values
+        :return: dictionary with the values of the `values_json` and `values_digest` columns
+        """
+        return {
+            "values_json": json.dumps(values, ensure_ascii=False, sort_keys=True),
+            "values_digest": get_values_digest(values)
+        }
+
     def copy_variables_from_config_template(self):
         """this function copies all variables from the associated configuration template object
 
@@ -113,17 +153,17 @@ class TemplateValueSet(db.Model):
             raise ValueError("Config Template not set within the template value set, copy variable names not possible")
 
         parent_vars = self.config_template.variables.all()
+        existing_values = self.get_values_as_dict()
 
         # add hostname variable
-        self.update_variable_value("hostname", value=self.hostname)
-
+        values = {
+            "hostname": self.hostname
+        }
         for tpl_var in parent_vars:
-            if self.is_value_defined(tpl_var.var_name):
-                old_value = self.get_template_value_by_name_as_string(tpl_var.var_name)
-            else:
-                old_value = ""
+            if tpl_var.var_name != "hostname":
+                values[tpl_var.var_name] = existing_values.get(tpl_var.var_name, "")
 
-            self.update_variable_value(tpl_var.var_name, value=old_value)
+        self.update_variable_values(values)
 
     def get_template_value_names(self):
         """get all template variable names of the Template Value Set
@@ -170,24 +210,52 @@ class TemplateValueSet(db.Model):
         :param auto_convert_var_name: enables or disables the automatic conversion of the variable names
         :return:
         """
-        # convert string
-        if auto_convert_var_name:
-            var_name = self.convert_variable_name(var_name)
+        return self.update_variable_values({var_name: value}, auto_convert_var_name=auto_convert_var_name)[0]
 
-        if var_name not in self.get_template_value_names():
-            # variable not found, create new one (automatic conversion is then enforced)
-            var_name = self.convert_variable_name(var_name)
-            new_var = TemplateValue(self, var_name, value)
-            db.session.add(new_var)
-            db.session.commit()
+    def update_variable_values(self, values, auto_convert_var_name=True):
+        """add or update multiple Template Variables for the Template Value set. The existing values are loaded once,
+        all changes are flushed and committed within a single transaction.
 
-        else:
-            # update existing variable
-            tpl_var = TemplateValue.query.filter_by(var_name_slug=var_name, template_value_set=self).first()
-            tpl_var.value = value
+        :param values: dictionary with the variable names and the values
+        :param auto_convert_var_name: enables or disables the automatic conversion of the variable names
+        :return: list of the (converted) variable names
+        """
+        with serialized_write:
+            existing_values = dict((val.var_name_slug, val) for val in self.values)
+            var_names = []
+            changed = False
+
+            for var_name, value in values.items():
+                # convert string
+                if auto_convert_var_name:
+                    var_name = self.convert_variable_name(var_name)
+
+                tpl_var = existing_values.get(var_name)
+                if tpl_var is None:
+                    # variable not found, create new one (automatic conversion is then enforced)
+                    var_name = self.convert_variable_name(var_name)
+                    tpl_var = TemplateValue(self, var_name, value)
+                    db.session.add(tpl_var)
+                    existing_values[var_name] = tpl_var
+                    changed = True
+
+                elif tpl_var.value != value:
+                    # update existing variable
+                    tpl_var.value = value
+                    changed = True
+
+                var_names.append(var_name)
+
+            if changed or self.values_json is None:
+                snapshot = self.create_values_snapshot(dict((key, val.value) for key, val in existing_values.items()))
+                self.values_json = snapshot["values_json"]
+                self.values_digest = snapshot["values_digest"]
+
+            if changed:
+                self.invalidate_rendered_configuration()
             db.session.commit()
 
-        return var_name
+        return var_names
 
     def is_value_defined(self, val_name):
         """checks if the given template value is defined on the Template Value Set
@@ -204,18 +272,157 @@ class TemplateValueSet(db.Model):
         """
         return self.values.order_by(TemplateValue.var_name_slug).all()
 
+    def get_values_as_dict(self):
+        """get all values of the Template Value Set as dictionary (read from the snapshot if available)
+
+        :return: dictionary with the variable names as keys
+        """
+        if self.values_json is not None:
+            return json.loads(self.values_json)
+
+        return dict((val.var_name, val.value) for val in self.values)
+
     def get_configuration_result(self):
         """generates the configuration based on the Config Template and the associated Template Value Set
 
         :return:
         """
-        dcg = MakoConfigGenerator(template_string=self.config_template.template_content)
+        dcg = self.config_template.create_config_generator()
 
-        for val in self.values:
-            dcg.set_variable_value(val.var_name, val.value)
+        for var_name, value in self.get_values_as_dict().items():
+            dcg.set_variable_value(var_name, value)
 
         return dcg.get_rendered_result()
 
+    def get_cached_configuration_result(self):
+        """get the configuration result from the rendered configuration cache. If the cached configuration is missing
+        or outdated, the configuration is rendered and stored within the cache.
+
+        :return:
+        """
+        values = None
+        values_digest = self.values_digest
+        if values_digest is None:
+            values = self.get_values_as_dict()
+            values_digest = get_values_digest(values)
+        cache_key = RenderedConfiguration.create_cache_key(self.config_template, values_digest)
+
+        cached = self.rendered_configuration.first()
+        if cached and cached.cache_key == cache_key:
+            return cached.content
+
+        if values is None:
+            values = self.get_values_as_dict()
+        result = self.config_template.create_config_generator().render(values)
+
+        try:
+            if not cached:
+                RenderedConfiguration.evict()
+                cached = RenderedConfiguration(self)
+
+            cached.cache_key = cache_key
+            cached.content = result
+            cached.rendered_at = datetime.datetime.now()
+            db.session.add(cached)
+            db.session.commit()
+
+        except Exception:
+            # the cache is optional, the rendered result is still valid
+            logger.error("failed to store rendered configuration of %s" % repr(self), exc_info=True)
+            db.session.rollback()
+
+        return result
+
+    def invalidate_rendered_configuration(self):
+        """drop the cached configuration of the Template Value Set (the change is committed with the session)
+
+        :return:
+        """
+        if self.id is not None:
+            RenderedConfiguration.query.filter(
+                RenderedConfiguration.template_value_set_id == self.id
+            ).delete(synchronize_session=False)
+
+
+class RenderedConfiguration(db.Model):
+    """
+    RenderedConfiguration
+    =====================
+
+    Cache for the rendered configuration of a Template Value Set. The cache key combines the digest of the Config
+    Template content (and its line ending) with the digest of the sorted values of the Template Value Set. The number
+    of cached configurations is limited by the `RENDERED_CONFIG_CACHE_SIZE` configuration value, the oldest entries are
+    evicted first.
+
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    cache_key = db.Column(db.String(64), nullable=False)
+    content = db.Column(db.UnicodeText())
+    rendered_at = db.Column(db.DateTime, index=True)
+
+    template_value_set_id = db.Column(
+        db.Integer,
+        db.ForeignKey('template_value_set.id'),
+        unique=True,
+        nullable=False
+    )
+    template_value_set = db.relationship('TemplateValueSet', backref=db.backref('rendered_configuration',
+                                                                                cascade="all, delete-orphan",
+                                                                                lazy='dynamic'))
+
+    def __init__(self, template_value_set):
+        self.template_value_set = template_value_set
+
+    def __repr__(self):
+        return '<RenderedConfiguration %r>' % self.cache_key
+
+    @staticmethod
+    def create_cache_key(config_template, values_digest):
+        """create the cache key for the given Config Template and the digest of the values
+
+        :param config_template:
+        :param values_digest: digest of the values of the Template Value Set (see `get_values_digest`)
+        :return:
+        """
+        return get_template_digest(
+            config_template.get_template_digest() +
+            config_template.line_ending +
+            # keeps the cache keys of the existing configurations
+            ("strip" if config_template.strip_trailing_whitespace else "") +
+            values_digest
+        )
+
+    @staticmethod
+    def evict():
+        """drop the oldest cached configurations if the cache exceeds its maximum size
+
+        :return:
+        """
+        max_size = app.config["RENDERED_CONFIG_CACHE_SIZE"]
+        overflow = RenderedConfiguration.query.count() - max_size
+        if overflow >= 0:
+            oldest = db.session.query(RenderedConfiguration.id).order_by(
+                RenderedConfiguration.rendered_at
+            ).limit(overflow + 1).subquery()
+            RenderedConfiguration.query.filter(
+                RenderedConfiguration.id.in_(oldest)
+            ).delete(synchronize_session=False)
+
+    @staticmethod
+    def invalidate_config_template(config_template):
+        """drop the cached configurations of all Template Value Sets of the given Config Template
+
+        :param config_template:
+        :return:
+        """
+        if config_template.id is not None:
+            tvs_ids = db.session.query(TemplateValueSet.id).filter(
+                TemplateValueSet.config_template_id == config_template.id
+            ).subquery()
+            RenderedConfiguration.query.filter(
+                RenderedConfiguration.template_value_set_id.in_(tvs_ids)
+            ).delete(synchronize_session=False)
+
 
 class TemplateVariable(db.Model):
     """
@@ -234,7 +441,7 @@ class TemplateVariable(db.Model):
         index=True,
         nullable=False
     )
-    description = db.Column(db.String(4096), index=True)
+    description = db.Column(db.String(4096))
 
     config_template_id = db.Column(db.Integer, db.ForeignKey('config_template.id'), nullable=False)
     config_template = db.relationship('ConfigTemplate', backref=db.backref('variables',
@@ -275,7 +482,9 @@ class ConfigTemplate(db.Model):
         index=True,
         nullable=False
     )
-    _template_content = db.Column(db.UnicodeText(), index=True)
+    _template_content = db.Column(db.UnicodeText())
+    # SHA-256 digest of the template content, maintained by the template_content setter
+    template_digest = db.Column(db.String(64))
 
     project_id = db.Column(db.Integer, db.ForeignKey('project.id'), nullable=False)
     project = db.relationship('Project', backref=db.backref('configtemplates',
@@ -283,10 +492,14 @@ class ConfigTemplate(db.Model):
                                                             lazy='dynamic'))
     last_successful_ftp_export = db.Column(db.DateTime)
     last_successful_tftp_export = db.Column(db.DateTime)
+    # line ending of the rendered configurations, a key of the confgen.LINE_ENDINGS dictionary
+    line_ending = db.Column(db.String(8), nullable=False, default="crlf", server_default="crlf")
+    # remove the trailing whitespace of every line of the rendered configurations
+    strip_trailing_whitespace = db.Column(db.Boolean, nullable=False, default=False, server_default="0")
 
     @property
     def name_slug(self):
-        return Slugify(to_lower=False)(self.name)
+        return get_name_slug(self.name)
 
     @property
     def template_content(self):
@@ -294,18 +507,19 @@ class ConfigTemplate(db.Model):
 
     @template_content.setter
     def template_content(self, value):
-        # if the template content is changed, drop all associated Template Value Sets
+        # if the template content is changed, drop all associated Template Value Sets and synchronize the variables
         if self._template_content != value:
-            for obj in self.template_value_sets.all():
-                TemplateValueSet.query.filter(TemplateValueSet.id == obj.id).delete()
-
-        self._template_content = value
-
-        self._create_variables_from_template_content()
+            with serialized_write:
+                self._delete_template_value_sets()
+                self._template_content = value
+                self.template_digest = get_template_digest(value)
+                self._create_variables_from_template_content()
 
-    def __init__(self, name, project=None, template_content=""):
+    def __init__(self, name, project=None, template_content="", line_ending="crlf", strip_trailing_whitespace=False):
         self.name = name
         self.project = project
+        self.line_ending = line_ending
+        self.strip_trailing_whitespace = strip_trailing_whitespace
         self.template_content = template_content
 
     def __repr__(self):
@@ -326,22 +540,96 @@ class ConfigTemplate(db.Model):
         """
         return Slugify(separator="_", to_lower=False)(string)
 
-    def _create_variables_from_template_content(self):
-        dcg = MakoConfigGenerator(template_string=self.template_content)
+    def get_template_digest(self):
+        """get the digest of the template content
+
+        :return:
+        """
+        if self.template_digest is None:
+            return get_template_digest(self.template_content)
+        return self.template_digest
+
+    def create_config_generator(self):
+        """create a Mako Config Generator for the content and the post-processing options (line ending and trailing
+        whitespace) of the Config Template
 
-        # the hostname is always defined within a TemplateValueSet, add it with a default description
-        self.update_template_variable(
-            "hostname",
-            "the hostname of the device (also used as name for the template value set)"
+        :return:
+        """
+        return MakoConfigGenerator(
+            template_string=self.template_content,
+            line_ending=LINE_ENDINGS.get(self.line_ending, LINE_ENDINGS["crlf"]),
+            strip_trailing_whitespace=bool(self.strip_trailing_whitespace)
         )
 
-        # create new template variables on the Config Template
-        for var_name in dcg.template_variables:
-            if var_name != "hostname":
-                self.update_template_variable(var_name)
+    def _delete_template_value_sets(self):
+        """delete all Template Value Sets of the Config Template (including the values and the cached configurations)
+        using set-based statements
+
+        :return:
+        """
+        if self.id is None:
+            return
+
+        RenderedConfiguration.invalidate_config_template(self)
+        tvs_ids = db.session.query(TemplateValueSet.id).filter(
+            TemplateValueSet.config_template_id == self.id
+        ).subquery()
+        TemplateValue.query.filter(
+            TemplateValue.template_value_set_id.in_(tvs_ids)
+        ).delete(synchronize_session=False)
+        TemplateValueSet.query.filter(
+            TemplateValueSet.config_template_id == self.id
+        ).delete(synchronize_session=False)
+
+    def _create_variables_from_template_content(self):
+        """synchronize the Template Variables with the variables of the template content. Variables that are not used
+        within the template content are removed (except the hostname), new variables are added. The changes are
+        applied using bulk statements and committed within a single transaction.
+
+        :return:
+        """
+        dcg = MakoConfigGenerator(template_string=self.template_content)
+        template_variables = set(self.convert_variable_name(var_name) for var_name in dcg.template_variables)
+        # the hostname is always defined within a TemplateValueSet
+        template_variables.add("hostname")
+
+        if self.id is None:
+            db.session.add(self)
+            db.session.flush()
+
+        existing_variables = set(var_name for var_name, in db.session.query(TemplateVariable.var_name_slug).filter(
+            TemplateVariable.config_template_id == self.id
+        ))
+
+        removed_variables = existing_variables - template_variables
+        if removed_variables:
+            TemplateVariable.query.filter(
+                TemplateVariable.config_template_id == self.id,
+                TemplateVariable.var_name_slug.in_(list(removed_variables))
+            ).delete(synchronize_session=False)
+
+        new_variables = []
+        if "hostname" not in existing_variables:
+            # add the hostname with a default description as first variable
+            new_variables.append({
+                "var_name_slug": "hostname",
+                "description": "the hostname of the device (also used as name for the template value set)",
+                "config_template_id": self.id
+            })
+        for var_name in sorted(template_variables - existing_variables - {"hostname"}):
+            new_variables.append({
+                "var_name_slug": var_name,
+                "description": "",
+                "config_template_id": self.id
+            })
+        if new_variables:
+            db.session.execute(TemplateVariable.__table__.insert(), new_variables)
+
+        db.session.commit()
 
     def rename_variable(self, old_name, new_name):
-        """rename the Template Variables within the Config Template and all associated Template Value Sets
+        """rename the Template Variables within the Config Template and all associated Template Value Sets. The values
+        are renamed using a single set-based statement, all changes are committed within a single transaction.
 
         :param old_name:
         :param new_name:
@@ -350,16 +638,42 @@ class ConfigTemplate(db.Model):
         if old_name not in self.get_template_variable_names():
             raise TemplateVariableNotFoundException("Variable %s not found in config template" % old_name)
 
-        var_obj = self.get_template_variable_by_name(old_name)
-        var_obj.var_name = new_name
-
-        # variable renamed, change associated value sets
-        for valueset in self.template_value_sets.all():
-            old_val = valueset.get_template_value_by_name_as_string(old_name)
-            # drop old variable from value set
-            db.session.delete(valueset.get_template_value_by_name(old_name))
-            # create new variables with the new name and the old value
-            valueset.update_variable_value(var_name=new_name, value=old_val)
+        new_name = self.convert_variable_name(new_name)
+        if new_name == old_name:
+            return
+
+        with serialized_write:
+            tvs_ids = db.session.query(TemplateValueSet.id).filter(
+                TemplateValueSet.config_template_id == self.id
+            ).subquery()
+
+            # verify that the new name is not used, before anything is modified
+            value_collision = db.session.query(TemplateValue.id).filter(
+                TemplateValue.var_name_slug == new_name,
+                TemplateValue.template_value_set_id.in_(tvs_ids)
+            ).first()
+            if self.is_variable_defined(new_name) or value_collision:
+                raise TemplateVariableAlreadyExistsException(
+                    "Variable %s already defined in config template" % new_name
+                )
+
+            try:
+                var_obj = self.get_template_variable_by_name(old_name)
+                var_obj.var_name = new_name
+
+                # variable renamed, change associated value sets
+                TemplateValue.query.filter(
+                    TemplateValue.var_name_slug == old_name,
+                    TemplateValue.template_value_set_id.in_(tvs_ids)
+                ).update({TemplateValue.var_name_slug: new_name}, synchronize_session=False)
+                self._rename_values_snapshot_key(old_name, new_name)
+                RenderedConfiguration.invalidate_config_template(self)
+
+                db.session.commit()
+
+            except Exception:
+                db.session.rollback()
+                raise
 
     def valid_template_value_set_name(self, template_value_set_name):
         """test if the given Template Value Set name is valid within the Config Template
@@ -439,6 +753,137 @@ class ConfigTemplate(db.Model):
         """
         return var_name in self.get_template_variable_names()
 
+    def _iter_template_value_set_queries(self, query, template_value_set_ids=None):
+        """restrict the query to the Template Value Sets of the Config Template, if IDs are given the query is split
+        into multiple queries with a limited number of parameters (SQLite limits the number of variables per statement)
+
+        :param query:
+        :param template_value_set_ids: iterable of Template Value Set IDs (default is all)
+        :return: generator of queries that are ordered by the Template Value Set ID
+        """
+        query = query.filter(TemplateValueSet.config_template_id == self.id).order_by(TemplateValueSet.id)
+        if template_value_set_ids is None:
+            yield query
+            return
+
+        template_value_set_ids = sorted(template_value_set_ids)
+        for i in range(0, len(template_value_set_ids), 500):
+            yield query.filter(TemplateValueSet.id.in_(template_value_set_ids[i:i + 500]))
+
+    def iter_template_values(self, template_value_set_ids=None):
+        """iterate over the values of all Template Value Sets of the Config Template using a single scan of the value
+        snapshots (the Template Values are only queried for Template Value Sets without a snapshot)
+
+        :param template_value_set_ids: iterable of Template Value Set IDs that should be read (default is all)
+        :return: generator of (template_value_set_id, hostname, {var_name: value}) tuples
+        """
+        query = db.session.query(
+            TemplateValueSet.id,
+            TemplateValueSet.hostname,
+            TemplateValueSet.values_json
+        )
+        rows = chain.from_iterable(
+            q.yield_per(1000) for q in self._iter_template_value_set_queries(query, template_value_set_ids)
+        )
+
+        for tvs_id, hostname, values_json in rows:
+            if values_json is None:
+                values = dict(db.session.query(TemplateValue.var_name_slug, TemplateValue.value).filter(
+                    TemplateValue.template_value_set_id == tvs_id
+                ))
+            else:
+                values = json.loads(values_json)
+            yield tvs_id, hostname, values
+
+    def _rename_values_snapshot_key(self, old_name, new_name):
+        """rename a variable within the value snapshots of the Template Value Sets of the Config Template after a
+        set-based rename of the values. Only the snapshot column is scanned, the snapshots that contain the variable
+        are rewritten and the digest is recomputed in the same pass (the change is committed with the session).
+
+        :param old_name:
+        :param new_name:
+        :return:
+        """
+        query = db.session.query(TemplateValueSet.id, TemplateValueSet.values_json).filter(
+            TemplateValueSet.config_template_id == self.id,
+            TemplateValueSet.values_json.isnot(None)
+        )
+
+        updates = []
+        for tvs_id, values_json in query:
+            values = json.loads(values_json)
+            if old_name not in values:
+                continue
+
+            values[new_name] = values.pop(old_name)
+            snapshot = TemplateValueSet.create_values_snapshot(values)
+            updates.append({
+                "_id": tvs_id,
+                "_values_json": snapshot["values_json"],
+                "_values_digest": snapshot["values_digest"]
+            })
+
+        if updates:
+            db.session.execute(
+                TemplateValueSet.__table__.update().where(
+                    TemplateValueSet.__table__.c.id == bindparam("_id")
+                ).values(values_json=bindparam("_values_json"), values_digest=bindparam("_values_digest")),
+                updates
+            )
+
+    def iter_cache_keys(self, template_value_set_ids=None):
+        """iterate over the cache keys of the rendered configurations of all Template Value Sets without loading the
+        values (see `RenderedConfiguration.create_cache_key`)
+
+        :param template_value_set_ids: iterable of Template Value Set IDs that should be read (default is all)
+        :return: generator of (template_value_set_id, hostname, cache_key) tuples, the cache key is None if the digest
+                 of the values is not known
+        """
+        query = db.session.query(
+            TemplateValueSet.id,
+            TemplateValueSet.hostname,
+            TemplateValueSet.values_digest
+        )
+        rows = chain.from_iterable(self._iter_template_value_set_queries(query, template_value_set_ids))
+
+        for tvs_id, hostname, values_digest in rows:
+            if values_digest is None:
+                yield tvs_id, hostname, None
+            else:
+                yield tvs_id, hostname, RenderedConfiguration.create_cache_key(self, values_digest)
+
+    def iter_rendered(self, template_value_set_ids=None):
+        """render the configurations of all Template Value Sets of the Config Template using a single query and one
+        compiled template
+
+        :param template_value_set_ids: iterable of Template Value Set IDs that should be rendered (default is all)
+        :return: generator of (hostname, configuration) tuples
+        """
+        dcg = self.create_config_generator()
+
+        for tvs_id, hostname, values in self.iter_template_values(template_value_set_ids):
+            yield hostname, dcg.render(values)
+
+    def iter_renderers(self, template_value_set_ids=None):
+        """iterate over all Template Value Sets of the Config Template using a single query and one compiled template,
+        the configurations are rendered by the caller directly into a sink (e.g. a file or a ZIP member)
+
+        :param template_value_set_ids: iterable of Template Value Set IDs that should be rendered (default is all)
+        :return: generator of (hostname, render) tuples, `render(sink)` renders the configuration into the given sink
+                 (see `MakoConfigGenerator.render_to_sink`)
+        """
+        dcg = self.create_config_generator()
+
+        for tvs_id, hostname, values in self.iter_template_values(template_value_set_ids):
+            yield hostname, partial(dcg.render_to_sink, values)
+
+    def render_all(self):
+        """render the configurations of all Template Value Sets of the Config Template
+
+        :return: list of (hostname, configuration) tuples
+        """
+        return list(self.iter_rendered())
+
 
 class Project(db.Model):
     """
@@ -458,7 +903,7 @@ class Project(db.Model):
 
     @property
     def name_slug(self):
-        return Slugify(to_lower=False)(self.name)
+        return get_name_slug(self.name)
 
     def __init__(self, name):
         self.name = name
@@ -1,12 +1,144 @@
 import datetime
 import time
 import logging
-from app import celery, db
-from app.models import ConfigTemplate
-from app.utils.export import export_configuration_to_local_ftp, export_configuration_to_local_tftp
+from celery import chord, uuid
+from celery.states import READY_STATES
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
+from app import app, celery, db
+from app.exception import ConfigurationExportException
+from app.models import ConfigTemplate, Project, TemplateValueSet
+from app.utils.confgen import TemplateSyntaxException
+from app.utils.export import export_template_value_sets_to_directories, finalize_config_template_export, \
+    get_export_root_folder, EXPORT_TARGETS
+from app.utils.export_jobs import get_export_job_registry, get_export_job_key, get_export_job_lock_key, \
+    get_bulk_export_job_key, get_export_data_version
 
 logger = logging.getLogger("tasks")
 
+# custom task state of running export tasks, the metadata contains the progress of the export
+EXPORT_PROGRESS_STATE = "PROGRESS"
+
+
+def _get_throughput(processed, total, elapsed):
+    """
+    calculate the throughput and the estimated remaining time of an export
+    :param processed: number of processed configurations
+    :param total: total number of configurations
+    :param elapsed: elapsed time in seconds
+    :return: tuple of the configurations per second and the ETA in seconds (None if unknown)
+    """
+    if processed == 0 or elapsed <= 0:
+        return 0.0, None
+
+    configs_per_second = processed / elapsed
+    return round(configs_per_second, 3), round(max(total - processed, 0) / configs_per_second, 1)
+
+
+class ExportProgress(object):
+    """
+    progress of an export task that is published as metadata of the custom `PROGRESS` task state. The state is
+    updated at most once per `EXPORT_PROGRESS_INTERVAL` seconds, therefore `update` is cheap enough to be called for
+    every configuration.
+    """
+
+    def __init__(self, task, total, interval=None):
+        self.task = task
+        self.total = total
+        self.interval = app.config["EXPORT_PROGRESS_INTERVAL"] if interval is None else interval
+        self.processed = 0
+        self.bytes_written = 0
+        self.hostname = None
+        self.started_at = time.time()
+        self._start_time = time.perf_counter()
+        self._last_update = None
+
+    def update(self, hostname, bytes_written=0):
+        """
+        count an exported configuration and publish the progress if the update interval is expired
+        :param hostname:
+        :param bytes_written:
+        :return:
+        """
+        self.processed += 1
+        self.bytes_written += bytes_written
+        self.hostname = hostname
+
+        now = time.perf_counter()
+        if self._last_update is None or now - self._last_update >= self.interval:
+            self._last_update = now
+            self.publish()
+
+    __call__ = update
+
+    def get_meta(self):
+        """
+        get the progress metadata of the export
+        :return:
+        """
+        elapsed = time.perf_counter() - self._start_time
+        configs_per_second, eta = _get_throughput(self.processed, self.total, elapsed)
+        return {
+            "status": "exported %d of %d configurations" % (self.processed, self.total),
+            "processed": self.processed,
+            "total": self.total,
+            "bytes_written": self.bytes_written,
+            "started_at": self.started_at,
+            "elapsed_seconds": round(elapsed, 3),
+            "configs_per_second": configs_per_second,
+            "eta_seconds": eta,
+            "hostname": self.hostname
+        }
+
+    def publish(self):
+        """
+        store the progress metadata as state of the task (only if the task is executed by a worker)
+        :return:
+        """
+        if self.task.request.id:
+            self.task.update_state(state=EXPORT_PROGRESS_STATE, meta=self.get_meta())
+
+
+def get_export_progress(meta):
+    """
+    get the progress of an export from the metadata of a task in the `PROGRESS` state, the progress of a chunked
+    export (see `start_configuration_export`) is combined from the states of all chunks
+    :param meta:
+    :return: dictionary with the processed and total number of configurations, the written bytes, the throughput,
+             the ETA and the last hostname
+    """
+    if "chunks" not in meta:
+        return dict(meta)
+
+    processed = 0
+    bytes_written = 0
+    hostname = None
+    started_at = []
+    for chunk_id in meta["chunks"]:
+        chunk = celery.AsyncResult(chunk_id)
+        if chunk.state not in (EXPORT_PROGRESS_STATE, "SUCCESS") or not isinstance(chunk.info, dict):
+            continue
+
+        processed += chunk.info.get("processed", 0)
+        bytes_written += chunk.info.get("bytes_written", 0)
+        started_at.append(chunk.info.get("started_at", meta["started_at"]))
+        if chunk.state == EXPORT_PROGRESS_STATE:
+            hostname = chunk.info.get("hostname")
+
+    elapsed = time.time() - min(started_at) if started_at else 0
+    configs_per_second, eta = _get_throughput(processed, meta["total"], elapsed)
+    return {
+        "status": "exported %d of %d configurations" % (processed, meta["total"]),
+        "processed": processed,
+        "total": meta["total"],
+        "bytes_written": bytes_written,
+        "started_at": meta["started_at"],
+        "elapsed_seconds": round(elapsed, 3),
+        "configs_per_second": configs_per_second,
+        "eta_seconds": eta,
+        "hostname": hostname
+    }
+
 
 @celery.task()
 def debug_celery_task(a, b):
@@ -22,52 +154,531 @@ def debug_celery_task(a, b):
     }
 
 
-@celery.task()
-def update_local_ftp_configurations(config_template_id):
+@celery.task(bind=True, max_retries=app.config["EXPORT_TASK_MAX_RETRIES"],
+             default_retry_delay=app.config["EXPORT_TASK_RETRY_DELAY"])
+def export_configuration_chunk(self, config_template_id, targets, template_value_set_ids):
     """
-    update the local FTP configuration files
+    export the configurations of the given Template Value Sets to the export targets (every configuration is rendered
+    once), a failed chunk is retried on its own (see the `EXPORT_TASK_MAX_RETRIES` and `EXPORT_TASK_RETRY_DELAY`
+    configuration values). Render errors are not retried, they fail the chunk and therefore the entire export.
+    :param config_template_id:
+    :param targets: list of export target names (see `get_export_root_folder`)
+    :param template_value_set_ids: list of Template Value Set IDs
+    :return: dictionary with the number of written, linked, copied and unchanged configuration files, the manifest
+             entries of every target and the progress metadata of the chunk
+    """
+    try:
+        config_template = ConfigTemplate.query.filter(ConfigTemplate.id == config_template_id).first_or_404()
+
+        progress = ExportProgress(self, len(template_value_set_ids))
+        result = export_template_value_sets_to_directories(
+            config_template,
+            [get_export_root_folder(target) for target in targets],
+            template_value_set_ids=template_value_set_ids,
+            progress=progress
+        )
+        result.update(progress.get_meta())
+        return result
+
+    except TemplateSyntaxException as ex:
+        # the rendering fails again with the same data, therefore the chunk is not retried (the exception is derived
+        # from BaseException and is converted to fail the chord properly)
+        db.session.rollback()
+        logger.error("failed to render chunk of %d configurations for %s" % (
+            len(template_value_set_ids), ", ".join(targets)
+        ), exc_info=True)
+        raise ConfigurationExportException(str(ex))
+
+    except Exception as ex:
+        db.session.rollback()
+        logger.error("failed to export chunk of %d configurations to %s (attempt %d)" % (
+            len(template_value_set_ids), ", ".join(targets), self.request.retries + 1
+        ), exc_info=True)
+        raise self.retry(exc=ex)
+
+
+@celery.task(bind=True)
+def finalize_configuration_export(self, chunk_results, config_template_id, targets, data_version=None):
+    """
+    chord callback of the chunked export, executed only if all chunks succeeded: remove the configuration files of
+    deleted Template Value Sets, write the manifests and update the timestamps of the last successful FTP/TFTP export.
+    If the data changed during the export, a single follow-up export is queued (see `request_configuration_export`).
+    :param chunk_results: results of the `export_configuration_chunk` tasks
+    :param config_template_id:
+    :param targets: list of export target names (see `get_export_root_folder`)
+    :param data_version: version of the data when the export was requested (see `get_export_data_version`)
     :return:
     """
     # if the result contains a "error" key, the task is failed
-    result = {}
+    result = {
+        "written": 0,
+        "linked": 0,
+        "copied": 0,
+        "unchanged": 0,
+        "removed": 0,
+        "render_seconds": 0.0,
+        "io_seconds": 0.0
+    }
     try:
         config_template = ConfigTemplate.query.filter(ConfigTemplate.id == config_template_id).first_or_404()
 
-        for tvs in config_template.template_value_sets:
-            export_configuration_to_local_ftp(tvs)
+        manifests = [{} for _ in targets]
+        for chunk_result in chunk_results:
+            for key in ("written", "linked", "copied", "unchanged", "render_seconds", "io_seconds"):
+                result[key] += chunk_result[key]
+            for manifest, chunk_manifest in zip(manifests, chunk_result["manifests"]):
+                manifest.update(chunk_manifest)
+        result["render_seconds"] = round(result["render_seconds"], 6)
+        result["io_seconds"] = round(result["io_seconds"], 6)
 
-        config_template.last_successful_ftp_export = datetime.datetime.now()
+        for target, manifest in zip(targets, manifests):
+            result["removed"] += finalize_config_template_export(
+                config_template,
+                get_export_root_folder(target),
+                manifest
+            )
+
+        timestamp = datetime.datetime.now()
+        for target in targets:
+            if target in EXPORT_TARGETS:
+                setattr(config_template, "last_successful_%s_export" % target, timestamp)
         db.session.commit()
-        result["timestamp"] = config_template.last_successful_ftp_export.strftime('%Y/%m/%d %H:%M')
+        result["timestamp"] = timestamp.strftime('%Y/%m/%d %H:%M')
+
+        if data_version:
+            follow_up = _queue_follow_up_export(config_template, targets, data_version, self.request.id)
+            if follow_up:
+                result["follow_up_task_id"] = follow_up.id
 
     except Exception as ex:
-        logger.error("failed to update local FTP configuration files", exc_info=True)
+        db.session.rollback()
+        logger.error("failed to finalize the export to %s" % ", ".join(targets), exc_info=True)
         result["error"] = str(ex)
 
-    print(result)
     return result
 
 
-@celery.task()
-def update_local_tftp_configurations(config_template_id):
+def start_configuration_export(config_template_id, targets, data_version=None, task_id=None):
+    """
+    start the export of all configurations of the Config Template to the export targets. The Template Value Sets are
+    split into chunks (see the `EXPORT_TASK_CHUNK_SIZE` configuration value) that are exported by parallel subtasks,
+    every configuration is rendered once and written to all targets. The finalizing chord callback runs after all
+    chunks succeeded.
+    :param config_template_id:
+    :param targets: list of export target names (see `get_export_root_folder`)
+    :param data_version: version of the exported data, used to detect changes during the export
+    :param task_id: ID of the finalizing task (generated if not set)
+    :return: AsyncResult of the finalizing task
     """
-    update the local TFTP configuration files
+    # fail before any subtask is queued if a target is unknown
+    for target in targets:
+        get_export_root_folder(target)
+
+    template_value_set_ids = [tvs_id for tvs_id, in db.session.query(TemplateValueSet.id).filter(
+        TemplateValueSet.config_template_id == config_template_id
+    ).order_by(TemplateValueSet.id)]
+
+    chunk_size = app.config["EXPORT_TASK_CHUNK_SIZE"]
+    chunks = [
+        export_configuration_chunk.s(config_template_id, targets, template_value_set_ids[i:i + chunk_size]).set(
+            task_id=uuid(),
+            priority=app.config["EXPORT_TASK_PRIORITY"]
+        )
+        for i in range(0, len(template_value_set_ids), chunk_size)
+    ]
+    callback = finalize_configuration_export.s(config_template_id, targets, data_version).set(
+        task_id=task_id or uuid(),
+        priority=app.config["EXPORT_TASK_PRIORITY"]
+    )
+
+    # the finalizing task reports the combined progress of the chunks until it is executed (see `get_export_progress`)
+    finalize_configuration_export.update_state(task_id=callback.options["task_id"], state=EXPORT_PROGRESS_STATE, meta={
+        "status": "queued %d configurations" % len(template_value_set_ids),
+        "total": len(template_value_set_ids),
+        "started_at": time.time(),
+        "chunks": [chunk.options["task_id"] for chunk in chunks]
+    })
+
+    if not chunks:
+        # nothing to render, only clean up the export directories
+        return callback.apply_async(([],))
+
+    return chord(chunks)(callback)
+
+
+def _is_running(task_id):
+    """
+    check if the task is queued or running
+    :param task_id:
     :return:
     """
+    return celery.AsyncResult(task_id).state not in READY_STATES
+
+
+def _get_running_export_job(registry, config_template_id, target):
+    """
+    get the queued or running export job of the Config Template and the target from the registry
+    :param registry:
+    :param config_template_id:
+    :param target: export target name
+    :return: dictionary with the job data, None if no job is running
+    """
+    job = registry.get(get_export_job_key(config_template_id, target))
+    if job and _is_running(job["task_id"]):
+        return job
+    return None
+
+
+def _register_export_job(registry, config_template_id, targets, task_id, data_version):
+    """
+    register the export job for the Config Template and every target, the registry lock of the Config Template must be
+    held (see `get_export_job_lock_key`)
+    :param registry:
+    :param config_template_id:
+    :param targets: list of export target names
+    :param task_id: ID of the task that finishes the export of the Config Template
+    :param data_version: version of the exported data (see `get_export_data_version`)
+    :return:
+    """
+    for target in targets:
+        registry.set(
+            get_export_job_key(config_template_id, target),
+            {"task_id": task_id, "data_version": data_version},
+            app.config["EXPORT_JOB_TIMEOUT"]
+        )
+
+
+def _unregister_export_job(registry, config_template_id, targets, task_id):
+    """
+    remove the registry entries of the Config Template that belong to the given export job, the registry lock of the
+    Config Template must be held (see `get_export_job_lock_key`)
+    :param registry:
+    :param config_template_id:
+    :param targets: list of export target names
+    :param task_id: ID of the task that finishes the export of the Config Template
+    :return: list of the targets that were registered for the export job
+    """
+    registered_targets = []
+    for target in targets:
+        key = get_export_job_key(config_template_id, target)
+        job = registry.get(key)
+        if job and job["task_id"] == task_id:
+            registry.delete(key)
+            registered_targets.append(target)
+    return registered_targets
+
+
+def request_configuration_export(config_template_id, targets):
+    """
+    request the export of all configurations of the Config Template to the export targets. The requests are
+    coalesced per Config Template and target: targets with a queued or running export job (including project and
+    appliance wide exports) are attached to it, the remaining targets are exported by a new job. If the data changes
+    while a job is running, the job queues a single follow-up export when it is finished.
+    :param config_template_id:
+    :param targets: list of export target names (see `get_export_root_folder`)
+    :return: AsyncResult of the new or the running export job
+    """
+    config_template = ConfigTemplate.query.filter(ConfigTemplate.id == config_template_id).first_or_404()
+    registry = get_export_job_registry()
+
+    with registry.lock(get_export_job_lock_key(config_template_id)):
+        running_jobs = [_get_running_export_job(registry, config_template_id, target) for target in targets]
+        pending_targets = [target for target, job in zip(targets, running_jobs) if job is None]
+        if not pending_targets:
+            task_id = running_jobs[0]["task_id"]
+            logger.info("export request for %s attached to running job %s" % (repr(config_template), task_id))
+            return celery.AsyncResult(task_id)
+
+        # the job is registered before it is queued, the finalizing task may be executed before this function returns
+        data_version = get_export_data_version(config_template)
+        task_id = uuid()
+        _register_export_job(registry, config_template_id, pending_targets, task_id, data_version)
+        try:
+            result = start_configuration_export(
+                config_template_id,
+                pending_targets,
+                data_version=data_version,
+                task_id=task_id
+            )
+
+        except Exception:
+            _unregister_export_job(registry, config_template_id, pending_targets, task_id)
+            raise
+
+    return result
+
+
+def _queue_follow_up_export(config_template, targets, data_version, task_id):
+    """
+    remove the finished export job from the registry and queue a follow-up export if the data changed since the export
+    was requested, called by the finalizing task of the export job
+    :param config_template:
+    :param targets: list of export target names
+    :param data_version: version of the data when the finished export was requested
+    :param task_id: ID of the task that finishes the export of the Config Template
+    :return: AsyncResult of the follow-up export, None if the data is unchanged
+    """
+    registry = get_export_job_registry()
+
+    with registry.lock(get_export_job_lock_key(config_template.id)):
+        # targets that were not registered for this job are handled by another job
+        targets = _unregister_export_job(registry, config_template.id, targets, task_id)
+        if not targets:
+            return None
+
+        current_version = get_export_data_version(config_template)
+        if current_version == data_version:
+            return None
+
+        logger.info("data of %s changed during the export to %s, queue follow-up export" % (
+            repr(config_template), ", ".join(targets)
+        ))
+        follow_up_task_id = uuid()
+        _register_export_job(registry, config_template.id, targets, follow_up_task_id, current_version)
+        try:
+            result = start_configuration_export(
+                config_template.id,
+                targets,
+                data_version=current_version,
+                task_id=follow_up_task_id
+            )
+
+        except Exception:
+            _unregister_export_job(registry, config_template.id, targets, follow_up_task_id)
+            raise
+
+    return result
+
+
+@celery.task(bind=True)
+def export_config_template_batch(self, config_template_ids, targets, data_versions=None, job_id=None):
+    """
+    export all configurations of the given Config Templates to the export targets within a single task (part of a
+    project or appliance wide export). The Config Templates share the database session of the task and the compiled
+    templates of the worker process, the export of the other Config Templates continues if an export fails.
+    :param config_template_ids: list of Config Template IDs
+    :param targets: list of export target names (see `get_export_root_folder`)
+    :param data_versions: dictionary with the Config Template IDs (as string) and the version of the data when the
+                          export was requested, used to queue follow-up exports (see `request_configuration_export`)
+    :param job_id: ID of the task that finishes the export job (registered per Config Template and target)
+    :return: dictionary with the results of the Config Templates and the progress metadata of the batch
+    """
+    root_folders = [get_export_root_folder(target) for target in targets]
+    config_templates = ConfigTemplate.query.options(joinedload(ConfigTemplate.project)).filter(
+        ConfigTemplate.id.in_(config_template_ids)
+    ).order_by(ConfigTemplate.id).all()
+
+    total = db.session.query(func.count(TemplateValueSet.id)).filter(
+        TemplateValueSet.config_template_id.in_(config_template_ids)
+    ).scalar()
+    progress = ExportProgress(self, total)
+
+    result = {
+        "templates": {}
+    }
+    for config_template in config_templates:
+        try:
+            template_result = export_template_value_sets_to_directories(
+                config_template,
+                root_folders,
+                progress=progress
+            )
+            manifests = template_result.pop("manifests")
+            template_result["removed"] = 0
+            for root_folder, manifest in zip(root_folders, manifests):
+                template_result["removed"] += finalize_config_template_export(config_template, root_folder, manifest)
+
+            timestamp = datetime.datetime.now()
+            for target in targets:
+                if target in EXPORT_TARGETS:
+                    setattr(config_template, "last_successful_%s_export" % target, timestamp)
+            db.session.commit()
+
+            if data_versions:
+                follow_up = _queue_follow_up_export(
+                    config_template,
+                    targets,
+                    data_versions[str(config_template.id)],
+                    job_id
+                )
+                if follow_up:
+                    template_result["follow_up_task_id"] = follow_up.id
+
+        except (TemplateSyntaxException, Exception) as ex:
+            # the TemplateSyntaxException is derived from BaseException
+            db.session.rollback()
+            logger.error("failed to export %s to %s" % (repr(config_template), ", ".join(targets)), exc_info=True)
+            template_result = {"error": str(ex)}
+
+        # keys of JSON objects are strings
+        result["templates"][str(config_template.id)] = template_result
+
+    result.update(progress.get_meta())
+    return result
+
+
+@celery.task()
+def summarize_bulk_export(batch_results, targets):
+    """
+    chord callback of a project or appliance wide export, combines the results of all batches
+    :param batch_results: results of the `export_config_template_batch` tasks
+    :param targets: list of export target names
+    :return: dictionary with the total number of written, linked, copied, unchanged and removed configuration files,
+             the results of every Config Template and the IDs of the failed Config Templates
+    """
     # if the result contains a "error" key, the task is failed
-    result = {}
-    try:
-        config_template = ConfigTemplate.query.filter(ConfigTemplate.id == config_template_id).first_or_404()
+    result = {
+        "targets": targets,
+        "written": 0,
+        "linked": 0,
+        "copied": 0,
+        "unchanged": 0,
+        "removed": 0,
+        "render_seconds": 0.0,
+        "io_seconds": 0.0,
+        "templates": {},
+        "failed": []
+    }
+    for batch_result in batch_results:
+        for config_template_id, template_result in batch_result["templates"].items():
+            result["templates"][config_template_id] = template_result
+            if "error" in template_result:
+                result["failed"].append(int(config_template_id))
+                continue
 
-        for tvs in config_template.template_value_sets:
-            export_configuration_to_local_tftp(tvs)
+            for key in ("written", "linked", "copied", "unchanged", "removed", "render_seconds", "io_seconds"):
+                result[key] += template_result[key]
 
-        config_template.last_successful_tftp_export = datetime.datetime.now()
-        db.session.commit()
-        result["timestamp"] = config_template.last_successful_tftp_export.strftime('%Y/%m/%d %H:%M')
+    result["render_seconds"] = round(result["render_seconds"], 6)
+    result["io_seconds"] = round(result["io_seconds"], 6)
+    result["failed"].sort()
+    if result["failed"]:
+        result["error"] = "export of %d config templates failed" % len(result["failed"])
+
+    result["timestamp"] = datetime.datetime.now().strftime('%Y/%m/%d %H:%M')
+    return result
 
-    except Exception as ex:
-        logger.error("failed to update local TFTP configuration files", exc_info=True)
-        result["error"] = str(ex)
+
+def start_bulk_export(config_template_ids, targets, data_versions=None, task_id=None):
+    """
+    start the export of all configurations of the given Config Templates to the export targets. The Config Templates
+    are split into batches (see the `EXPORT_BULK_BATCH_SIZE` configuration value) that are queued with a lower
+    priority than the exports of single Config Templates (see `EXPORT_BULK_TASK_PRIORITY`), the summary is created by
+    the chord callback after all batches are finished.
+    :param config_template_ids: list of Config Template IDs
+    :param targets: list of export target names (see `get_export_root_folder`)
+    :param data_versions: dictionary with the Config Template IDs (as string) and the version of the exported data
+    :param task_id: ID of the summary task (generated if not set)
+    :return: AsyncResult of the summary task
+    """
+    # fail before any subtask is queued if a target is unknown
+    for target in targets:
+        get_export_root_folder(target)
+
+    config_template_ids = sorted(config_template_ids)
+    total = 0
+    if config_template_ids:
+        total = db.session.query(func.count(TemplateValueSet.id)).filter(
+            TemplateValueSet.config_template_id.in_(config_template_ids)
+        ).scalar()
+
+    task_id = task_id or uuid()
+    batch_size = app.config["EXPORT_BULK_BATCH_SIZE"]
+    priority = app.config["EXPORT_BULK_TASK_PRIORITY"]
+    batches = []
+    for i in range(0, len(config_template_ids), batch_size):
+        batch_ids = config_template_ids[i:i + batch_size]
+        batch_versions = None
+        if data_versions:
+            batch_versions = dict((str(ct_id), data_versions[str(ct_id)]) for ct_id in batch_ids)
+        batches.append(export_config_template_batch.s(batch_ids, targets, batch_versions, task_id).set(
+            task_id=uuid(),
+            priority=priority
+        ))
+    callback = summarize_bulk_export.s(targets).set(task_id=task_id, priority=priority)
+
+    # the summary task reports the combined progress of the batches until it is executed (see `get_export_progress`)
+    summarize_bulk_export.update_state(task_id=callback.options["task_id"], state=EXPORT_PROGRESS_STATE, meta={
+        "status": "queued %d configurations of %d config templates" % (total, len(config_template_ids)),
+        "total": total,
+        "started_at": time.time(),
+        "chunks": [batch.options["task_id"] for batch in batches]
+    })
+
+    if not batches:
+        return callback.apply_async(([],))
+
+    return chord(batches)(callback)
+
+
+def _request_bulk_export(scope, config_templates, targets):
+    """
+    start a project or appliance wide export, a request is attached to the running export job of the same scope and
+    targets. The job is registered per Config Template and target like the exports of single Config Templates (see
+    `request_configuration_export`), Config Templates with a queued or running export job for all targets are skipped.
+    :param scope:
+    :param config_templates: list of Config Templates
+    :param targets:
+    :return: AsyncResult of the new or the running export job
+    """
+    registry = get_export_job_registry()
+    key = get_bulk_export_job_key(scope, targets)
+
+    with registry.lock(key):
+        job = registry.get(key)
+        if job and _is_running(job["task_id"]):
+            logger.info("export request for %s attached to running job %s" % (key, job["task_id"]))
+            return celery.AsyncResult(job["task_id"])
+
+        # the job is registered before it is queued, the batches may be executed before this function returns
+        task_id = uuid()
+        registered_targets = {}
+        data_versions = {}
+        for config_template in config_templates:
+            with registry.lock(get_export_job_lock_key(config_template.id)):
+                pending_targets = [
+                    target for target in targets
+                    if _get_running_export_job(registry, config_template.id, target) is None
+                ]
+                if not pending_targets:
+                    logger.info("%s skipped within %s, export job already running" % (repr(config_template), key))
+                    continue
+
+                data_version = get_export_data_version(config_template)
+                _register_export_job(registry, config_template.id, pending_targets, task_id, data_version)
+                registered_targets[config_template.id] = pending_targets
+                data_versions[str(config_template.id)] = data_version
+
+        try:
+            result = start_bulk_export(list(registered_targets.keys()), targets, data_versions, task_id=task_id)
+
+        except Exception:
+            for config_template_id, pending_targets in registered_targets.items():
+                with registry.lock(get_export_job_lock_key(config_template_id)):
+                    _unregister_export_job(registry, config_template_id, pending_targets, task_id)
+            raise
+
+        registry.set(key, {"task_id": result.id}, app.config["EXPORT_JOB_TIMEOUT"])
 
     return result
+
+
+def request_project_export(project_id, targets):
+    """
+    request the export of all Config Templates of the Project to the export targets
+    :param project_id:
+    :param targets: list of export target names (see `get_export_root_folder`)
+    :return: AsyncResult of the new or the running export job
+    """
+    project = Project.query.filter(Project.id == project_id).first_or_404()
+    config_templates = ConfigTemplate.query.filter(ConfigTemplate.project_id == project.id).all()
+    return _request_bulk_export("project-%d" % project.id, config_templates, targets)
+
+
+def request_appliance_export(targets):
+    """
+    request the export of all Config Templates of the appliance to the export targets
+    :param targets: list of export target names (see `get_export_root_folder`)
+    :return: AsyncResult of the new or the running export job
+    """
+    return _request_bulk_export("appliance", ConfigTemplate.query.all(), targets)
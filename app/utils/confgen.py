@@ -1,20 +1,49 @@
 """
 Mako based Configuration Generator
 """
+import ast
+import builtins
+import hashlib
+import io
+import json
 import logging
+import os
 import re
+import threading
+from collections import OrderedDict
 
-from mako.exceptions import CompileException, SyntaxException
+from mako.exceptions import CompileException, SyntaxException, MakoException
+from mako.runtime import Context
 from mako.template import Template
 
 logger = logging.getLogger("confgen")
 
 """
-Do you want LF or CR/LF?
+line endings that can be used within the rendered configuration (configured per Config Template)
 """
+LINE_ENDINGS = {
+    "crlf": "\r\n",
+    "lf": "\n",
+}
 
-LF = False
+DEFAULT_LINE_ENDING = LINE_ENDINGS["crlf"]
 
+"""
+names that are provided by the mako runtime and are never template variables
+"""
+_NON_VARIABLE_NAMES = frozenset([
+    "context", "loop", "UNDEFINED", "STOP_RENDERING", "capture", "caller", "local", "self", "parent", "next",
+    "pageargs",
+])
+
+"""
+python builtins, a builtin name is only a template variable if it is not exclusively called (`${id}` is a variable,
+`${len(items)}` uses the builtin function)
+"""
+_BUILTIN_NAMES = frozenset(dir(builtins))
+
+# variable expression regular expression, used if the template cannot be parsed
+_variable_name_regex = r"(\$\{[ ]*(?P<name>[a-zA-Z0-9_]+)[ ]*\})"
 
 
 class TemplateSyntaxException(BaseException):
@@ -24,16 +53,358 @@ class TemplateSyntaxException(BaseException):
     pass
 
 
+def get_template_digest(template_string):
+    """create the SHA-256 hex digest of the given template content
+
+    :param template_string:
+    :return:
+    """
+    if template_string is None:
+        template_string = ""
+    return hashlib.sha256(template_string.encode("utf-8")).hexdigest()
+
+
+def get_values_digest(values):
+    """create the SHA-256 hex digest of the given variable values, the digest is independent of the order of the values
+
+    :param values: dictionary with the variable names and values
+    :return:
+    """
+    content = json.dumps(sorted(values.items()), ensure_ascii=False)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def _get_string_value(node):
+    # string literals are parsed as ast.Str before and as ast.Constant since python 3.8
+    value = getattr(node, "value", getattr(node, "s", None))
+    return value if isinstance(value, str) else None
+
+
+def get_template_variables(template):
+    """get the variables of a compiled template from the python module that mako generated for it (`Template.code`).
+    Every identifier that is used within the template but not declared within it is looked up in the context
+    (`name = context.get('name', UNDEFINED)`), e.g. within expressions (`${name}`), control lines (`% if name:`,
+    `% for x in name:`), python blocks and `<%def>` bodies. The arguments of the `<%page args="..."/>` declaration are
+    variables as well. Names of python builtins that are only called (e.g. `len(items)`) are not variables.
+
+    :param template: mako Template instance
+    :return: sorted list of variable names
+    """
+    names = set()
+    # names of python builtins that are used as value and not only as a function, e.g. `${id}` or `${type}`
+    builtin_values = set()
+    for node in ast.parse(template.code).body:
+        if not isinstance(node, ast.FunctionDef) or not node.name.startswith("render_"):
+            continue
+
+        if node.name == "render_body":
+            # the first argument is the context
+            names.update(arg.arg for arg in node.args.args[1:])
+
+        called_names = set()
+        for child in ast.walk(node):
+            if isinstance(child, ast.Call) and isinstance(child.func, ast.Attribute) and child.func.attr == "get" and \
+                    isinstance(child.func.value, ast.Name) and child.func.value.id == "context" and child.args:
+                name = _get_string_value(child.args[0])
+                if name is not None:
+                    names.add(name)
+
+            elif isinstance(child, ast.Call) and isinstance(child.func, ast.Name):
+                called_names.add(id(child.func))
+
+        for child in ast.walk(node):
+            if isinstance(child, ast.Name) and isinstance(child.ctx, ast.Load) and child.id in _BUILTIN_NAMES and \
+                    id(child) not in called_names:
+                builtin_values.add(child.id)
+
+    names.difference_update(_NON_VARIABLE_NAMES)
+    names.difference_update(_BUILTIN_NAMES.difference(builtin_values))
+    logger.debug("found variables %s" % ", ".join(sorted(names)))
+    return sorted(names)
+
+
+def discover_template_variables(template_string):
+    """discover the variables of the template (see `get_template_variables`). If the template cannot be compiled, only
+    the `${name}` expressions are used.
+
+    :param template_string:
+    :return: sorted list of variable names
+    """
+    if not template_string:
+        return []
+
+    try:
+        return get_template_variables(Template(template_string))
+
+    except MakoException:
+        # invalid template, the error is reported when the template is rendered
+        names = set(var[1] for var in re.findall(_variable_name_regex, template_string))
+        names.difference_update(_NON_VARIABLE_NAMES)
+        return sorted(names)
+
+
+class CompiledTemplateCache(object):
+    """
+    process-wide LRU cache for compiled Mako templates and the variables of the templates, keyed by the digest of the
+    template content
+
+    If a module directory is configured, the template source and the compiled Python module are stored on disk, which
+    allows a restarted worker to skip the compilation of the template.
+    """
+
+    def __init__(self, max_size=128, module_directory=None):
+        self._lock = threading.Lock()
+        self._templates = OrderedDict()
+        self._variables = OrderedDict()
+        self.max_size = max_size
+        self.module_directory = module_directory
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def configure(self, max_size=None, module_directory=None):
+        """change the size of the cache and/or the module directory (drops all cached templates)
+
+        :param max_size: maximum number of compiled templates within the cache
+        :param module_directory: directory for the compiled template modules, None to keep them in memory only
+        :return:
+        """
+        with self._lock:
+            if max_size is not None:
+                self.max_size = max_size
+            self.module_directory = module_directory
+            self._templates.clear()
+            self._variables.clear()
+
+    def clear(self):
+        """drop all compiled templates and reset the counters
+
+        :return:
+        """
+        with self._lock:
+            self._templates.clear()
+            self._variables.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self):
+        """get the current cache statistics
+
+        :return: dictionary with the size, hit, miss and eviction counters
+        """
+        with self._lock:
+            return {
+                "size": len(self._templates),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _compile(self, template_string, digest):
+        if not self.module_directory:
+            return Template(template_string)
+
+        # store the template source using the digest as name, mako will reuse the compiled module on the next start
+        source_file = os.path.join(self.module_directory, "%s.mako" % digest)
+        if not os.path.exists(source_file):
+            os.makedirs(self.module_directory, exist_ok=True)
+            tmp_file = "%s.%d.tmp" % (source_file, os.getpid())
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                f.write(template_string)
+            os.replace(tmp_file, source_file)
+
+        return Template(
+            filename=source_file,
+            uri="%s.mako" % digest,
+            module_directory=self.module_directory,
+            input_encoding="utf-8"
+        )
+
+    def get_variables(self, template_string, digest=None):
+        """get the variables of the given template content, the variables are discovered on a cache miss
+
+        :param template_string:
+        :param digest: digest of the template content (calculated if not set)
+        :return: sorted list of variable names
+        """
+        if template_string is None:
+            template_string = ""
+        if digest is None:
+            digest = get_template_digest(template_string)
+
+        with self._lock:
+            variables = self._variables.get(digest)
+            if variables is not None:
+                self._variables.move_to_end(digest)
+                return variables
+
+        try:
+            # the variables are read from the compiled template that is used to render the template
+            variables = get_template_variables(self.get(template_string, digest)) if template_string else []
+
+        except MakoException:
+            variables = discover_template_variables(template_string)
+
+        with self._lock:
+            self._variables[digest] = variables
+            while len(self._variables) > self.max_size:
+                self._variables.popitem(last=False)
+
+        return variables
+
+    def get(self, template_string, digest=None):
+        """get the compiled template for the given template content, the template is compiled on a cache miss
+
+        :param template_string:
+        :param digest: digest of the template content (calculated if not set)
+        :return: mako Template instance
+        """
+        if template_string is None:
+            template_string = ""
+        if digest is None:
+            digest = get_template_digest(template_string)
+
+        with self._lock:
+            template = self._templates.get(digest)
+            if template is not None:
+                self._templates.move_to_end(digest)
+                self.hits += 1
+                return template
+            self.misses += 1
+
+        # compile outside of the lock, a concurrent miss for the same template is harmless
+        template = self._compile(template_string, digest)
+
+        with self._lock:
+            self._templates[digest] = template
+            self._templates.move_to_end(digest)
+            while len(self._templates) > self.max_size:
+                self._templates.popitem(last=False)
+                self.evictions += 1
+
+        return template
+
+
+"""
+compiled template cache that is shared within the process
+"""
+compiled_template_cache = CompiledTemplateCache()
+
+
+class RemoveBlankLinesStage(object):
+    """
+    post-processing stage that drops empty lines
+    """
+
+    def process(self, line):
+        if line == "":
+            return None
+        return line
+
+
+class StripTrailingWhitespaceStage(object):
+    """
+    post-processing stage that removes the trailing whitespace of every line
+    """
+
+    def process(self, line):
+        return line.rstrip()
+
+
+class ChecksumSink(object):
+    """
+    sink that encodes the output as UTF-8, forwards the bytes to the binary target (e.g. a `BytesIO` buffer, a file or
+    a ZIP member) and calculates a running SHA-256 checksum and the size (in bytes) of the output
+    """
+
+    def __init__(self, target):
+        self.target = target
+        self.size = 0
+        self._hash = hashlib.sha256()
+
+    @property
+    def checksum(self):
+        return self._hash.hexdigest()
+
+    def write(self, text):
+        data = text.encode("utf-8")
+        self._hash.update(data)
+        self.size += len(data)
+        self.target.write(data)
+
+
+class LinePostProcessor(object):
+    """
+    single-pass post-processing pipeline for the rendered output
+
+    The output of the template is received in arbitrary pieces and split into lines. Every line is passed through the
+    stages (an object with a `process(line)` method that returns the modified line or None to drop it) and written to
+    the target sink using the given line ending. Only the current (incomplete) line is buffered, the line ending after
+    the last line is omitted.
+    """
+
+    def __init__(self, target, stages=(), line_ending=DEFAULT_LINE_ENDING):
+        self.target = target
+        self.stages = list(stages)
+        self.line_ending = line_ending
+        self._partial = ""
+        self._pending_line_ending = False
+
+    def write(self, text):
+        if not text:
+            return
+
+        if self._partial:
+            text = self._partial + text
+            self._partial = ""
+
+        lines = text.splitlines(True)
+        last_line = lines.pop()
+        for line in lines:
+            self._process_line(line.splitlines()[0])
+
+        if last_line.endswith("\r") or last_line.splitlines()[0] == last_line:
+            # incomplete line (or a CR that may be followed by a LF), wait for more data
+            self._partial = last_line
+
+        else:
+            self._process_line(last_line.splitlines()[0])
+
+    def close(self):
+        """process the remaining data (must be called after the rendering)
+
+        :return:
+        """
+        if self._partial:
+            for line in self._partial.splitlines():
+                self._process_line(line)
+            self._partial = ""
+
+    def _process_line(self, line):
+        # the line ending of the previous line is only written if another line follows
+        if self._pending_line_ending:
+            self.target.write(self.line_ending)
+            self._pending_line_ending = False
+
+        for stage in self.stages:
+            line = stage.process(line)
+            if line is None:
+                return
+
+        self.target.write(line)
+        self._pending_line_ending = True
+
+
 class MakoConfigGenerator:
     """
     Config Generator that utilizes the Mako Template Engine
     """
 
-    # variable name regular expression
-    _variable_name_regex = r"(\$\{[ ]*(?P<name>[a-zA-Z0-9_]+)[ ]*\})"
-
     # template content
     _template_string = None
+    _template_digest = None
     _template_variable_dict = dict()
 
     @property
@@ -43,32 +414,32 @@ class MakoConfigGenerator:
     @template_string.setter
     def template_string(self, value):
         self._template_string = value
-        # clean list and parse data again
-        self._parse_variable_from_template_string()
+        self._template_digest = None
+        # clean the values of the previous template
+        self._template_variable_dict = dict()
+
+    @property
+    def template_digest(self):
+        if self._template_digest is None:
+            self._template_digest = get_template_digest(self.template_string)
+        return self._template_digest
 
     @property
     def template_variables(self):
-        return sorted(list(self._template_variable_dict.keys()))
+        """variables of the template (discovered on first access and cached per template digest) and all variables
+        that are set on the generator
+        """
+        variables = set(compiled_template_cache.get_variables(self.template_string, self.template_digest))
+        return sorted(variables.union(self._template_variable_dict.keys()))
 
-    def __init__(self, template_string=""):
+    def __init__(self, template_string="", line_ending=DEFAULT_LINE_ENDING, strip_trailing_whitespace=False):
         #if type(template_string) is not str:
         #    raise ValueError("template string must be a string type")
 
+        self.line_ending = line_ending
+        self.strip_trailing_whitespace = strip_trailing_whitespace
         self.template_string = template_string
 
-        self._parse_variable_from_template_string()
-
-    def _parse_variable_from_template_string(self):
-        """
-        populates the template_variables list with the variables that are found in the config template
-
-        """
-        self._template_variable_dict = dict()
-        if self.template_string:
-            for var in re.findall(self._variable_name_regex, self.template_string):
-                logger.debug("found variable %s" % var[1])
-                self.add_variable(var[1])
-
     def add_variable(self, variable):
         """create a variable with no value
 
@@ -92,6 +463,8 @@ class MakoConfigGenerator:
         :param variable:
         :return:
         """
+        if variable not in self._template_variable_dict and variable in self.template_variables:
+            return ""
         return self._template_variable_dict[variable]
 
     def get_rendered_result(self, remove_empty_lines=True):
@@ -100,8 +473,63 @@ class MakoConfigGenerator:
         :param remove_empty_lines: true, if blank lines should be removed
         :return:
         """
+        return self.render(self._template_variable_dict, remove_empty_lines=remove_empty_lines)
+
+    def render(self, values, remove_empty_lines=True):
+        """render the template with the given values, variables of the template that are not contained in the values
+        are rendered as an empty string. The values of the generator instance are not modified, therefore a single
+        instance can be used to render multiple value sets.
+
+        :param values: dictionary with the variable names and values
+        :param remove_empty_lines: true, if blank lines should be removed
+        :return:
+        """
+        result = io.StringIO()
+        self.render_to_sink(values, result, remove_empty_lines=remove_empty_lines)
+        return result.getvalue()
+
+    def get_post_processing_stages(self, remove_empty_lines=True):
+        """get the post-processing stages that are applied to every line of the rendered output
+
+        :param remove_empty_lines: true, if blank lines should be removed
+        :return:
+        """
+        stages = []
+        # the trailing whitespace is removed first, therefore lines that contain only whitespace are blank lines
+        if self.strip_trailing_whitespace:
+            stages.append(StripTrailingWhitespaceStage())
+        if remove_empty_lines:
+            stages.append(RemoveBlankLinesStage())
+        return stages
+
+    def render_to_sink(self, values, sink, remove_empty_lines=True):
+        """render the template with the given values into the sink (any object with a `write(text)` method, e.g. a
+        text file, a `ChecksumSink` or a `io.TextIOWrapper` around a ZIP member). The output is post-processed line by
+        line while it is rendered.
+
+        :param values: dictionary with the variable names and values
+        :param sink: target for the rendered output
+        :param remove_empty_lines: true, if blank lines should be removed
+        :return:
+        """
+        # the variables of the template are cached with the compiled template, no parsing is required at this point
+        variables = dict.fromkeys(
+            compiled_template_cache.get_variables(self.template_string, self.template_digest),
+            ""
+        )
+        variables.update(values)
+
+        processor = LinePostProcessor(
+            sink,
+            stages=self.get_post_processing_stages(remove_empty_lines),
+            line_ending=self.line_ending
+        )
+
         try:
-            result = Template(self.template_string).render(**self._template_variable_dict)
+            template = compiled_template_cache.get(self.template_string, self.template_digest)
+            # the values are also passed as keyword arguments, otherwise the arguments of a `<%page args="..."/>`
+            # declaration are rendered with their default value
+            template.render_context(Context(processor, **variables), **variables)
 
         except SyntaxException as ex:
             msg = "Template Syntax error: %s" % str(ex)
@@ -123,20 +551,4 @@ class MakoConfigGenerator:
             logger.error(msg, exc_info=True)
             raise TemplateSyntaxException(msg)
 
-        # remove empty lines
-        if remove_empty_lines:
-            lines = result.splitlines()
-            result = ""
-            counter = 1
-            for line in lines:
-                if line != "":
-                    result += line
-                    if len(lines) != counter:
-                        # do you want LF or LF/CR?
-                        if LF:
-                             result += "\n"
-                        else:
-                             result += "\r\n"
-                counter += 1
-
-        return result
+        processor.close()
@@ -0,0 +1,270 @@
+"""
+CSV import of Template Value Sets
+"""
+import csv
+import logging
+from collections import OrderedDict
+from sqlalchemy import bindparam
+from app import app, db
+from app.models import TemplateValueSet, TemplateValue, RenderedConfiguration
+from app.utils.database import serialized_write
+
+logger = logging.getLogger("confgen")
+
+# maximum number of parameters within a single IN clause (SQLite limits the number of variables per statement)
+_IN_CLAUSE_SIZE = 500
+
+# maximum number of row errors that are stored within the import report
+MAX_REPORTED_ERRORS = 100
+
+
+def _chunks(items, size):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _get_template_value_set_ids(config_template, hostnames):
+    """get the IDs of the Template Value Sets with the given hostnames within the Config Template
+
+    :param config_template:
+    :param hostnames:
+    :return: dictionary with the hostnames as keys and the IDs as values
+    """
+    result = {}
+    for chunk in _chunks(hostnames, _IN_CLAUSE_SIZE):
+        result.update(db.session.query(TemplateValueSet.hostname, TemplateValueSet.id).filter(
+            TemplateValueSet.config_template_id == config_template.id,
+            TemplateValueSet.hostname.in_(chunk)
+        ))
+    return result
+
+
+def _get_template_values(template_value_set_ids):
+    """get the existing Template Values of the given Template Value Sets
+
+    :param template_value_set_ids:
+    :return: dictionary with the Template Value Set IDs as keys and dictionaries with the variable names and
+             (id, value) tuples as values
+    """
+    result = dict((tvs_id, {}) for tvs_id in template_value_set_ids)
+    for chunk in _chunks(template_value_set_ids, _IN_CLAUSE_SIZE):
+        query = db.session.query(
+            TemplateValue.template_value_set_id,
+            TemplateValue.var_name_slug,
+            TemplateValue.id,
+            TemplateValue.value
+        ).filter(TemplateValue.template_value_set_id.in_(chunk))
+        for tvs_id, var_name, value_id, value in query:
+            result[tvs_id][var_name] = (value_id, value)
+    return result
+
+
+def _import_batch(config_template, variable_names, batch, template_value_set_ids, report):
+    """write a batch of CSV rows to the database using bulk statements and commit it (the write transactions of all
+    workers are serialized)
+
+    :param config_template:
+    :param variable_names: names of all Template Variables of the Config Template
+    :param batch: dictionary with the hostnames as keys and the values of the CSV rows as values
+    :param template_value_set_ids: dictionary with the hostnames and IDs of the existing Template Value Sets (updated
+                                   with the created Template Value Sets)
+    :param report: import report
+    :return:
+    """
+    with serialized_write:
+        # the hostnames that were not found before the import are resolved again while the write lock is held,
+        # otherwise a concurrent import creates the same Template Value Sets
+        unknown_hostnames = [hostname for hostname in batch.keys() if hostname not in template_value_set_ids]
+        if unknown_hostnames:
+            template_value_set_ids.update(_get_template_value_set_ids(config_template, unknown_hostnames))
+
+        new_hostnames = [hostname for hostname in batch.keys() if hostname not in template_value_set_ids]
+        new_values = {}
+        for hostname in new_hostnames:
+            # all variables of the Config Template are copied to a new Template Value Set
+            new_values[hostname] = dict(
+                (var_name, hostname if var_name == "hostname" else batch[hostname].get(var_name, ""))
+                for var_name in variable_names
+            )
+
+        if new_hostnames:
+            rows = []
+            for hostname in new_hostnames:
+                row = TemplateValueSet.create_values_snapshot(new_values[hostname])
+                row["hostname"] = hostname
+                row["config_template_id"] = config_template.id
+                rows.append(row)
+            db.session.execute(TemplateValueSet.__table__.insert(), rows)
+            template_value_set_ids.update(_get_template_value_set_ids(config_template, new_hostnames))
+
+        existing_ids = [template_value_set_ids[hostname] for hostname in batch.keys() if hostname not in new_hostnames]
+        existing_values = _get_template_values(existing_ids)
+
+        inserts = []
+        updates = []
+        snapshot_updates = []
+        changed_ids = []
+        for hostname, values in batch.items():
+            tvs_id = template_value_set_ids[hostname]
+
+            if hostname in new_hostnames:
+                for var_name, value in new_values[hostname].items():
+                    inserts.append({"var_name_slug": var_name, "value": value, "template_value_set_id": tvs_id})
+                report["created"] += 1
+                continue
+
+            current_values = existing_values[tvs_id]
+            changed = False
+            for var_name, value in values.items():
+                current = current_values.get(var_name)
+                if current is None:
+                    inserts.append({"var_name_slug": var_name, "value": value, "template_value_set_id": tvs_id})
+                    changed = True
+
+                elif current[1] != value:
+                    updates.append({"_id": current[0], "_value": value})
+                    changed = True
+
+            if changed:
+                merged_values = dict((var_name, current[1]) for var_name, current in current_values.items())
+                merged_values.update(values)
+                snapshot = TemplateValueSet.create_values_snapshot(merged_values)
+                snapshot_updates.append({
+                    "_id": tvs_id,
+                    "_values_json": snapshot["values_json"],
+                    "_values_digest": snapshot["values_digest"]
+                })
+                changed_ids.append(tvs_id)
+                report["updated"] += 1
+
+            else:
+                report["unchanged"] += 1
+
+        if inserts:
+            db.session.execute(TemplateValue.__table__.insert(), inserts)
+
+        if updates:
+            db.session.execute(
+                TemplateValue.__table__.update().where(
+                    TemplateValue.__table__.c.id == bindparam("_id")
+                ).values(value=bindparam("_value")),
+                updates
+            )
+
+        if snapshot_updates:
+            db.session.execute(
+                TemplateValueSet.__table__.update().where(
+                    TemplateValueSet.__table__.c.id == bindparam("_id")
+                ).values(values_json=bindparam("_values_json"), values_digest=bindparam("_values_digest")),
+                snapshot_updates
+            )
+
+        for chunk in _chunks(changed_ids, _IN_CLAUSE_SIZE):
+            RenderedConfiguration.query.filter(
+                RenderedConfiguration.template_value_set_id.in_(chunk)
+            ).delete(synchronize_session=False)
+
+        db.session.commit()
+
+
+def import_template_value_sets_from_csv(config_template, csv_file, delimiter=";", batch_size=None):
+    """import Template Value Sets from a CSV file. The file is read row by row, the first row must contain the
+    variable names (including the `hostname`). Existing Template Value Sets are updated, missing Template Value Sets
+    are created. Columns that are not defined as variables within the Config Template are ignored.
+
+    The changes are written using bulk statements and committed in batches (see the `CSV_IMPORT_BATCH_SIZE`
+    configuration value).
+
+    :param config_template:
+    :param csv_file: file-like object in text mode
+    :param delimiter:
+    :param batch_size: number of CSV rows per transaction
+    :return: dictionary with the number of processed rows, created, updated and unchanged Template Value Sets,
+             skipped rows and a list of error messages
+    """
+    if batch_size is None:
+        batch_size = app.config["CSV_IMPORT_BATCH_SIZE"]
+
+    report = {
+        "rows": 0,
+        "created": 0,
+        "updated": 0,
+        "unchanged": 0,
+        "skipped": 0,
+        "errors": []
+    }
+
+    def add_error(msg):
+        report["skipped"] += 1
+        if len(report["errors"]) < MAX_REPORTED_ERRORS:
+            report["errors"].append(msg)
+
+    reader = csv.DictReader(csv_file, delimiter=delimiter)
+    try:
+        fieldnames = reader.fieldnames
+
+    except csv.Error as ex:
+        report["errors"].append("Invalid CSV data in line %d: %s" % (reader.line_num, ex))
+        return report
+
+    except UnicodeDecodeError:
+        report["errors"].append("Invalid file encoding in line %d" % (reader.line_num + 1))
+        return report
+
+    if not fieldnames or "hostname" not in fieldnames:
+        report["errors"].append("No hostname column in CSV header found")
+        return report
+
+    # hostname is defined in every Template Value Set
+    variable_names = ["hostname"] + [
+        var.var_name for var in config_template.variables.all() if var.var_name != "hostname"
+    ]
+    columns = [var_name for var_name in variable_names if var_name in fieldnames and var_name != "hostname"]
+
+    template_value_set_ids = dict(db.session.query(TemplateValueSet.hostname, TemplateValueSet.id).filter(
+        TemplateValueSet.config_template_id == config_template.id
+    ))
+
+    batch = OrderedDict()
+    try:
+        for line in reader:
+            report["rows"] += 1
+            hostname = line["hostname"]
+            if hostname is None:
+                add_error("Invalid Hostname for Template Value Set in line %d" % reader.line_num)
+                continue
+
+            elif hostname == "":
+                add_error("No Hostname defined for Template Value Set in line %d" % reader.line_num)
+                continue
+
+            values = batch.setdefault(hostname, {})
+            for var_name in columns:
+                values[var_name] = line[var_name] or ""
+
+            if len(batch) >= batch_size:
+                _import_batch(config_template, variable_names, batch, template_value_set_ids, report)
+                batch = OrderedDict()
+
+        if batch:
+            _import_batch(config_template, variable_names, batch, template_value_set_ids, report)
+
+    except csv.Error as ex:
+        db.session.rollback()
+        report["errors"].append("Invalid CSV data in line %d: %s" % (reader.line_num, ex))
+
+    except UnicodeDecodeError:
+        # the line that can't be decoded is not counted by the reader
+        db.session.rollback()
+        report["errors"].append("Invalid file encoding in line %d" % (reader.line_num + 1))
+
+    except Exception:
+        db.session.rollback()
+        logger.error("CSV import for %s failed" % repr(config_template), exc_info=True)
+        raise
+
+    logger.info("CSV import for %s finished: %d created, %d updated, %d unchanged, %d skipped" % (
+        repr(config_template), report["created"], report["updated"], report["unchanged"], report["skipped"]
+    ))
+    return report
@@ -0,0 +1,129 @@
+"""
+database utilities (SQLite engine profile and serialization of write transactions)
+"""
+import logging
+import os
+import sqlite3
+import threading
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+try:
+    import fcntl
+
+except ImportError:
+    # file locks are not available, the writes are only serialized within the process
+    fcntl = None
+
+logger = logging.getLogger("confgen")
+
+# pragmas that are executed on every new SQLite connection (see `configure_sqlite_engine`)
+_sqlite_pragmas = {}
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in _sqlite_pragmas.items():
+            cursor.execute("PRAGMA %s = %s" % (name, value))
+
+    finally:
+        cursor.close()
+
+
+def configure_sqlite_engine(pragmas):
+    """execute the given pragmas on every new SQLite connection (e.g. `journal_mode`, `synchronous`, `mmap_size`,
+    `busy_timeout` and `cache_size`). Connections to other databases are not modified.
+
+    :param pragmas: dictionary with the pragma names and values
+    :return:
+    """
+    _sqlite_pragmas.clear()
+    _sqlite_pragmas.update(pragmas)
+
+    if not event.contains(Engine, "connect", _set_sqlite_pragmas):
+        event.listen(Engine, "connect", _set_sqlite_pragmas)
+
+
+def get_sqlite_database_file(database_uri):
+    """get the path of the SQLite database file from the database URI
+
+    :param database_uri:
+    :return: the path of the database file, None if it is not a file based SQLite database
+    """
+    prefix = "sqlite:///"
+    if not database_uri.startswith(prefix) or database_uri == prefix or ":memory:" in database_uri:
+        return None
+
+    return database_uri[len(prefix):].split("?")[0]
+
+
+class SerializedWriteLock(object):
+    """
+    re-entrant lock that serializes the write transactions of all threads and processes that share a lock file
+
+    SQLite allows a single writer at a time. Bulk writers that acquire this lock around their write transactions wait
+    for each other instead of failing with "database is locked" errors. Within the WAL journal mode, readers don't
+    block behind the writers and don't need to acquire the lock.
+
+        with serialized_write:
+            ...
+            db.session.commit()
+
+    """
+
+    def __init__(self, lock_file=None):
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._file = None
+        self.lock_file = lock_file
+
+    def configure(self, lock_file):
+        """set the lock file that is shared between the processes, None to serialize the writes within the process only
+
+        :param lock_file:
+        :return:
+        """
+        with self._lock:
+            self.lock_file = lock_file
+
+    def acquire(self):
+        self._lock.acquire()
+        try:
+            if self._depth == 0 and self.lock_file and fcntl:
+                os.makedirs(os.path.dirname(os.path.abspath(self.lock_file)), exist_ok=True)
+                self._file = open(self.lock_file, "a")
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+            self._depth += 1
+
+        except:
+            if self._file:
+                self._file.close()
+                self._file = None
+            self._lock.release()
+            raise
+
+    def release(self):
+        try:
+            self._depth -= 1
+            if self._depth == 0 and self._file:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+                self._file.close()
+                self._file = None
+
+        finally:
+            self._lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+
+serialized_write = SerializedWriteLock()
+
@@ -1,14 +1,44 @@
 """
 export utility functions
 """
+import csv
+import io
+import json
 import logging
 import os
+import shutil
+import sys
+import threading
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
-from app.models import TemplateValueSet
+from app.models import ConfigTemplate, TemplateValueSet
+from app.utils.confgen import ChecksumSink
 from app import app
 
+try:
+    import fcntl
+
+except ImportError:
+    # reflinks are not available, the exported files are hardlinked or copied
+    fcntl = None
+
 logger = logging.getLogger("confgen")
 
+# name of the manifest file within each export directory, contains the digest of every exported configuration
+EXPORT_MANIFEST_FILE = ".export_manifest.json"
+
+# export targets and the configuration values that contain their root directories
+EXPORT_TARGETS = {
+    "ftp": "FTP_DIRECTORY",
+    "tftp": "TFTP_DIRECTORY"
+}
+
+# ioctl request of the Linux FICLONE operation (copy-on-write clone of a file)
+_FICLONE = 0x40049409
+
 
 def get_appliance_ftp_password():
     """
@@ -26,7 +56,89 @@ def get_appliance_ftp_password():
         return "(not defined)"
 
 
-def export_configuration_to_file_system(template_value_set, root_folder):
+class _ZipStreamBuffer(io.RawIOBase):
+    """
+    write-only, non-seekable file object that collects the output of a ZipFile until it is drained. Because the
+    buffer is not seekable, the ZipFile writes a data descriptor after each member instead of seeking back to the
+    local file header.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_zip_archive(files):
+    """
+    create a ZIP archive from the given files as a stream of byte chunks, every member is rendered directly into the
+    compressed ZIP member and emitted as soon as it is available, therefore the memory usage is independent of the
+    number and the size of the files
+
+    :param files: iterable of (file_name, render) tuples, `render(sink)` writes the content as text into the sink (see
+                  `ConfigTemplate.iter_renderers`)
+    :return: generator of bytes
+    """
+    buffer = _ZipStreamBuffer()
+    date_time = time.localtime(time.time())[:6]
+
+    with zipfile.ZipFile(buffer, "w") as zf:
+        for file_name, render in files:
+            data = zipfile.ZipInfo(file_name, date_time=date_time)
+            data.compress_type = zipfile.ZIP_DEFLATED
+            # the line endings are created by the renderer and must not be translated
+            with io.TextIOWrapper(zf.open(data, "w"), encoding="utf-8", newline="") as member:
+                render(member)
+            yield buffer.drain()
+
+    # central directory
+    yield buffer.drain()
+
+
+def iter_template_values_as_csv(config_template, delimiter=";", buffer_size=65536):
+    """
+    create a CSV file with the values of all Template Value Sets of the Config Template as a stream of text chunks.
+    The first row contains the variable names (starting with the hostname), every following row contains the values of
+    a Template Value Set. The values are read using a single ordered query and pivoted while streaming.
+
+    :param config_template:
+    :param delimiter:
+    :param buffer_size: approximate size of the emitted text chunks
+    :return: generator of strings
+    """
+    # hostname is defined in every Template Value Set and must be located as first entry
+    variable_names = ["hostname"] + [
+        var.var_name for var in config_template.variables.all() if var.var_name != "hostname"
+    ]
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=delimiter, lineterminator="\n")
+    writer.writerow(variable_names)
+
+    for tvs_id, hostname, values in config_template.iter_template_values():
+        writer.writerow([hostname] + [values.get(var_name) or "" for var_name in variable_names[1:]])
+
+        if buffer.tell() >= buffer_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_configuration_to_file_system(template_value_set, root_folder, writer=None):
     """
     export a configuration from a template value set to the root directory with the following
     structure
@@ -35,25 +147,571 @@ def export_configuration_to_file_system(template_value_set, root_folder):
 
     :param template_value_set:
     :param root_folder:
+    :param writer: `BatchedFileWriter` that is used to write the file (default is a synchronous write)
     :return:
     """
     if type(template_value_set) is not TemplateValueSet:
         raise ValueError
 
-    project_dir = template_value_set.config_template.project.name_slug
-    template_directory = template_value_set.config_template.name_slug
-    file_name = template_value_set.hostname + "_config.txt"
+    write_configuration_to_file_system(
+        root_folder,
+        template_value_set.config_template,
+        template_value_set.hostname,
+        template_value_set.get_configuration_result(),
+        writer=writer
+    )
+
+
+def get_export_directory(root_folder, config_template):
+    """
+    get the export directory of the Config Template within the root directory (`/<project_name>/<config_template_name>`)
+
+    :param root_folder:
+    :param config_template:
+    :return:
+    """
+    return os.path.join(root_folder, config_template.project.name_slug, config_template.name_slug)
+
+
+def write_file_atomic(path, content):
+    """
+    write the content to a temporary file and move it to the given path afterwards, therefore readers never see a
+    partially written file
+
+    :param path:
+    :param content: string or bytes
+    :return:
+    """
+    tmp_path = "%s.%d.%d.tmp" % (path, os.getpid(), threading.get_ident())
+    try:
+        with open(tmp_path, "wb" if isinstance(content, bytes) else "w") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    except:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _reflink(source_path, path):
+    """
+    create a copy-on-write clone of the source file (Linux `FICLONE`, e.g. on Btrfs or XFS)
+
+    :param source_path:
+    :param path:
+    :return: True if the clone was created
+    """
+    if fcntl is None or not sys.platform.startswith("linux"):
+        return False
+
+    try:
+        with open(source_path, "rb") as src, open(path, "wb") as dst:
+            fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+        return True
+
+    except OSError:
+        if os.path.exists(path):
+            os.remove(path)
+        return False
+
+
+def link_file_atomic(source_path, path):
+    """
+    create the file at the given path with the content of the source file. The file is created as hardlink or reflink
+    if both files are located on the same file system, otherwise the source file is copied. Like `write_file_atomic`,
+    the file is moved to the given path afterwards (the exported files are never modified in place, therefore hardlinks
+    are safe).
+
+    :param source_path:
+    :param path:
+    :return: "linked" or "copied"
+    """
+    tmp_path = "%s.%d.%d.tmp" % (path, os.getpid(), threading.get_ident())
+    try:
+        if os.path.lexists(tmp_path):
+            os.remove(tmp_path)
+
+        try:
+            os.link(source_path, tmp_path)
+            method = "linked"
+
+        except OSError:
+            if _reflink(source_path, tmp_path):
+                method = "linked"
+
+            else:
+                shutil.copyfile(source_path, tmp_path)
+                method = "copied"
+
+        os.replace(tmp_path, path)
+        return method
+
+    except:
+        if os.path.lexists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _fsync_path(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+
+    finally:
+        os.close(fd)
+
+
+class BatchedFileWriter(object):
+    """
+    writes the exported files within a bounded thread pool, therefore the rendering of the next configurations overlaps
+    with the disk I/O (e.g. on NFS backed export directories). Every destination directory is created once. If `fsync`
+    is enabled, the files and directories are synchronized to disk after every batch of `batch_size` files instead of
+    after every file.
+
+        with BatchedFileWriter() as writer:
+            writer.write(path, data, link_paths)
+
+    The number of written, linked and copied files and the I/O time of the worker threads (`io_seconds`) are counted
+    by the writer, `wait_seconds` is the time the caller was blocked because the pool was busy.
+    """
+
+    def __init__(self, max_workers=None, batch_size=None, fsync=None):
+        self.max_workers = max_workers or app.config["EXPORT_WRITER_THREADS"]
+        self.batch_size = batch_size or app.config["EXPORT_WRITER_BATCH_SIZE"]
+        self.fsync = app.config["EXPORT_WRITER_FSYNC"] if fsync is None else fsync
+
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        self._pending = deque()
+        self._lock = threading.Lock()
+        self._directories = set()
+        self._batch = []
+
+        self.written = 0
+        self.linked = 0
+        self.copied = 0
+        self.bytes_written = 0
+        self.io_seconds = 0.0
+        self.wait_seconds = 0.0
+
+    def _ensure_directory(self, path):
+        if path not in self._directories:
+            os.makedirs(path, exist_ok=True)
+            self._directories.add(path)
+
+    def _write(self, path, content, link_paths):
+        start_time = time.perf_counter()
+        write_file_atomic(path, content)
+        methods = [link_file_atomic(path, link_path) for link_path in link_paths]
+        elapsed = time.perf_counter() - start_time
+
+        with self._lock:
+            self.written += 1
+            self.bytes_written += len(content)
+            self.linked += methods.count("linked")
+            self.copied += methods.count("copied")
+            self.io_seconds += elapsed
+
+    def _link(self, source_path, link_paths):
+        start_time = time.perf_counter()
+        methods = [link_file_atomic(source_path, link_path) for link_path in link_paths]
+        elapsed = time.perf_counter() - start_time
+
+        with self._lock:
+            self.linked += methods.count("linked")
+            self.copied += methods.count("copied")
+            self.io_seconds += elapsed
+
+    def _submit(self, fn, *args):
+        self._pending.append(self._executor.submit(fn, *args))
+
+        # raise the exceptions of finished writes and wait if too many writes are pending
+        while self._pending and (self._pending[0].done() or len(self._pending) > self.max_workers * 4):
+            start_time = time.perf_counter()
+            self._pending.popleft().result()
+            self.wait_seconds += time.perf_counter() - start_time
+
+    def write(self, path, content, link_paths=()):
+        """
+        write the content to the given path (see `write_file_atomic`) and link the file to the other paths afterwards
+        (see `link_file_atomic`)
+
+        :param path:
+        :param content: bytes or string
+        :param link_paths: paths that should receive the same content
+        :return:
+        """
+        paths = [path] + list(link_paths)
+        for file_path in paths:
+            self._ensure_directory(os.path.dirname(file_path))
+
+        self._submit(self._write, path, content, list(link_paths))
+        self._add_to_batch(paths)
+
+    def link(self, source_path, link_paths):
+        """
+        link an existing file to the given paths (see `link_file_atomic`)
+
+        :param source_path:
+        :param link_paths:
+        :return:
+        """
+        for file_path in link_paths:
+            self._ensure_directory(os.path.dirname(file_path))
+
+        self._submit(self._link, source_path, list(link_paths))
+        self._add_to_batch(link_paths)
 
-    dest_dir = os.path.join(root_folder, project_dir, template_directory)
+    def _add_to_batch(self, paths):
+        if not self.fsync:
+            return
+
+        self._batch.extend(paths)
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """
+        wait until all pending writes are finished and synchronize the files of the current batch to disk (if `fsync`
+        is enabled)
+
+        :return:
+        """
+        start_time = time.perf_counter()
+        while self._pending:
+            self._pending.popleft().result()
+
+        if self._batch:
+            directories = set(os.path.dirname(path) for path in self._batch)
+            list(self._executor.map(_fsync_path, self._batch))
+            list(self._executor.map(_fsync_path, directories))
+            self._batch = []
+        self.wait_seconds += time.perf_counter() - start_time
+
+    def close(self):
+        try:
+            self.flush()
+
+        finally:
+            self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+
+        else:
+            # don't hide the original exception behind the errors of the pending writes
+            self._executor.shutdown(wait=True)
+
+
+def write_configuration_to_file_system(root_folder, config_template, hostname, config, writer=None):
+    """
+    write a rendered configuration to the root directory with the following structure
+
+        `/<project_name>/<config_template_name>/<hostname>_config.txt`
+
+    :param root_folder:
+    :param config_template:
+    :param hostname:
+    :param config:
+    :param writer: `BatchedFileWriter` that is used to write the file (default is a synchronous write)
+    :return:
+    """
+    file_name = hostname + "_config.txt"
+
+    dest_dir = get_export_directory(root_folder, config_template)
     logger.info("export configuration file to: %s/%s" % (dest_dir, file_name))
 
+    if writer:
+        writer.write(os.path.join(dest_dir, file_name), config.encode("utf-8"))
+        return
+
     # check that the destination directory exists
     if not os.path.exists(dest_dir):
         os.makedirs(dest_dir, exist_ok=True)
 
-    f = open(os.path.join(dest_dir, file_name), "w+")
-    f.write(template_value_set.get_configuration_result())
-    f.close()
+    write_file_atomic(os.path.join(dest_dir, file_name), config)
+
+
+def _read_export_manifest(manifest_file):
+    """
+    read the export manifest, an empty manifest is returned if the file doesn't exist or is invalid
+
+    :param manifest_file:
+    :return: dictionary with the file names as keys and dictionaries with the digest of the content and the cache key
+             of the configuration as values
+    """
+    if not os.path.exists(manifest_file):
+        return {}
+
+    try:
+        with open(manifest_file, "r") as f:
+            manifest = json.load(f)
+
+    except:
+        logger.warning("invalid export manifest %s, export all configurations" % manifest_file, exc_info=True)
+        return {}
+
+    # manifests of older versions contain only the digest of the content
+    for file_name, entry in manifest.items():
+        if not isinstance(entry, dict):
+            manifest[file_name] = {"digest": entry, "cache_key": None}
+
+    return manifest
+
+
+def get_export_root_folder(target):
+    """
+    get the root directory of the given export target, either a local FTP/TFTP directory (see `EXPORT_TARGETS`) or one
+    of the directories within the `EXPORT_DIRECTORIES` configuration value
+
+    :param target: name of the export target
+    :return:
+    """
+    if target in EXPORT_TARGETS:
+        return app.config[EXPORT_TARGETS[target]]
+
+    if target in app.config["EXPORT_DIRECTORIES"]:
+        return app.config["EXPORT_DIRECTORIES"][target]
+
+    raise ValueError("unknown export target: %s" % target)
+
+
+def export_template_value_sets_to_directories(config_template, root_folders, template_value_set_ids=None,
+                                              incremental=None, progress=None):
+    """
+    export the configurations of the given Template Value Sets of the Config Template to multiple root directories,
+    every configuration is rendered once. The configurations are written by a `BatchedFileWriter` to the first
+    directory that requires the file, all other directories receive a hardlink/reflink (or a copy if the directories
+    are located on different file systems).
+
+    The manifest files of the last export are only read, the returned manifest entries must be written using
+    `finalize_config_template_export` after all Template Value Sets are exported. Within the incremental mode,
+    configurations with an unchanged cache key (based on the digests of the template content and the values) are
+    neither rendered nor written and rendered configurations are only written if the content has changed.
+
+    :param config_template:
+    :param root_folders: list of root directories
+    :param template_value_set_ids: iterable of Template Value Set IDs that should be exported (default is all)
+    :param incremental: only render and write changed configurations (default is the `INCREMENTAL_EXPORT`
+                        configuration value)
+    :param progress: callable that is called with the hostname and the number of written bytes after every
+                     configuration
+    :return: dictionary with the number of written, linked, copied and unchanged configuration files, the render time,
+             the I/O time of the writer threads, the time the rendering waited for the writer and a list with the
+             manifest entries of every root directory
+    """
+    if type(config_template) is not ConfigTemplate:
+        raise ValueError
+
+    if incremental is None:
+        incremental = app.config["INCREMENTAL_EXPORT"]
+
+    dest_dirs = [get_export_directory(root_folder, config_template) for root_folder in root_folders]
+    last_manifests = []
+    existing_files = []
+    for dest_dir in dest_dirs:
+        os.makedirs(dest_dir, exist_ok=True)
+        last_manifests.append(_read_export_manifest(os.path.join(dest_dir, EXPORT_MANIFEST_FILE)))
+        # a single directory listing instead of a stat call per file
+        existing_files.append(set(os.listdir(dest_dir)))
+
+    manifests = [{} for _ in dest_dirs]
+    result = {
+        "written": 0,
+        "linked": 0,
+        "copied": 0,
+        "unchanged": 0,
+        "render_seconds": 0.0,
+        "io_seconds": 0.0,
+        "io_wait_seconds": 0.0,
+        "manifests": manifests
+    }
+
+    # skip the configurations that didn't change since the last export within all directories
+    cache_keys = {}
+    changed_ids = set()
+    for tvs_id, hostname, cache_key in config_template.iter_cache_keys(template_value_set_ids):
+        file_name = hostname + "_config.txt"
+        changed = False
+        for last_manifest, manifest, files in zip(last_manifests, manifests, existing_files):
+            last_entry = last_manifest.get(file_name)
+            if incremental and cache_key and last_entry and last_entry["cache_key"] == cache_key and \
+                    file_name in files:
+                manifest[file_name] = last_entry
+                result["unchanged"] += 1
+
+            else:
+                changed = True
+
+        if changed:
+            cache_keys[hostname] = cache_key
+            changed_ids.add(tvs_id)
+
+        elif progress:
+            progress(hostname, 0)
+
+    if not changed_ids:
+        return result
+
+    renderers = config_template.iter_renderers(template_value_set_ids=changed_ids)
+    with BatchedFileWriter() as writer:
+        while True:
+            # the render time includes the time to read the values
+            start_time = time.perf_counter()
+            item = next(renderers, None)
+            if item is None:
+                result["render_seconds"] += time.perf_counter() - start_time
+                break
+
+            # the configuration is encoded and hashed while it is rendered
+            hostname, render = item
+            sink = ChecksumSink(io.BytesIO())
+            render(sink)
+            result["render_seconds"] += time.perf_counter() - start_time
+
+            file_name = hostname + "_config.txt"
+            data = sink.target.getvalue()
+            digest = sink.checksum
+            entry = {"digest": digest, "cache_key": cache_keys.get(hostname)}
+
+            # an existing file with the same content is used as source of the links
+            source_path = None
+            file_paths = []
+            for dest_dir, last_manifest, manifest, files in zip(dest_dirs, last_manifests, manifests, existing_files):
+                if file_name in manifest:
+                    # skipped by the cache key
+                    if manifest[file_name]["digest"] == digest:
+                        source_path = source_path or os.path.join(dest_dir, file_name)
+                    continue
+
+                manifest[file_name] = entry
+                file_path = os.path.join(dest_dir, file_name)
+                last_entry = last_manifest.get(file_name)
+                if incremental and last_entry and last_entry["digest"] == digest and file_name in files:
+                    result["unchanged"] += 1
+                    source_path = source_path or file_path
+                    continue
+
+                file_paths.append(file_path)
+
+            bytes_written = 0
+            if file_paths and source_path is None:
+                writer.write(file_paths[0], data, file_paths[1:])
+                bytes_written = len(data)
+
+            elif file_paths:
+                writer.link(source_path, file_paths)
+
+            if progress:
+                progress(hostname, bytes_written)
+
+    result["written"] = writer.written
+    result["linked"] = writer.linked
+    result["copied"] = writer.copied
+    result["render_seconds"] = round(result["render_seconds"], 6)
+    result["io_seconds"] = round(writer.io_seconds, 6)
+    result["io_wait_seconds"] = round(writer.wait_seconds, 6)
+    return result
+
+
+def export_template_value_sets_to_file_system(config_template, root_folder, template_value_set_ids=None,
+                                              incremental=None, progress=None):
+    """
+    export the configurations of the given Template Value Sets of the Config Template to the root directory (see
+    `export_template_value_sets_to_directories`)
+
+    :param config_template:
+    :param root_folder:
+    :param template_value_set_ids: iterable of Template Value Set IDs that should be exported (default is all)
+    :param incremental: only render and write changed configurations (default is the `INCREMENTAL_EXPORT`
+                        configuration value)
+    :param progress: progress callable (see `export_template_value_sets_to_directories`)
+    :return: dictionary with the number of written and unchanged configuration files, the render and I/O times and the
+             manifest entries of the exported configurations
+    """
+    result = export_template_value_sets_to_directories(
+        config_template,
+        [root_folder],
+        template_value_set_ids=template_value_set_ids,
+        incremental=incremental,
+        progress=progress
+    )
+    return {
+        "written": result["written"],
+        "unchanged": result["unchanged"],
+        "render_seconds": result["render_seconds"],
+        "io_seconds": result["io_seconds"],
+        "io_wait_seconds": result["io_wait_seconds"],
+        "manifest": result["manifests"][0]
+    }
+
+
+def finalize_config_template_export(config_template, root_folder, manifest):
+    """
+    complete the export of the Config Template to the root directory: remove the configuration files that are not
+    part of the given manifest (e.g. of deleted Template Value Sets) and replace the manifest file
+
+    :param config_template:
+    :param root_folder:
+    :param manifest: merged manifest entries of all exported Template Value Sets
+    :return: number of removed configuration files
+    """
+    dest_dir = get_export_directory(root_folder, config_template)
+    os.makedirs(dest_dir, exist_ok=True)
+
+    manifest_file = os.path.join(dest_dir, EXPORT_MANIFEST_FILE)
+    last_manifest = _read_export_manifest(manifest_file)
+
+    removed = 0
+    for file_name in set(last_manifest.keys()) - set(manifest.keys()):
+        file_path = os.path.join(dest_dir, file_name)
+        if os.path.exists(file_path):
+            os.remove(file_path)
+            removed += 1
+
+    write_file_atomic(manifest_file, json.dumps(manifest, indent=0, sort_keys=True))
+    return removed
+
+
+def export_config_template_to_file_system(config_template, root_folder, incremental=None, progress=None):
+    """
+    export the configurations of all Template Value Sets of the Config Template to the root directory within the
+    current process (see `export_template_value_sets_to_file_system`)
+
+    The digest of every exported configuration and the cache key of the rendered configuration are stored in a
+    manifest file within the export directory. Configuration files of deleted Template Value Sets are removed.
+
+    :param config_template:
+    :param root_folder:
+    :param incremental: only render and write changed configurations (default is the `INCREMENTAL_EXPORT`
+                        configuration value)
+    :param progress: progress callable (see `export_template_value_sets_to_file_system`)
+    :return: dictionary with the number of written, unchanged and removed configuration files
+    """
+    if type(config_template) is not ConfigTemplate:
+        raise ValueError
+
+    dest_dir = get_export_directory(root_folder, config_template)
+    logger.info("export configuration files to: %s" % dest_dir)
+
+    result = export_template_value_sets_to_file_system(
+        config_template,
+        root_folder,
+        incremental=incremental,
+        progress=progress
+    )
+    manifest = result.pop("manifest")
+    result["removed"] = finalize_config_template_export(config_template, root_folder, manifest)
+
+    logger.info("export to %s finished: %d written, %d unchanged, %d removed (render %.3fs, I/O %.3fs)" % (
+        dest_dir, result["written"], result["unchanged"], result["removed"], result["render_seconds"],
+        result["io_seconds"]
+    ))
+    return result
 
 
 def export_configuration_to_local_ftp(template_value_set):
@@ -0,0 +1,182 @@
+"""
+registry of the running export jobs, used to coalesce duplicate export requests per Config Template and target
+"""
+import hashlib
+import json
+import threading
+import time
+import redis
+from app import app
+
+# prefix of the keys within the Redis database
+REDIS_KEY_PREFIX = "ncg:export_job:"
+
+_registry = None
+
+
+def get_export_job_key(config_template_id, target):
+    """
+    get the registry key of the export job of a Config Template and an export target (single and bulk export jobs are
+    registered per Config Template and target)
+
+    :param config_template_id:
+    :param target: export target name
+    :return:
+    """
+    return "%d:%s" % (config_template_id, target)
+
+
+def get_export_job_lock_key(config_template_id):
+    """
+    get the key of the lock that protects the registry entries of a Config Template
+
+    :param config_template_id:
+    :return:
+    """
+    return "%d" % config_template_id
+
+
+def get_bulk_export_job_key(scope, targets):
+    """
+    get the registry key of a project or appliance wide export job
+
+    :param scope: scope of the export job, e.g. `project-1` or `appliance`
+    :param targets: list of export target names
+    :return:
+    """
+    return "%s:%s" % (scope, ",".join(sorted(targets)))
+
+
+def get_export_data_version(config_template):
+    """
+    get a digest of the data that is exported for the Config Template (the cache keys of all Template Value Sets, see
+    `ConfigTemplate.iter_cache_keys`), the digest changes if the template content or any value changes
+
+    :param config_template:
+    :return:
+    """
+    digest = hashlib.sha256()
+    for tvs_id, hostname, cache_key in config_template.iter_cache_keys():
+        digest.update(("%d:%s:%s\n" % (tvs_id, hostname, cache_key or "")).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class InMemoryExportJobRegistry(object):
+    """
+    export job registry within the current process (e.g. for tests or a single process deployment with eager tasks)
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._jobs = {}
+
+    def lock(self, key):
+        """
+        get a lock for the given key that is used as context manager
+
+        :param key:
+        :return:
+        """
+        return self._lock
+
+    def get(self, key):
+        """
+        get the job that is registered for the given key
+
+        :param key:
+        :return: dictionary with the job data, None if no job is registered or the entry is expired
+        """
+        with self._lock:
+            entry = self._jobs.get(key)
+            if entry is None:
+                return None
+
+            job, expires = entry
+            if expires < time.time():
+                del self._jobs[key]
+                return None
+
+            return dict(job)
+
+    def set(self, key, job, timeout):
+        """
+        register the job for the given key
+
+        :param key:
+        :param job: JSON serializable dictionary with the job data
+        :param timeout: seconds until the entry expires
+        :return:
+        """
+        with self._lock:
+            self._jobs[key] = (dict(job), time.time() + timeout)
+
+    def delete(self, key):
+        with self._lock:
+            self._jobs.pop(key, None)
+
+
+class RedisExportJobRegistry(object):
+    """
+    export job registry within a Redis database that is shared by the web service and all celery workers
+    """
+
+    def __init__(self, url, lock_timeout=30):
+        self.client = redis.StrictRedis.from_url(url)
+        self.lock_timeout = lock_timeout
+
+    def lock(self, key):
+        return self.client.lock(
+            REDIS_KEY_PREFIX + "lock:" + key,
+            timeout=self.lock_timeout,
+            blocking_timeout=self.lock_timeout
+        )
+
+    def get(self, key):
+        value = self.client.get(REDIS_KEY_PREFIX + key)
+        if value is None:
+            return None
+
+        return json.loads(value.decode("utf-8"))
+
+    def set(self, key, job, timeout):
+        self.client.set(REDIS_KEY_PREFIX + key, json.dumps(job), ex=int(timeout))
+
+    def delete(self, key):
+        self.client.delete(REDIS_KEY_PREFIX + key)
+
+
+def create_export_job_registry(url):
+    """
+    create an export job registry from the given URL, `memory://` creates an `InMemoryExportJobRegistry`, all other
+    URLs are used as Redis connection URL
+
+    :param url:
+    :return:
+    """
+    if url.startswith("memory://"):
+        return InMemoryExportJobRegistry()
+
+    return RedisExportJobRegistry(url)
+
+
+def get_export_job_registry():
+    """
+    get the export job registry (see the `EXPORT_JOB_REGISTRY_URL` configuration value)
+
+    :return:
+    """
+    global _registry
+    if _registry is None:
+        _registry = create_export_job_registry(app.config["EXPORT_JOB_REGISTRY_URL"])
+    return _registry
+
+
+def set_export_job_registry(registry):
+    """
+    replace the export job registry (e.g. with an `InMemoryExportJobRegistry` within tests)
+
+    :param registry:
+    :return:
+    """
+    global _registry
+    _registry = registry
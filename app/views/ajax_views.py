@@ -3,7 +3,15 @@ from flask import request, jsonify, url_for
 from app import app
 from config import ROOT_URL
 from app.tasks import debug_celery_task
-from app.tasks import update_local_ftp_configurations, update_local_tftp_configurations
+from app.tasks import request_configuration_export, request_project_export, request_appliance_export
+
+
+def _get_export_targets():
+    """
+    get the export targets from the `target` form values, default is FTP and TFTP
+    :return:
+    """
+    return request.form.getlist('target') or ["ftp", "tftp"]
 
 
 @app.route(ROOT_URL + "debug/calculate_task", methods=['POST'])
@@ -27,7 +35,7 @@ def update_local_ftp_config_task(config_template_id):
     :param config_template_id:
     :return:
     """
-    task = update_local_ftp_configurations.delay(config_template_id)
+    task = request_configuration_export(config_template_id, ["ftp"])
 
     return jsonify({}), 202, {'Location': url_for('task_status_json', task_id=task.id)}
 
@@ -39,6 +47,56 @@ def update_local_tftp_config_task(config_template_id):
     :param config_template_id:
     :return:
     """
-    task = update_local_tftp_configurations.delay(config_template_id)
+    task = request_configuration_export(config_template_id, ["tftp"])
+
+    return jsonify({}), 202, {'Location': url_for('task_status_json', task_id=task.id)}
+
+
+@app.route(ROOT_URL + "export/template/<int:config_template_id>/local", methods=['POST'])
+def update_local_config_task(config_template_id):
+    """
+    used to trigger the update of the local files of multiple export targets for the given config template, every
+    configuration is rendered once (the targets are read from the `target` form values, default is FTP and TFTP)
+    :param config_template_id:
+    :return:
+    """
+    try:
+        task = request_configuration_export(config_template_id, _get_export_targets())
+
+    except ValueError as ex:
+        return jsonify({"error": str(ex)}), 400
+
+    return jsonify({}), 202, {'Location': url_for('task_status_json', task_id=task.id)}
+
+
+@app.route(ROOT_URL + "export/project/<int:project_id>/local", methods=['POST'])
+def update_local_project_config_task(project_id):
+    """
+    used to trigger the update of the local files of all config templates of the given project (the targets are read
+    from the `target` form values, default is FTP and TFTP)
+    :param project_id:
+    :return:
+    """
+    try:
+        task = request_project_export(project_id, _get_export_targets())
+
+    except ValueError as ex:
+        return jsonify({"error": str(ex)}), 400
+
+    return jsonify({}), 202, {'Location': url_for('task_status_json', task_id=task.id)}
+
+
+@app.route(ROOT_URL + "export/local", methods=['POST'])
+def update_local_appliance_config_task():
+    """
+    used to trigger the update of the local files of all config templates on the appliance (the targets are read from
+    the `target` form values, default is FTP and TFTP)
+    :return:
+    """
+    try:
+        task = request_appliance_export(_get_export_targets())
+
+    except ValueError as ex:
+        return jsonify({"error": str(ex)}), 400
 
     return jsonify({}), 202, {'Location': url_for('task_status_json', task_id=task.id)}
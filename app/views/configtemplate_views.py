@@ -1,17 +1,18 @@
 """
 views for the Config Template data object
 """
-import csv
+import codecs
 import logging
 import io
-from flask import render_template, url_for, redirect, request, flash, jsonify, session
+from flask import render_template, url_for, redirect, request, flash, jsonify, session, Response, stream_with_context
 from sqlalchemy.exc import IntegrityError
 from app import app, db
-from app.models import ConfigTemplate, Project, TemplateValueSet
+from app.models import ConfigTemplate, Project
 from app.forms import ConfigTemplateForm, EditConfigTemplateValuesForm
+from app.utils.csv_import import import_template_value_sets_from_csv
+from app.utils.export import iter_template_values_as_csv
 #from app.utils.appliance import get_local_ip_addresses, verify_appliance_status
 #from app.utils.export import get_appliance_ftp_password
-#from app.tasks import update_local_ftp_configurations, update_local_tftp_configurations
 from config import ROOT_URL
 
 logger = logging.getLogger()
@@ -29,12 +30,23 @@ def view_config_template(project_id, config_template_id):
         return render_template("login.html")
     else:
         parent_project = Project.query.filter(Project.id == project_id).first_or_404()
+        config_template = ConfigTemplate.query.filter(ConfigTemplate.id == config_template_id).first_or_404()
+
+        # precompute the value matrix, the template doesn't access the database
+        template_value_sets = []
+        template_values = {}
+        for tvs_id, hostname, values in config_template.iter_template_values():
+            template_value_sets.append({"id": tvs_id, "hostname": hostname})
+            template_values[tvs_id] = values
 
         return render_template(
-        "config_template/view_config_template.html",
-        project=parent_project,
-        config_template=ConfigTemplate.query.filter(ConfigTemplate.id == config_template_id).first_or_404()
-    )
+            "config_template/view_config_template.html",
+            project=parent_project,
+            config_template=config_template,
+            variables=config_template.variables.all(),
+            template_value_sets=template_value_sets,
+            template_values=template_values
+        )
 
 
 @app.route(ROOT_URL + "project/<int:project_id>/configtemplate/add", methods=["GET", "POST"])
@@ -57,6 +69,8 @@ def add_config_template(project_id):
                 config_template = ConfigTemplate(name="", project=parent_project)
 
                 config_template.name = form.name.data
+                config_template.line_ending = form.line_ending.data
+                config_template.strip_trailing_whitespace = form.strip_trailing_whitespace.data
                 config_template.template_content = form.template_content.data
                 config_template.project = parent_project
 
@@ -117,6 +131,8 @@ def edit_config_template(project_id, config_template_id):
                 flash("Config Template content changed, all Template Value Sets are deleted.", "warning")
 
             config_template.name = form.name.data
+            config_template.line_ending = form.line_ending.data
+            config_template.strip_trailing_whitespace = form.strip_trailing_whitespace.data
             config_template.template_content = form.template_content.data
             config_template.project = parent_project
 
@@ -163,7 +179,7 @@ def edit_config_template(project_id, config_template_id):
     methods=["GET", "POST"]
 )
 def edit_all_config_template_values(project_id, config_template_id):
-    """edit all Config Template Values based on a CSV textarea
+    """edit all Config Template Values based on a CSV textarea or an uploaded CSV file
 
     :param project_id:
     :param config_template_id:
@@ -174,72 +190,53 @@ def edit_all_config_template_values(project_id, config_template_id):
 
     form = EditConfigTemplateValuesForm(request.form, config_template)
 
-    # hostname is defined in every Template Value Set
-    variable_list = [
-        "hostname"
-    ]
-    for var in config_template.variables.all():
-        # hostname must be located as first entry
-        if var.var_name != "hostname":
-            variable_list.append(var.var_name)
-
     if form.validate_on_submit():
-        # update values from the CSV file
-        reader = csv.DictReader(io.StringIO(form.csv_content.data), delimiter=";")
-        csv_lines = form.csv_content.data.splitlines()
-        counter = 0
-        for line in reader:
-            if "hostname" in line.keys():
-                if line["hostname"] is None:
-                    flash("Invalid Hostname for Template Value Set: '%s'" % csv_lines[counter], "error")
-
-                elif line["hostname"] == "":
-                    flash("No Hostname defined for Template Value Set: '%s'" % form.csv_content.data.splitlines()[counter], "error")
+        # update values from the uploaded CSV file (read row by row) or from the CSV textarea
+        csv_file = request.files.get("csv_file")
+        if csv_file and csv_file.filename:
+            csv_data = codecs.iterdecode(csv_file.stream, "utf-8-sig")
 
-                else:
-                    # try to access an existing TemplateValueSet
-                    tvs = TemplateValueSet.query.filter(
-                        TemplateValueSet.config_template_id == config_template_id,
-                        TemplateValueSet.hostname == line["hostname"]
-                    ).first()
-                    if not tvs:
-                        # element not found, create and add a flush message
-                        tvs = TemplateValueSet(hostname=line["hostname"], config_template=config_template)
-                        flash("Create new Template Value Set for hostname <strong>%s</strong>" % line["hostname"], "success")
-
-                    # update variable values
-                    for var in variable_list:
-                        if var in line.keys():
-                            if line[var]:
-                                tvs.update_variable_value(var_name=var, value=line[var])
-
-                            else:
-                                tvs.update_variable_value(var_name=var, value="")
-                                logger.debug("Cannot find value for variable %s for TVS "
-                                             "object %s using CSV line %s" % (var, repr(tvs), line))
-            else:
-                # hostname not defined, no creation possible
-                flash("No hostname in CSV line found: %s" % line, "warning")
-            counter += 1
+        else:
+            csv_data = io.StringIO(form.csv_content.data, newline="")
+
+        report = import_template_value_sets_from_csv(config_template, csv_data)
+
+        flash("CSV import finished: %d Template Value Sets created, %d updated, %d unchanged, %d rows skipped" % (
+            report["created"], report["updated"], report["unchanged"], report["skipped"]
+        ), "success")
+        if report["errors"]:
+            flash("<br>".join(report["errors"][:10]), "warning")
 
         return redirect(url_for("view_config_template", project_id=project_id, config_template_id=config_template_id))
 
     else:
-        form.csv_content.data = ";".join(variable_list)
-        for tvs in config_template.template_value_sets.all():
-            values = []
-            for var in variable_list:
-                values.append(tvs.get_template_value_by_name_as_string(var))
-            form.csv_content.data += "\n" + ";".join(values)
+        form.csv_content.data = "".join(iter_template_values_as_csv(config_template))
 
     return render_template(
         "config_template/edit_all_config_template_values.html",
         project_id=project_id,
         config_template=config_template,
+        variables=config_template.variables.all(),
         form=form
     )
 
 
+@app.route(ROOT_URL + "project/<int:project_id>/configtemplate/<int:config_template_id>/download_values")
+def download_config_template_values_as_csv(project_id, config_template_id):
+    """download the values of all Template Value Sets of the Config Template as CSV file (same format as the CSV import)
+
+    :param project_id:
+    :param config_template_id:
+    :return:
+    """
+    Project.query.filter(Project.id == project_id).first_or_404()
+    config_template = ConfigTemplate.query.filter(ConfigTemplate.id == config_template_id).first_or_404()
+
+    response = Response(stream_with_context(iter_template_values_as_csv(config_template)), mimetype="text/csv")
+    response.headers["Content-Disposition"] = "attachment; filename=%s_values.csv" % config_template.name_slug
+    return response
+
+
 @app.route(ROOT_URL + "project/<int:project_id>/configtemplate/<int:config_template_id>/delete", methods=["GET", "POST"])
 def delete_config_template(project_id, config_template_id):
     """delete the Config Template
@@ -2,12 +2,10 @@
 views for the resulting configuration
 """
 import logging
-import zipfile
-from io import BytesIO
-import time
-from flask import render_template, make_response, send_file
+from flask import render_template, make_response, Response, stream_with_context
 from app import app
 from app.models import ConfigTemplate, TemplateValueSet, Project
+from app.utils.export import iter_zip_archive
 #from app.utils.appliance import get_local_ip_addresses
 #from app.utils.export import get_appliance_ftp_password
 from config import ROOT_URL
@@ -27,7 +25,7 @@ def view_config(config_template_id, template_value_set_id):
     template_value_set = TemplateValueSet.query.filter(TemplateValueSet.id == template_value_set_id).first_or_404()
 
     # generate configuration
-    config_result = template_value_set.get_configuration_result()
+    config_result = template_value_set.get_cached_configuration_result()
 
     return render_template(
         "configuration/view_configuration.html",
@@ -54,7 +52,7 @@ def download_config(config_template_id, template_value_set_id):
     template_value_set = TemplateValueSet.query.filter(TemplateValueSet.id == template_value_set_id).first_or_404()
 
     # generate configuration
-    config_result = template_value_set.get_configuration_result()
+    config_result = template_value_set.get_cached_configuration_result()
 
     response = make_response(config_result)
     response.headers["Content-Disposition"] = "attachment; filename=%s_config.txt" % template_value_set.hostname
@@ -72,14 +70,9 @@ def download_all_config_as_zip(project_id, config_template_id):
     Project.query.filter(Project.id == project_id).first_or_404()
     config_template = ConfigTemplate.query.filter(ConfigTemplate.id == config_template_id).first_or_404()
 
-    # generate ZIP archive with all configurations
-    memory_file = BytesIO()
-    with zipfile.ZipFile(memory_file, 'w') as zf:
-        for values in config_template.template_value_sets.all():
-            data = zipfile.ZipInfo(values.hostname + "_config.txt")
-            data.date_time = time.localtime(time.time())[:6]
-            data.compress_type = zipfile.ZIP_DEFLATED
-            zf.writestr(data, values.get_configuration_result())
-    memory_file.seek(0)
-
-    return send_file(memory_file, attachment_filename=config_template.name + "_configs.zip", as_attachment=True)
\ No newline at end of file
+    # stream the ZIP archive, every configuration is sent as soon as it is rendered
+    files = ((hostname + "_config.txt", render) for hostname, render in config_template.iter_renderers())
+
+    response = Response(stream_with_context(iter_zip_archive(files)), mimetype="application/zip")
+    response.headers["Content-Disposition"] = "attachment; filename=%s_configs.zip" % config_template.name_slug
+    return response
@@ -3,6 +3,7 @@ task queue views for the web service (mainly JSON endpoints for AJAX functions)
 """
 from flask import jsonify
 from app import app, celery
+from app.tasks import EXPORT_PROGRESS_STATE, get_export_progress
 from config import ROOT_URL
 
 
@@ -19,6 +20,11 @@ def task_status_json(task_id):
             'state': task.state,
             'status': 'Pending...'
         }
+    elif task.state == EXPORT_PROGRESS_STATE:
+        # running export task, contains the processed and total number of configurations, the written bytes, the
+        # throughput (configs_per_second), the ETA (eta_seconds) and the current hostname
+        response = get_export_progress(task.info)
+        response['state'] = task.state
     elif task.state != 'FAILURE':
         response = {
             'state': task.state,
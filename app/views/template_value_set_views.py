@@ -104,11 +104,13 @@ def edit_template_value_set(config_template_id, template_value_set_id):
             template_value_set.copy_variables_from_config_template()
 
             # update variable data
-            for key in template_value_set.get_template_value_names():
-                template_value_set.update_variable_value(var_name=key, value=request.form["edit_" + key])
+            values = dict(
+                (key, request.form["edit_" + key]) for key in template_value_set.get_template_value_names()
+            )
 
             # hostname is always the same as the name of the template value set
-            template_value_set.update_variable_value(var_name="hostname", value=template_value_set.hostname)
+            values["hostname"] = template_value_set.hostname
+            template_value_set.update_variable_values(values)
 
             db.session.add(template_value_set)
             db.session.commit()
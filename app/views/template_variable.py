@@ -5,6 +5,7 @@ import logging
 from flask import render_template, url_for, redirect, request, flash, abort
 from sqlalchemy.exc import IntegrityError
 from app import app, db
+from app.exception import TemplateVariableAlreadyExistsException
 from app.models import ConfigTemplate, TemplateVariable
 from app.forms import TemplateVariableForm
 from config import ROOT_URL
@@ -63,6 +64,11 @@ def edit_template_variable(config_template_id, template_variable_id):
             logger.error(msg, exc_info=True)
             db.session.rollback()
 
+        except TemplateVariableAlreadyExistsException:
+            msg = "Template variable name already in use, please use another one"
+            logger.error(msg, exc_info=True)
+            flash(msg, "error")
+
         except Exception:
             msg = "Template variable was not created  (unknown error, see log for details)"
             logger.error(msg, exc_info=True)
@@ -0,0 +1,11 @@
+"""
+benchmark suite for the render, import and export hot paths of the web service
+
+The benchmarks use a scratch SQLite database and scratch FTP/TFTP directories (see `config.BenchmarkConfig`), run
+them using the following command:
+
+    python3 -m benchmarks.run_benchmarks --value-sets 1000 --variables 20 --output benchmark_result.json
+
+The command exits with a non-zero status if a hot path exceeds its query limit (see `QUERY_LIMITS`).
+
+"""
@@ -0,0 +1,166 @@
+"""
+concurrency benchmark for the SQLite engine profile
+
+Multiple reader processes (rendering the `view_config_template` page) and writer processes (importing CSV batches)
+work on the same scratch database for a fixed duration. The throughput and the number of failed operations (e.g.
+"database is locked" errors) of both groups are written as JSON. Use `--no-profile` to run the benchmark without the
+SQLite pragmas and without the serialization of the write transactions.
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import tempfile
+import time
+
+# the benchmark uses a scratch database and scratch export directories
+SCRATCH_DIRECTORY = os.getenv("BENCHMARK_DIRECTORY") or tempfile.mkdtemp(prefix="ncg_benchmark_")
+os.environ["BENCHMARK_DIRECTORY"] = SCRATCH_DIRECTORY
+os.environ["APP_SETTINGS"] = "config.BenchmarkConfig"
+
+from app import app, db
+from app.models import ConfigTemplate
+from app.utils.csv_import import import_template_value_sets_from_csv
+from app.utils.database import configure_sqlite_engine, serialized_write
+from benchmarks.fleet import create_fleet
+
+
+def _reader(config_template_id, duration, results):
+    db.engine.dispose()
+    with app.app_context():
+        config_template = ConfigTemplate.query.get(config_template_id)
+        url = "/ncg/project/%d/template/%d" % (config_template.project.id, config_template_id)
+        db.session.remove()
+
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session["logged_in"] = True
+
+        operations = 0
+        errors = 0
+        latencies = []
+        end_time = time.perf_counter() + duration
+        while time.perf_counter() < end_time:
+            start_time = time.perf_counter()
+            try:
+                response = client.get(url)
+                if response.status_code == 200:
+                    operations += 1
+                else:
+                    errors += 1
+
+            except Exception:
+                db.session.rollback()
+                errors += 1
+            latencies.append(time.perf_counter() - start_time)
+
+    results.put(("reader", operations, errors, max(latencies) if latencies else 0))
+
+
+def _writer(config_template_id, duration, batch_rows, seed, results):
+    db.engine.dispose()
+    rnd = random.Random(seed)
+    with app.app_context():
+        config_template = ConfigTemplate.query.get(config_template_id)
+        hostnames = [hostname for tvs_id, hostname, values in config_template.iter_template_values()]
+        variable_names = sorted(v.var_name for v in config_template.variables.all() if v.var_name != "hostname")
+
+        operations = 0
+        errors = 0
+        latencies = []
+        end_time = time.perf_counter() + duration
+        while time.perf_counter() < end_time:
+            lines = [";".join(["hostname"] + variable_names)]
+            for hostname in rnd.sample(hostnames, min(batch_rows, len(hostnames))):
+                lines.append(";".join([hostname] + ["%08x" % rnd.getrandbits(32) for _ in variable_names]))
+
+            start_time = time.perf_counter()
+            try:
+                import_template_value_sets_from_csv(config_template, io.StringIO("\n".join(lines)))
+                operations += 1
+
+            except Exception:
+                db.session.rollback()
+                errors += 1
+            latencies.append(time.perf_counter() - start_time)
+
+    results.put(("writer", operations, errors, max(latencies) if latencies else 0))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="benchmark concurrent readers and writers on the SQLite database")
+    parser.add_argument("--value-sets", type=int, default=500, help="number of template value sets")
+    parser.add_argument("--variables", type=int, default=20, help="number of variables per template")
+    parser.add_argument("--readers", type=int, default=4, help="number of reader processes")
+    parser.add_argument("--writers", type=int, default=2, help="number of writer processes")
+    parser.add_argument("--batch-rows", type=int, default=50, help="number of CSV rows per write operation")
+    parser.add_argument("--duration", type=float, default=10.0, help="duration of the benchmark in seconds")
+    parser.add_argument("--no-profile", action="store_true",
+                        help="disable the SQLite pragmas and the serialization of the write transactions")
+    parser.add_argument("--output", default=None, help="JSON output file (default is stdout)")
+    args = parser.parse_args(argv)
+
+    if args.no_profile:
+        configure_sqlite_engine({"journal_mode": "DELETE"})
+        serialized_write.configure(None)
+
+    with app.app_context():
+        db.create_all()
+        config_template_id = create_fleet(1, 1, args.value_sets, args.variables)[0]
+        db.session.remove()
+    db.engine.dispose()
+
+    ctx = multiprocessing.get_context("fork")
+    results = ctx.Queue()
+    processes = [ctx.Process(target=_reader, args=(config_template_id, args.duration, results))
+                 for _ in range(args.readers)]
+    processes += [ctx.Process(target=_writer, args=(config_template_id, args.duration, args.batch_rows, i, results))
+                  for i in range(args.writers)]
+
+    for process in processes:
+        process.start()
+    collected = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    summary = {}
+    for role in ("reader", "writer"):
+        role_results = [r for r in collected if r[0] == role]
+        operations = sum(r[1] for r in role_results)
+        summary[role + "s"] = {
+            "processes": len(role_results),
+            "operations": operations,
+            "operations_per_second": round(operations / args.duration, 3),
+            "errors": sum(r[2] for r in role_results),
+            "max_latency_seconds": round(max([r[3] for r in role_results] or [0]), 6)
+        }
+
+    report = {
+        "python": platform.python_version(),
+        "profile": not args.no_profile,
+        "parameters": {
+            "value_sets": args.value_sets,
+            "variables": args.variables,
+            "batch_rows": args.batch_rows,
+            "duration": args.duration,
+        },
+        "results": summary
+    }
+
+    output = json.dumps(report, indent=4)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+    shutil.rmtree(SCRATCH_DIRECTORY, ignore_errors=True)
+    return report
+
+
+if __name__ == "__main__":
+    main()
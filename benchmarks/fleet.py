@@ -0,0 +1,85 @@
+"""
+synthetic fleet data generator for the benchmark suite
+"""
+from app import db
+from app.models import Project, ConfigTemplate, TemplateValueSet, TemplateValue
+
+
+def create_template_content(variable_count):
+    """create a configuration template that uses the given number of variables (plus the hostname)
+
+    :param variable_count:
+    :return:
+    """
+    lines = [
+        "hostname ${hostname}",
+        "!",
+    ]
+    for i in range(variable_count):
+        lines.append("interface GigabitEthernet0/%d" % i)
+        lines.append(" description ${var_%d}" % i)
+        lines.append(" no shutdown")
+        lines.append("!")
+    lines.append("% if var_0:")
+    lines.append("snmp-server location ${var_0}")
+    lines.append("% endif")
+    lines.append("end")
+    return "\n".join(lines) + "\n"
+
+
+def create_fleet(projects=1, templates=1, value_sets=100, variables=10):
+    """create a synthetic fleet in the database. The Template Value Sets and Template Values are created using bulk
+    inserts to keep the setup time low.
+
+    :param projects: number of Projects
+    :param templates: number of Config Templates per Project
+    :param value_sets: number of Template Value Sets per Config Template
+    :param variables: number of variables per Config Template (excluding the hostname)
+    :return: list of the created Config Template IDs
+    """
+    template_content = create_template_content(variables)
+    variable_names = ["hostname"] + ["var_%d" % i for i in range(variables)]
+    config_template_ids = []
+
+    for p in range(projects):
+        project = Project(name="benchmark project %d" % p)
+        db.session.add(project)
+        db.session.commit()
+
+        for t in range(templates):
+            config_template = ConfigTemplate(
+                name="benchmark template %d" % t,
+                project=project,
+                template_content=template_content
+            )
+            db.session.add(config_template)
+            db.session.commit()
+            config_template_ids.append(config_template.id)
+
+            fleet_values = {}
+            for i in range(value_sets):
+                hostname = "device-%d-%d-%05d" % (p, t, i)
+                fleet_values[hostname] = dict(
+                    (var_name, hostname if var_name == "hostname" else "%s of %s" % (var_name, hostname))
+                    for var_name in variable_names
+                )
+
+            rows = []
+            for hostname, values in fleet_values.items():
+                row = TemplateValueSet.create_values_snapshot(values)
+                row["hostname"] = hostname
+                row["config_template_id"] = config_template.id
+                rows.append(row)
+            db.session.execute(TemplateValueSet.__table__.insert(), rows)
+            tvs_rows = db.session.query(TemplateValueSet.id, TemplateValueSet.hostname).filter(
+                TemplateValueSet.config_template_id == config_template.id
+            ).all()
+
+            db.session.execute(TemplateValue.__table__.insert(), [
+                {"var_name_slug": var_name, "value": value, "template_value_set_id": tvs_id}
+                for tvs_id, hostname in tvs_rows
+                for var_name, value in fleet_values[hostname].items()
+            ])
+            db.session.commit()
+
+    return config_template_ids
@@ -0,0 +1,247 @@
+"""
+run the benchmark suite and write the results as JSON
+
+The results contain the wall-clock time, the number of SQL queries and the peak memory (python allocations traced
+by tracemalloc) of every hot path.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# the benchmark uses a scratch database and scratch export directories
+SCRATCH_DIRECTORY = os.getenv("BENCHMARK_DIRECTORY") or tempfile.mkdtemp(prefix="ncg_benchmark_")
+os.environ["BENCHMARK_DIRECTORY"] = SCRATCH_DIRECTORY
+os.environ["APP_SETTINGS"] = "config.BenchmarkConfig"
+
+from sqlalchemy import event
+from app import app, db
+from app.models import ConfigTemplate, TemplateValueSet
+from app.tasks import start_configuration_export
+from benchmarks.fleet import create_fleet
+
+
+# maximum number of SQL queries per benchmark, the number of queries of these hot paths must not depend on the size of
+# the fleet
+QUERY_LIMITS = {
+    "view_config_template": 10,
+}
+
+
+class QueryCounter(object):
+    """
+    count the SQL statements that are executed by the engine
+    """
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+def measure(name, query_counter, func):
+    """measure the wall-clock time, the number of SQL queries and the peak memory of the given function
+
+    :param name: name of the benchmark
+    :param query_counter: QueryCounter instance
+    :param func: function without arguments
+    :return: dictionary with the results
+    """
+    # don't measure the identity map of previous benchmarks
+    db.session.remove()
+
+    tracemalloc.start()
+    start_queries = query_counter.count
+    start_time = time.perf_counter()
+
+    func()
+
+    elapsed = time.perf_counter() - start_time
+    queries = query_counter.count - start_queries
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    result = {
+        "name": name,
+        "seconds": round(elapsed, 6),
+        "queries": queries,
+        "peak_memory_bytes": peak_memory
+    }
+    if name in QUERY_LIMITS:
+        result["query_limit"] = QUERY_LIMITS[name]
+    print("%-40s %10.3f s %8d queries %12d bytes" % (name, elapsed, queries, peak_memory), file=sys.stderr)
+    return result
+
+
+def logged_in_client():
+    """create a test client with an active login session
+
+    :return:
+    """
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["logged_in"] = True
+    return client
+
+
+def benchmark_get_configuration_result(config_template_id, samples):
+    def run():
+        for tvs in TemplateValueSet.query.filter(
+                TemplateValueSet.config_template_id == config_template_id
+        ).limit(samples):
+            tvs.get_configuration_result()
+    return run
+
+
+def benchmark_csv_import(config_template_id):
+    config_template = ConfigTemplate.query.get(config_template_id)
+    project_id = config_template.project.id
+    variable_names = ["hostname"] + sorted(
+        v.var_name for v in config_template.variables.all() if v.var_name != "hostname"
+    )
+
+    # modify every value and add the same number of new devices
+    lines = [";".join(variable_names)]
+    rows = config_template.iter_template_values()
+    for tvs_id, hostname, values in rows:
+        for candidate in (hostname, hostname + "-new"):
+            lines.append(";".join(
+                [candidate] + ["%s (imported)" % values.get(var, "") for var in variable_names[1:]]
+            ))
+    csv_content = "\n".join(lines)
+    url = "/ncg/project/%d/configtemplate/%d/edit_all" % (project_id, config_template_id)
+
+    def run():
+        response = logged_in_client().post(url, data={"csv_content": csv_content})
+        assert response.status_code in (200, 302), response.status_code
+    return run
+
+
+def benchmark_download_all_config_as_zip(config_template_id):
+    config_template = ConfigTemplate.query.get(config_template_id)
+    url = "/ncg/project/%d/template/%d/download_configs" % (config_template.project.id, config_template_id)
+
+    def run():
+        response = logged_in_client().get(url)
+        # consume the streamed response
+        size = 0
+        for chunk in response.response:
+            size += len(chunk)
+        assert response.status_code == 200 and size > 0
+    return run
+
+
+def benchmark_export_task(config_template_id, targets):
+    # the chunk subtasks and the finalizing task are executed eagerly within the benchmark process (see
+    # `BenchmarkConfig`)
+    def run():
+        result = start_configuration_export(config_template_id, targets).get()
+        assert "error" not in result, result["error"]
+    return run
+
+
+def benchmark_view_config_template(config_template_id):
+    config_template = ConfigTemplate.query.get(config_template_id)
+    url = "/ncg/project/%d/template/%d" % (config_template.project.id, config_template_id)
+
+    def run():
+        response = logged_in_client().get(url)
+        assert response.status_code == 200, response.status_code
+    return run
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="benchmark the hot paths of the Network Configuration Generator")
+    parser.add_argument("--projects", type=int, default=1, help="number of projects")
+    parser.add_argument("--templates", type=int, default=1, help="number of config templates per project")
+    parser.add_argument("--value-sets", type=int, default=500, help="number of template value sets per template")
+    parser.add_argument("--variables", type=int, default=20, help="number of variables per template")
+    parser.add_argument("--samples", type=int, default=100, help="number of single configuration renders")
+    parser.add_argument("--output", default=None, help="JSON output file (default is stdout)")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch directory")
+    args = parser.parse_args(argv)
+
+    with app.app_context():
+        db.create_all()
+        query_counter = QueryCounter(db.engine)
+
+        setup_start = time.perf_counter()
+        config_template_ids = create_fleet(args.projects, args.templates, args.value_sets, args.variables)
+        setup_time = time.perf_counter() - setup_start
+
+        # all benchmarks use the first Config Template, the other templates are used to scale the database
+        config_template_id = config_template_ids[0]
+
+        results = [
+            measure("get_configuration_result", query_counter,
+                    benchmark_get_configuration_result(config_template_id, args.samples)),
+            measure("download_all_config_as_zip", query_counter,
+                    benchmark_download_all_config_as_zip(config_template_id)),
+            measure("start_configuration_export_ftp", query_counter,
+                    benchmark_export_task(config_template_id, ["ftp"])),
+            measure("start_configuration_export_tftp", query_counter,
+                    benchmark_export_task(config_template_id, ["tftp"])),
+            measure("view_config_template", query_counter,
+                    benchmark_view_config_template(config_template_id)),
+            # the import modifies the data, therefore it runs last
+            measure("edit_all_config_template_values_import", query_counter,
+                    benchmark_csv_import(config_template_id)),
+        ]
+
+        db.session.remove()
+
+    report = {
+        "timestamp": datetime.datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "parameters": {
+            "projects": args.projects,
+            "templates": args.templates,
+            "value_sets": args.value_sets,
+            "variables": args.variables,
+            "samples": args.samples,
+        },
+        "setup_seconds": round(setup_time, 6),
+        "benchmarks": results
+    }
+
+    output = json.dumps(report, indent=4)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if not args.keep:
+        shutil.rmtree(SCRATCH_DIRECTORY, ignore_errors=True)
+
+    return report
+
+
+def check_query_limits(report):
+    """verify that no benchmark exceeds its query limit (see `QUERY_LIMITS`)
+
+    :param report:
+    :return: list of error messages
+    """
+    errors = []
+    for result in report["benchmarks"]:
+        if "query_limit" in result and result["queries"] > result["query_limit"]:
+            errors.append("%s executed %d queries (limit is %d)" % (
+                result["name"], result["queries"], result["query_limit"]
+            ))
+    return errors
+
+
+if __name__ == "__main__":
+    errors = check_query_limits(main())
+    for error in errors:
+        print("query limit exceeded: %s" % error, file=sys.stderr)
+    sys.exit(1 if errors else 0)
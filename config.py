@@ -19,6 +19,19 @@ class DefaultConfig(object):
     SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(APP_BASE_DIR, 'app.db')
     TESTING = False
 
+    # SQLite engine profile, the pragmas are executed on every new connection (WAL allows readers to continue while
+    # a write transaction is active)
+    SQLITE_PRAGMAS = {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 268435456,
+        "busy_timeout": 30000,
+        "cache_size": -16000,
+    }
+
+    # lock file that serializes the bulk write transactions of all workers (None to use "<database file>.lock")
+    SQLITE_WRITE_LOCK_FILE = None
+
     # forms configuration
     WTF_CSRF_ENABLED = True
     SECRET_KEY = 'just-for-development'
@@ -26,6 +39,51 @@ class DefaultConfig(object):
     TFTP_DIRECTORY = os.path.join(APP_BASE_DIR, "share", "tftp")
     FTP_DIRECTORY = os.path.join(APP_BASE_DIR, "share", "ftp")
 
+    # compiled template cache of the config generator (set a module directory to keep compiled templates on disk)
+    MAKO_TEMPLATE_CACHE_SIZE = 128
+    MAKO_MODULE_DIRECTORY = None
+
+    # export tasks are split into subtasks with the given number of Template Value Sets, failed subtasks are retried
+    EXPORT_TASK_CHUNK_SIZE = 500
+    EXPORT_TASK_MAX_RETRIES = 3
+    EXPORT_TASK_RETRY_DELAY = 10
+
+    # project and appliance wide exports are split into subtasks with the given number of Config Templates, the
+    # subtasks are queued with a lower priority than single Config Template exports (0 is the highest priority of the
+    # redis transport)
+    EXPORT_BULK_BATCH_SIZE = 10
+    EXPORT_TASK_PRIORITY = 0
+    EXPORT_BULK_TASK_PRIORITY = 9
+
+    # additional export targets (name and root directory), e.g. {"backup": "/srv/config-backup"}
+    EXPORT_DIRECTORIES = {}
+
+    # registry of the running export jobs, duplicate requests are attached to the running job ("memory://" keeps the
+    # registry within the process)
+    EXPORT_JOB_REGISTRY_URL = "redis://localhost:6379/0"
+    EXPORT_JOB_TIMEOUT = 3600
+
+    # minimum interval in seconds between two progress updates of an export task
+    EXPORT_PROGRESS_INTERVAL = 1.0
+
+    # exported files are written within a thread pool, with EXPORT_WRITER_FSYNC the files are synchronized to disk
+    # after every batch of EXPORT_WRITER_BATCH_SIZE files
+    EXPORT_WRITER_THREADS = 4
+    EXPORT_WRITER_BATCH_SIZE = 500
+    EXPORT_WRITER_FSYNC = False
+
+    # only write configuration files that have changed since the last export
+    INCREMENTAL_EXPORT = True
+
+    # maximum number of rendered configurations that are cached within the database
+    RENDERED_CONFIG_CACHE_SIZE = 10000
+
+    # number of CSV rows that are imported within a single transaction
+    CSV_IMPORT_BATCH_SIZE = 500
+
+    # the file is replaced on every change of the Project tree, the workers rebuild their cached sidebar afterwards
+    PROJECT_TREE_GENERATION_FILE = os.path.join(APP_BASE_DIR, "cache", "project_tree.generation")
+
     # Celery configuration
     CELERY_BROKER_URL = "redis://localhost:6379/0"
     CELERY_RESULT_BACKEND = "redis://localhost:6379/0"
@@ -33,6 +91,14 @@ class DefaultConfig(object):
     CELERY_TASK_SERIALIZER = 'json'
     CELERY_RESULT_SERIALIZER = 'json'
 
+    # the task priorities (see `EXPORT_TASK_PRIORITY`) require that a worker reserves a single task at a time and
+    # acknowledges it after the execution, the redis transport uses a separate list for every priority step
+    CELERYD_PREFETCH_MULTIPLIER = 1
+    CELERY_ACKS_LATE = True
+    BROKER_TRANSPORT_OPTIONS = {
+        "priority_steps": list(range(10)),
+    }
+
 
 class ProductionConfig(DefaultConfig):
     """
@@ -44,6 +110,8 @@ class ProductionConfig(DefaultConfig):
     TFTP_DIRECTORY = os.path.join("/srv", "tftp")
     FTP_DIRECTORY = os.path.join("/srv", "ftp")
 
+    MAKO_MODULE_DIRECTORY = os.path.join(APP_BASE_DIR, "cache", "mako_modules")
+
 
 class TestConfig(DefaultConfig):
     """
@@ -51,6 +119,30 @@ class TestConfig(DefaultConfig):
     """
     TESTING = True
 
+    # the export tasks are executed eagerly within the test process, no redis server is required
+    CELERY_BROKER_URL = "memory://"
+    CELERY_RESULT_BACKEND = "cache+memory://"
+    EXPORT_JOB_REGISTRY_URL = "memory://"
+
+
+class BenchmarkConfig(DefaultConfig):
+    """
+    configuration for the benchmark suite (uses a scratch database and scratch export directories)
+    """
+    BENCHMARK_DIRECTORY = os.getenv("BENCHMARK_DIRECTORY", os.path.join(APP_BASE_DIR, "benchmark"))
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(BENCHMARK_DIRECTORY, 'benchmark.db')
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    TFTP_DIRECTORY = os.path.join(BENCHMARK_DIRECTORY, "tftp")
+    FTP_DIRECTORY = os.path.join(BENCHMARK_DIRECTORY, "ftp")
+    PROJECT_TREE_GENERATION_FILE = os.path.join(BENCHMARK_DIRECTORY, "project_tree.generation")
+    WTF_CSRF_ENABLED = False
+    TESTING = True
+
+    # the export tasks are executed within the benchmark process
+    CELERY_ALWAYS_EAGER = True
+    CELERY_RESULT_BACKEND = "cache+memory://"
+    EXPORT_JOB_REGISTRY_URL = "memory://"
+
 
 class LiveServerTestConfig(DefaultConfig):
     """
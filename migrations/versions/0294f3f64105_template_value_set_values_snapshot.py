@@ -0,0 +1,63 @@
+"""template value set values snapshot
+
+Revision ID: 0294f3f64105
+Revises: e11f9104ca1a
+Create Date: 2026-10-17 14:31:08.224190
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '0294f3f64105'
+down_revision = 'e11f9104ca1a'
+
+from alembic import op
+import sqlalchemy as sa
+import json
+from itertools import groupby
+
+
+def upgrade():
+    with op.batch_alter_table('template_value_set') as batch_op:
+        batch_op.add_column(sa.Column('values_json', sa.UnicodeText(), nullable=True))
+
+    # create the snapshots of the existing data (same as app.models.TemplateValueSet.create_values_snapshot)
+    connection = op.get_bind()
+    template_value_set = sa.table(
+        'template_value_set',
+        sa.column('id', sa.Integer),
+        sa.column('values_json', sa.UnicodeText)
+    )
+    template_value = sa.table(
+        'template_value',
+        sa.column('template_value_set_id', sa.Integer),
+        sa.column('var_name_slug', sa.String),
+        sa.column('value', sa.String)
+    )
+
+    rows = connection.execute(
+        sa.select([
+            template_value_set.c.id,
+            template_value.c.var_name_slug,
+            template_value.c.value
+        ]).select_from(
+            template_value_set.outerjoin(
+                template_value, template_value.c.template_value_set_id == template_value_set.c.id
+            )
+        ).order_by(template_value_set.c.id)
+    )
+    updates = []
+    for tvs_id, values in groupby(rows, key=lambda row: row[0]):
+        values = dict((row[1], row[2]) for row in values if row[1] is not None)
+        updates.append({"_id": tvs_id, "_values_json": json.dumps(values, ensure_ascii=False, sort_keys=True)})
+    if updates:
+        connection.execute(
+            template_value_set.update().where(
+                template_value_set.c.id == sa.bindparam("_id")
+            ).values(values_json=sa.bindparam("_values_json")),
+            updates
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('template_value_set') as batch_op:
+        batch_op.drop_column('values_json')
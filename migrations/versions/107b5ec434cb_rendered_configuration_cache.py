@@ -0,0 +1,34 @@
+"""rendered configuration cache
+
+Revision ID: 107b5ec434cb
+Revises: 22e101412315
+Create Date: 2026-10-17 09:14:03.204117
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '107b5ec434cb'
+down_revision = '22e101412315'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_table('rendered_configuration',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('cache_key', sa.String(length=64), nullable=False),
+        sa.Column('content', sa.UnicodeText(), nullable=True),
+        sa.Column('rendered_at', sa.DateTime(), nullable=True),
+        sa.Column('template_value_set_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['template_value_set_id'], ['template_value_set.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('template_value_set_id')
+    )
+    op.create_index(op.f('ix_rendered_configuration_rendered_at'), 'rendered_configuration', ['rendered_at'],
+                    unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_rendered_configuration_rendered_at'), table_name='rendered_configuration')
+    op.drop_table('rendered_configuration')
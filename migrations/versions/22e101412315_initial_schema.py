@@ -0,0 +1,86 @@
+"""initial schema
+
+Existing databases that were created using db.create_all() already contain this schema, mark them with
+`python manage.py db stamp 22e101412315` before running `python manage.py db upgrade`.
+
+Revision ID: 22e101412315
+Revises: None
+Create Date: 2026-10-17 09:12:41.518230
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '22e101412315'
+down_revision = None
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_table('project',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=128), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_project_name'), 'project', ['name'], unique=True)
+    op.create_table('config_template',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=128), nullable=False),
+        sa.Column('_template_content', sa.UnicodeText(), nullable=True),
+        sa.Column('project_id', sa.Integer(), nullable=False),
+        sa.Column('last_successful_ftp_export', sa.DateTime(), nullable=True),
+        sa.Column('last_successful_tftp_export', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['project_id'], ['project.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name', 'project_id')
+    )
+    op.create_index(op.f('ix_config_template__template_content'), 'config_template', ['_template_content'], unique=False)
+    op.create_index(op.f('ix_config_template_name'), 'config_template', ['name'], unique=False)
+    op.create_table('template_variable',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('var_name_slug', sa.String(length=256), nullable=False),
+        sa.Column('description', sa.String(length=4096), nullable=True),
+        sa.Column('config_template_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['config_template_id'], ['config_template.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('var_name_slug', 'config_template_id')
+    )
+    op.create_index(op.f('ix_template_variable_description'), 'template_variable', ['description'], unique=False)
+    op.create_index(op.f('ix_template_variable_var_name_slug'), 'template_variable', ['var_name_slug'], unique=False)
+    op.create_table('template_value_set',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('hostname', sa.String(length=256), nullable=False),
+        sa.Column('config_template_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['config_template_id'], ['config_template.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('hostname', 'config_template_id')
+    )
+    op.create_index(op.f('ix_template_value_set_hostname'), 'template_value_set', ['hostname'], unique=False)
+    op.create_table('template_value',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('var_name_slug', sa.String(length=256), nullable=False),
+        sa.Column('value', sa.String(length=4096), nullable=True),
+        sa.Column('template_value_set_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['template_value_set_id'], ['template_value_set.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('var_name_slug', 'template_value_set_id')
+    )
+    op.create_index(op.f('ix_template_value_value'), 'template_value', ['value'], unique=False)
+    op.create_index(op.f('ix_template_value_var_name_slug'), 'template_value', ['var_name_slug'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_template_value_var_name_slug'), table_name='template_value')
+    op.drop_index(op.f('ix_template_value_value'), table_name='template_value')
+    op.drop_table('template_value')
+    op.drop_index(op.f('ix_template_value_set_hostname'), table_name='template_value_set')
+    op.drop_table('template_value_set')
+    op.drop_index(op.f('ix_template_variable_var_name_slug'), table_name='template_variable')
+    op.drop_index(op.f('ix_template_variable_description'), table_name='template_variable')
+    op.drop_table('template_variable')
+    op.drop_index(op.f('ix_config_template_name'), table_name='config_template')
+    op.drop_index(op.f('ix_config_template__template_content'), table_name='config_template')
+    op.drop_table('config_template')
+    op.drop_index(op.f('ix_project_name'), table_name='project')
+    op.drop_table('project')
@@ -0,0 +1,24 @@
+"""strip trailing whitespace per config template
+
+Revision ID: 5c0d8e2b7a41
+Revises: 0294f3f64105
+Create Date: 2026-10-17 16:42:51.306214
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '5c0d8e2b7a41'
+down_revision = '0294f3f64105'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    with op.batch_alter_table('config_template') as batch_op:
+        batch_op.add_column(sa.Column('strip_trailing_whitespace', sa.Boolean(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('config_template') as batch_op:
+        batch_op.drop_column('strip_trailing_whitespace')
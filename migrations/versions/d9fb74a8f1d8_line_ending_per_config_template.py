@@ -0,0 +1,24 @@
+"""line ending per config template
+
+Revision ID: d9fb74a8f1d8
+Revises: 107b5ec434cb
+Create Date: 2026-10-17 09:15:27.880561
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'd9fb74a8f1d8'
+down_revision = '107b5ec434cb'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    with op.batch_alter_table('config_template') as batch_op:
+        batch_op.add_column(sa.Column('line_ending', sa.String(length=8), nullable=False, server_default='crlf'))
+
+
+def downgrade():
+    with op.batch_alter_table('config_template') as batch_op:
+        batch_op.drop_column('line_ending')
@@ -0,0 +1,100 @@
+"""content digest columns instead of indexes on the content
+
+Revision ID: e11f9104ca1a
+Revises: d9fb74a8f1d8
+Create Date: 2026-10-17 14:02:41.517304
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'e11f9104ca1a'
+down_revision = 'd9fb74a8f1d8'
+
+from alembic import op
+import sqlalchemy as sa
+import hashlib
+import json
+from itertools import groupby
+
+
+def _sha256(content):
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def upgrade():
+    op.drop_index('ix_config_template__template_content', table_name='config_template')
+    op.drop_index('ix_template_value_value', table_name='template_value')
+    op.drop_index('ix_template_variable_description', table_name='template_variable')
+
+    with op.batch_alter_table('config_template') as batch_op:
+        batch_op.add_column(sa.Column('template_digest', sa.String(length=64), nullable=True))
+
+    with op.batch_alter_table('template_value_set') as batch_op:
+        batch_op.add_column(sa.Column('values_digest', sa.String(length=64), nullable=True))
+
+    # compute the digests of the existing data (same as app.utils.confgen.get_template_digest/get_values_digest)
+    connection = op.get_bind()
+    config_template = sa.table(
+        'config_template',
+        sa.column('id', sa.Integer),
+        sa.column('_template_content', sa.UnicodeText),
+        sa.column('template_digest', sa.String)
+    )
+    template_value_set = sa.table(
+        'template_value_set',
+        sa.column('id', sa.Integer),
+        sa.column('values_digest', sa.String)
+    )
+    template_value = sa.table(
+        'template_value',
+        sa.column('template_value_set_id', sa.Integer),
+        sa.column('var_name_slug', sa.String),
+        sa.column('value', sa.String)
+    )
+
+    updates = [
+        {"_id": ct_id, "_digest": _sha256(content or "")}
+        for ct_id, content in connection.execute(sa.select([config_template.c.id, config_template.c._template_content]))
+    ]
+    if updates:
+        connection.execute(
+            config_template.update().where(
+                config_template.c.id == sa.bindparam("_id")
+            ).values(template_digest=sa.bindparam("_digest")),
+            updates
+        )
+
+    rows = connection.execute(
+        sa.select([
+            template_value_set.c.id,
+            template_value.c.var_name_slug,
+            template_value.c.value
+        ]).select_from(
+            template_value_set.outerjoin(
+                template_value, template_value.c.template_value_set_id == template_value_set.c.id
+            )
+        ).order_by(template_value_set.c.id)
+    )
+    updates = []
+    for tvs_id, values in groupby(rows, key=lambda row: row[0]):
+        values = dict((row[1], row[2]) for row in values if row[1] is not None)
+        updates.append({"_id": tvs_id, "_digest": _sha256(json.dumps(sorted(values.items()), ensure_ascii=False))})
+    if updates:
+        connection.execute(
+            template_value_set.update().where(
+                template_value_set.c.id == sa.bindparam("_id")
+            ).values(values_digest=sa.bindparam("_digest")),
+            updates
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('template_value_set') as batch_op:
+        batch_op.drop_column('values_digest')
+
+    with op.batch_alter_table('config_template') as batch_op:
+        batch_op.drop_column('template_digest')
+
+    op.create_index('ix_template_variable_description', 'template_variable', ['description'], unique=False)
+    op.create_index('ix_template_value_value', 'template_value', ['value'], unique=False)
+    op.create_index('ix_config_template__template_content', 'config_template', ['_template_content'], unique=False)
@@ -0,0 +1,115 @@
+"""
+unit and functional test cases of the Web service
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from sqlalchemy import event
+
+os.environ.setdefault("APP_SETTINGS", "config.TestConfig")
+
+from app import app, db
+from app.models import Project, ConfigTemplate, TemplateValueSet
+from app.utils.database import serialized_write
+from app.utils.export_jobs import InMemoryExportJobRegistry, set_export_job_registry
+
+
+class BaseFlaskTest(unittest.TestCase):
+    """
+    base class for test cases that require the Flask application, every test case uses a scratch database and
+    scratch export directories
+    """
+
+    def setUp(self):
+        self.test_directory = tempfile.mkdtemp(prefix="ncg_test_")
+        app.config.update(
+            SQLALCHEMY_DATABASE_URI="sqlite:///" + os.path.join(self.test_directory, "test.db"),
+            TFTP_DIRECTORY=os.path.join(self.test_directory, "tftp"),
+            FTP_DIRECTORY=os.path.join(self.test_directory, "ftp"),
+            PROJECT_TREE_GENERATION_FILE=os.path.join(self.test_directory, "project_tree.generation"),
+            WTF_CSRF_ENABLED=False,
+        )
+        os.makedirs(app.config["TFTP_DIRECTORY"])
+        os.makedirs(app.config["FTP_DIRECTORY"])
+        serialized_write.configure(os.path.join(self.test_directory, "test.db.lock"))
+        set_export_job_registry(InMemoryExportJobRegistry())
+
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = app.test_client()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        shutil.rmtree(self.test_directory)
+
+    def create_project(self, name="project"):
+        project = Project(name)
+        db.session.add(project)
+        db.session.commit()
+        return project
+
+    def create_template_value_set(self, config_template, hostname, values=None):
+        """create a Template Value Set with the given values (dictionary with the variable names and values)"""
+        tvs = TemplateValueSet(hostname, config_template)
+        db.session.add(tvs)
+        db.session.commit()
+        if values:
+            tvs.update_variable_values(values)
+        return tvs
+
+    def create_config_template(self, template_content, hostnames=(), values=None, name="template", project=None):
+        """create a Config Template (within a new project if no project is given) with a Template Value Set for every
+        hostname, the values of a Template Value Set are taken from the values dictionary (hostname as key)
+        """
+        if project is None:
+            project = self.create_project()
+        config_template = ConfigTemplate(name, project, template_content)
+        db.session.add(config_template)
+        db.session.commit()
+
+        values = values or {}
+        for hostname in hostnames:
+            self.create_template_value_set(config_template, hostname, values.get(hostname))
+        return config_template
+
+    def count_queries(self, func):
+        """execute the given function without arguments
+
+        :return: number of SQL statements that were executed by the function
+        """
+        statements = []
+
+        def count_statement(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", count_statement)
+        try:
+            func()
+
+        finally:
+            event.remove(db.engine, "before_cursor_execute", count_statement)
+
+        return len(statements)
+
+    def count_commits(self, func):
+        """execute the given function without arguments
+
+        :return: number of committed transactions of the session
+        """
+        commits = []
+
+        def count_commit(session):
+            commits.append(session)
+
+        event.listen(db.session, "after_commit", count_commit)
+        try:
+            func()
+
+        finally:
+            event.remove(db.session, "after_commit", count_commit)
+
+        return len(commits)
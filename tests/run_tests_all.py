@@ -0,0 +1,13 @@
+"""
+run all test cases within the tests directory
+"""
+import os
+import unittest
+
+
+def load_tests(loader, tests, pattern):
+    return loader.discover(os.path.dirname(__file__), top_level_dir=os.path.dirname(os.path.dirname(__file__)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,202 @@
+"""
+test cases for the Mako based Configuration Generator
+"""
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from mako.template import Template
+from app.utils.confgen import MakoConfigGenerator, ChecksumSink, CompiledTemplateCache, discover_template_variables, \
+    get_template_digest
+from tests import BaseFlaskTest
+
+
+class MakoConfigGeneratorTest(BaseFlaskTest):
+
+    def test_render_output_matches_mako(self):
+        """the post-processed output is the Mako output without blank lines and with CR/LF line endings"""
+        template_string = "hostname ${hostname}\n\n" \
+                          "%for i in range(int(count)):\n" \
+                          "interface Gi0/${i}\n" \
+                          " description ${description}\n" \
+                          "%endfor\n" \
+                          "!\n"
+        values = {"hostname": "router", "count": "3", "description": "uplink"}
+
+        expected_lines = [line for line in Template(template_string).render(**values).splitlines() if line != ""]
+
+        mcg = MakoConfigGenerator(template_string=template_string)
+        result = mcg.render(values)
+
+        self.assertEqual("\r\n".join(expected_lines), result)
+        self.assertFalse(result.endswith("\r\n"))
+
+    def test_render_keeps_blank_lines(self):
+        mcg = MakoConfigGenerator(template_string="first ${a}\n\nlast\n", line_ending="\n")
+
+        self.assertEqual("first 1\n\nlast", mcg.render({"a": "1"}, remove_empty_lines=False))
+
+    def test_render_missing_value_as_empty_string(self):
+        mcg = MakoConfigGenerator(template_string="hostname ${hostname}\ndomain ${domain}")
+
+        self.assertEqual("hostname router\r\ndomain ", mcg.render({"hostname": "router"}))
+
+    def test_render_page_arguments(self):
+        """arguments of a page declaration are rendered with the given values and not with their default value"""
+        template_string = '<%page args="mgmt_vlan=None, domain=\'default.local\'"/>\n' \
+                          "vlan ${mgmt_vlan}\n" \
+                          "ip domain-name ${domain}\n"
+        mcg = MakoConfigGenerator(template_string=template_string)
+
+        self.assertEqual(
+            "vlan 100\r\nip domain-name example.com",
+            mcg.render({"mgmt_vlan": "100", "domain": "example.com"})
+        )
+
+    def test_render_to_sink(self):
+        """the output of a single render call is identical to the output that is written to a sink"""
+        mcg = MakoConfigGenerator(template_string="hostname ${hostname}\n\n!\nend\n")
+        sink = io.StringIO()
+
+        mcg.render_to_sink({"hostname": "router"}, sink)
+
+        self.assertEqual(mcg.render({"hostname": "router"}), sink.getvalue())
+        self.assertEqual("hostname router\r\n!\r\nend", sink.getvalue())
+
+    def test_render_strips_trailing_whitespace(self):
+        """lines that contain only whitespace are removed together with the blank lines"""
+        mcg = MakoConfigGenerator(template_string="interface ${name} \n   \n description ${description}\t\n",
+                                  strip_trailing_whitespace=True)
+
+        self.assertEqual("interface Gi0/1\r\n description uplink",
+                         mcg.render({"name": "Gi0/1", "description": "uplink"}))
+
+    def test_render_keeps_trailing_whitespace_by_default(self):
+        mcg = MakoConfigGenerator(template_string="interface ${name} \n description uplink\t")
+
+        self.assertEqual("interface Gi0/1 \r\n description uplink\t", mcg.render({"name": "Gi0/1"}))
+
+    def test_render_to_checksum_sink(self):
+        """the checksum sink writes the encoded output to the binary target and calculates the checksum"""
+        mcg = MakoConfigGenerator(template_string="hostname ${hostname}\n! ${comment}")
+        values = {"hostname": "router", "comment": "gr\u00fc\u00dfe"}
+        expected = mcg.render(values).encode("utf-8")
+        target = io.BytesIO()
+        sink = ChecksumSink(target)
+
+        mcg.render_to_sink(values, sink)
+
+        self.assertEqual(expected, target.getvalue())
+        self.assertEqual(hashlib.sha256(expected).hexdigest(), sink.checksum)
+        self.assertEqual(len(expected), sink.size)
+
+    def test_render_multiple_value_sets_with_single_instance(self):
+        mcg = MakoConfigGenerator(template_string="hostname ${hostname}")
+
+        self.assertEqual("hostname first", mcg.render({"hostname": "first"}))
+        self.assertEqual("hostname second", mcg.render({"hostname": "second"}))
+        self.assertEqual([], list(mcg._template_variable_dict.keys()))
+
+
+class CompiledTemplateCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = CompiledTemplateCache(max_size=2)
+
+    def test_hit_and_miss(self):
+        template = self.cache.get("hostname ${hostname}")
+
+        self.assertIs(template, self.cache.get("hostname ${hostname}"))
+        self.assertEqual({"size": 1, "max_size": 2, "hits": 1, "misses": 1, "evictions": 0}, self.cache.stats())
+
+    def test_changed_template_content_is_a_miss(self):
+        first = self.cache.get("hostname ${hostname}")
+        second = self.cache.get("hostname ${hostname}\n!")
+
+        self.assertIsNot(first, second)
+        self.assertEqual(2, self.cache.stats()["misses"])
+
+    def test_least_recently_used_template_is_evicted(self):
+        first = self.cache.get("first")
+        self.cache.get("second")
+        # the first template is used again, therefore the second template is evicted
+        self.cache.get("first")
+        self.cache.get("third")
+
+        self.assertIs(first, self.cache.get("first"))
+        self.assertEqual({"size": 2, "max_size": 2, "hits": 2, "misses": 3, "evictions": 1}, self.cache.stats())
+
+        self.cache.get("second")
+        self.assertEqual(4, self.cache.stats()["misses"])
+
+    def test_get_variables(self):
+        self.assertEqual(["hostname", "vlan"], self.cache.get_variables("hostname ${hostname}\nvlan ${vlan}"))
+        # the variables are read from the compiled template that is kept within the cache
+        self.assertEqual(1, self.cache.stats()["size"])
+        self.assertEqual([], self.cache.get_variables(""))
+
+    def test_module_directory(self):
+        module_directory = tempfile.mkdtemp(prefix="ncg_test_")
+        self.addCleanup(shutil.rmtree, module_directory)
+        self.cache.configure(module_directory=module_directory)
+        template_string = "hostname ${hostname}"
+
+        template = self.cache.get(template_string)
+
+        self.assertEqual("hostname router", template.render(hostname="router"))
+        self.assertTrue(os.path.exists(
+            os.path.join(module_directory, "%s.mako" % get_template_digest(template_string))
+        ))
+
+
+class DiscoverTemplateVariablesTest(unittest.TestCase):
+
+    def test_discover_variables(self):
+        template_string = '<%page args="mgmt_vlan=None, domain=\'default.local\'"/>\n' \
+                          "hostname ${hostname}\n" \
+                          "%for interface in interfaces:\n" \
+                          "interface ${interface}\n" \
+                          " description ${uplink.description}\n" \
+                          "%endfor\n" \
+                          "%if len(ntp_servers) > 0:\n" \
+                          "ntp server ${ntp_servers}\n" \
+                          "%endif\n" \
+                          '<%def name="banner(text)">banner motd ^${text} ${contact}^</%def>\n' \
+                          "${banner(site)}\n" \
+                          "<% local_value = 1 %>${local_value} ${loop.index if False else ''}\n"
+
+        self.assertEqual(
+            ["contact", "domain", "hostname", "interfaces", "mgmt_vlan", "ntp_servers", "site", "uplink"],
+            discover_template_variables(template_string)
+        )
+
+    def test_discover_variables_with_builtin_names(self):
+        """names of python builtins are variables unless they are only called"""
+        template_string = "interface ${id}\n description ${type}\n vlan ${vlan}\n" \
+                          "%for i in range(len(ports)):\n${format}\n%endfor\n"
+
+        self.assertEqual(
+            ["format", "id", "ports", "type", "vlan"],
+            discover_template_variables(template_string)
+        )
+
+    def test_render_variables_with_builtin_names(self):
+        mcg = MakoConfigGenerator(template_string="interface ${id}\n description ${type}\n vlan ${vlan}")
+
+        self.assertEqual(
+            "interface Gi0/1\r\n description \r\n vlan 10",
+            mcg.render({"id": "Gi0/1", "vlan": "10"})
+        )
+
+    def test_discover_variables_of_invalid_template(self):
+        self.assertEqual(["hostname", "vlan"], discover_template_variables("hostname ${hostname}\n%for\n${vlan}"))
+
+    def test_discover_variables_of_empty_template(self):
+        self.assertEqual([], discover_template_variables(""))
+        self.assertEqual([], discover_template_variables(None))
+
+
+if __name__ == "__main__":
+    unittest.main()
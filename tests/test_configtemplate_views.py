@@ -0,0 +1,102 @@
+"""
+test cases for the views of the Config Templates
+"""
+import io
+import unittest
+from app.utils.csv_import import import_template_value_sets_from_csv
+from app.utils.export import iter_template_values_as_csv
+from tests import BaseFlaskTest
+
+
+class ViewConfigTemplateTest(BaseFlaskTest):
+
+    def setUp(self):
+        super().setUp()
+        self.config_template = self.create_config_template(
+            "hostname ${hostname}\nvlan ${vlan}\n! ${note}",
+            hostnames=["sw1", "sw2"],
+            values={"sw1": {"vlan": "10", "note": "first"}, "sw2": {"vlan": "20", "note": "second"}}
+        )
+        with self.client.session_transaction() as session:
+            session["logged_in"] = True
+
+    def view_config_template(self):
+        response = self.client.get("/ncg/project/%d/template/%d" % (
+            self.config_template.project.id, self.config_template.id
+        ))
+        self.assertEqual(200, response.status_code)
+        return response.data.decode("utf-8")
+
+    def test_value_matrix(self):
+        content = self.view_config_template()
+
+        for tvs in self.config_template.template_value_sets:
+            self.assertIn('<a href="/ncg/project/template/%d/valueset/%d/">%s</a>' % (
+                self.config_template.id, tvs.id, tvs.hostname
+            ), content)
+        for value in ["10", "20", "first", "second"]:
+            self.assertIn("<td>%s</td>" % value, content)
+
+    def test_number_of_queries_is_independent_of_the_value_sets(self):
+        # the sidebar tree is cached after the first request
+        self.view_config_template()
+        queries = self.count_queries(self.view_config_template)
+
+        for i in range(20):
+            self.create_template_value_set(self.config_template, "access%d" % i, {"vlan": str(i), "note": "new"})
+        self.view_config_template()
+
+        self.assertEqual(queries, self.count_queries(self.view_config_template))
+
+
+class ConfigTemplateValuesCsvTest(BaseFlaskTest):
+
+    def setUp(self):
+        super().setUp()
+        self.config_template = self.create_config_template(
+            "hostname ${hostname}\nvlan ${vlan}\n! ${note}",
+            hostnames=["sw1", "sw2"],
+            values={"sw1": {"vlan": "10", "note": "first"}, "sw2": {"vlan": "20"}},
+            name="access switch"
+        )
+
+    def test_download_values_as_csv(self):
+        response = self.client.get("/ncg/project/%d/configtemplate/%d/download_values" % (
+            self.config_template.project.id, self.config_template.id
+        ))
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual("text/csv", response.mimetype)
+        self.assertEqual(
+            "attachment; filename=%s_values.csv" % self.config_template.name_slug,
+            response.headers["Content-Disposition"]
+        )
+        self.assertEqual("hostname;note;vlan\nsw1;first;10\nsw2;;20\n", response.data.decode("utf-8"))
+
+    def test_csv_is_streamed_in_chunks(self):
+        chunks = list(iter_template_values_as_csv(self.config_template, buffer_size=1))
+
+        # the header is emitted together with the first row
+        self.assertEqual(["hostname;note;vlan\nsw1;first;10\n", "sw2;;20\n"], chunks)
+
+    def test_csv_can_be_imported_again(self):
+        csv_content = "".join(iter_template_values_as_csv(self.config_template))
+
+        report = import_template_value_sets_from_csv(self.config_template, io.StringIO(csv_content, newline=""))
+
+        self.assertEqual((0, 0, 2), (report["created"], report["updated"], report["unchanged"]))
+
+    def test_edit_form_is_populated_with_csv(self):
+        with self.client.session_transaction() as session:
+            session["logged_in"] = True
+
+        response = self.client.get("/ncg/project/%d/configtemplate/%d/edit_all" % (
+            self.config_template.project.id, self.config_template.id
+        ))
+
+        self.assertEqual(200, response.status_code)
+        self.assertIn("hostname;note;vlan\nsw1;first;10\nsw2;;20\n", response.data.decode("utf-8"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+"""
+test cases for the download of the generated configurations
+"""
+import io
+import unittest
+import zipfile
+from tests import BaseFlaskTest
+
+
+class ConfigurationViewsTest(BaseFlaskTest):
+
+    def test_download_all_configurations_as_zip(self):
+        config_template = self.create_config_template(
+            "hostname ${hostname}\n\n!",
+            hostnames=["sw1", "sw2"],
+            name="access switch; v2"
+        )
+        project = config_template.project
+
+        response = self.client.get(
+            "/ncg/project/%d/template/%d/download_configs" % (project.id, config_template.id)
+        )
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(
+            "attachment; filename=%s_configs.zip" % config_template.name_slug,
+            response.headers["Content-Disposition"]
+        )
+        archive = zipfile.ZipFile(io.BytesIO(response.data))
+        self.assertEqual(["sw1_config.txt", "sw2_config.txt"], sorted(archive.namelist()))
+        self.assertEqual(b"hostname sw1\r\n!", archive.read("sw1_config.txt"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+"""
+test cases for the cached Project and Config Template tree of the sidebar
+"""
+import unittest
+from app import db
+from app.context_processors import ProjectTreeCache
+from tests import BaseFlaskTest
+
+
+class ProjectTreeCacheTest(BaseFlaskTest):
+
+    def setUp(self):
+        super().setUp()
+        self.config_template = self.create_config_template("hostname ${hostname}", name="access switch")
+        self.cache = ProjectTreeCache()
+
+    def test_build_tree(self):
+        second_project = self.create_project("empty project")
+
+        self.assertEqual([
+            {
+                "id": self.config_template.project.id,
+                "name": "project",
+                "config_templates": [{"id": self.config_template.id, "name": "access switch"}]
+            },
+            {"id": second_project.id, "name": "empty project", "config_templates": []}
+        ], self.cache.get_tree())
+
+    def test_tree_is_cached(self):
+        tree = self.cache.get_tree()
+
+        self.assertEqual(0, self.count_queries(self.cache.get_tree))
+        self.assertIs(tree, self.cache.get_tree())
+
+    def test_new_project_invalidates_tree(self):
+        self.cache.get_tree()
+
+        self.create_project("second project")
+
+        self.assertEqual(["project", "second project"], [project["name"] for project in self.cache.get_tree()])
+
+    def test_renamed_config_template_invalidates_tree(self):
+        self.cache.get_tree()
+
+        self.config_template.name = "core switch"
+        db.session.commit()
+
+        self.assertEqual("core switch", self.cache.get_tree()[0]["config_templates"][0]["name"])
+
+    def test_changed_template_content_keeps_tree(self):
+        generation = self.cache.get_generation()
+
+        self.config_template.template_content = "hostname ${hostname}\n!"
+        db.session.commit()
+
+        self.assertEqual(generation, self.cache.get_generation())
+
+    def test_rollback_keeps_tree(self):
+        generation = self.cache.get_generation()
+
+        self.config_template.name = "core switch"
+        db.session.flush()
+        db.session.rollback()
+
+        self.assertEqual(generation, self.cache.get_generation())
+
+    def test_invalidation_is_shared_between_workers(self):
+        other_worker = ProjectTreeCache()
+        self.cache.get_tree()
+        other_worker.get_tree()
+
+        self.cache.invalidate()
+
+        # the tree is rebuilt with a single query within both workers
+        self.assertEqual(1, self.count_queries(self.cache.get_tree))
+        self.assertEqual(1, self.count_queries(other_worker.get_tree))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+"""
+test cases for the CSV import of Template Value Sets
+"""
+import codecs
+import io
+import unittest
+from app.models import TemplateValueSet
+from app.utils.csv_import import import_template_value_sets_from_csv, _import_batch
+from tests import BaseFlaskTest
+
+
+class CsvImportTest(BaseFlaskTest):
+
+    def setUp(self):
+        super().setUp()
+        self.config_template = self.create_config_template(
+            "hostname ${hostname}\nvlan ${vlan}\n! ${note}",
+            hostnames=["existing", "unchanged"],
+            values={"existing": {"vlan": "10", "note": "first"}, "unchanged": {"vlan": "20", "note": "second"}}
+        )
+
+    def import_csv(self, content, **kwargs):
+        return import_template_value_sets_from_csv(self.config_template, io.StringIO(content, newline=""), **kwargs)
+
+    def get_values(self, hostname):
+        tvs = TemplateValueSet.query.filter(
+            TemplateValueSet.config_template_id == self.config_template.id,
+            TemplateValueSet.hostname == hostname
+        ).one()
+        return tvs.get_values_as_dict()
+
+    def test_import_report(self):
+        report = self.import_csv(
+            "hostname;vlan;unknown\n"
+            "existing;11;ignored\n"
+            "unchanged;20;ignored\n"
+            "new;30;ignored\n"
+            ";40;ignored\n",
+            batch_size=2
+        )
+
+        self.assertEqual(4, report["rows"])
+        self.assertEqual(1, report["created"])
+        self.assertEqual(1, report["updated"])
+        self.assertEqual(1, report["unchanged"])
+        self.assertEqual(1, report["skipped"])
+        self.assertEqual(["No Hostname defined for Template Value Set in line 5"], report["errors"])
+
+        self.assertEqual("11", self.get_values("existing")["vlan"])
+        self.assertEqual("first", self.get_values("existing")["note"])
+        self.assertEqual({"hostname": "new", "vlan": "30", "note": ""}, self.get_values("new"))
+        self.assertEqual(3, self.config_template.template_value_sets.count())
+
+    def test_import_updates_values_snapshot(self):
+        self.import_csv("hostname;note\nexisting;changed\n")
+
+        tvs = TemplateValueSet.query.filter(TemplateValueSet.hostname == "existing").one()
+        self.assertEqual(
+            TemplateValueSet.create_values_snapshot({"hostname": "existing", "vlan": "10", "note": "changed"}),
+            {"values_json": tvs.values_json, "values_digest": tvs.values_digest}
+        )
+
+    def test_import_without_hostname_column(self):
+        report = self.import_csv("vlan;note\n10;first\n")
+
+        self.assertEqual(["No hostname column in CSV header found"], report["errors"])
+        self.assertEqual(0, report["rows"])
+
+    def test_import_with_invalid_file_encoding(self):
+        csv_data = codecs.iterdecode(io.BytesIO(b"hostname;vlan\nexisting;12\nnew;\xff\xfe\n"), "utf-8-sig")
+
+        report = import_template_value_sets_from_csv(self.config_template, csv_data, batch_size=1)
+
+        self.assertEqual(["Invalid file encoding in line 3"], report["errors"])
+        self.assertEqual(1, report["updated"])
+        self.assertEqual(0, report["created"])
+
+    def test_import_with_invalid_header_encoding(self):
+        csv_data = codecs.iterdecode(io.BytesIO(b"hostname;\xff\xfe\nexisting;12\n"), "utf-8-sig")
+
+        report = import_template_value_sets_from_csv(self.config_template, csv_data)
+
+        self.assertEqual(["Invalid file encoding in line 1"], report["errors"])
+
+    def test_import_batch_resolves_hostnames_created_concurrently(self):
+        """a hostname that is missing in the (stale) hostname map is not created a second time"""
+        report = {"created": 0, "updated": 0, "unchanged": 0}
+
+        _import_batch(self.config_template, ["hostname", "vlan", "note"], {"existing": {"vlan": "99"}}, {}, report)
+
+        self.assertEqual(0, report["created"])
+        self.assertEqual(1, report["updated"])
+        self.assertEqual(1, TemplateValueSet.query.filter(TemplateValueSet.hostname == "existing").count())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+"""
+test cases for the SQLite engine profile and the serialized write transactions
+"""
+import os
+import threading
+import unittest
+from app import app, db
+from app.utils.database import get_sqlite_database_file, SerializedWriteLock
+from tests import BaseFlaskTest
+
+
+class SqliteEngineProfileTest(BaseFlaskTest):
+
+    def get_pragma(self, name):
+        return db.session.execute("PRAGMA %s" % name).scalar()
+
+    def test_pragmas_are_set_on_new_connections(self):
+        pragmas = app.config["SQLITE_PRAGMAS"]
+
+        self.assertEqual(pragmas["journal_mode"].lower(), self.get_pragma("journal_mode"))
+        self.assertEqual(pragmas["busy_timeout"], self.get_pragma("busy_timeout"))
+        self.assertEqual(pragmas["cache_size"], self.get_pragma("cache_size"))
+
+    def test_get_sqlite_database_file(self):
+        self.assertEqual("/var/lib/ncg/app.db", get_sqlite_database_file("sqlite:////var/lib/ncg/app.db"))
+        self.assertEqual("app.db", get_sqlite_database_file("sqlite:///app.db?timeout=10"))
+        self.assertIsNone(get_sqlite_database_file("sqlite:///:memory:"))
+        self.assertIsNone(get_sqlite_database_file("sqlite://"))
+        self.assertIsNone(get_sqlite_database_file("postgresql://localhost/ncg"))
+
+
+class SerializedWriteLockTest(BaseFlaskTest):
+
+    def setUp(self):
+        super().setUp()
+        self.lock_file = os.path.join(self.test_directory, "write.lock")
+
+    def acquire_in_thread(self, lock):
+        """acquire and release the lock within another thread
+
+        :return: event that is set after the lock was acquired
+        """
+        acquired = threading.Event()
+
+        def acquire():
+            with lock:
+                acquired.set()
+
+        thread = threading.Thread(target=acquire)
+        thread.start()
+        self.addCleanup(thread.join, 5)
+        return acquired
+
+    def test_lock_is_reentrant(self):
+        lock = SerializedWriteLock(self.lock_file)
+
+        with lock:
+            with lock:
+                pass
+
+            # the file lock is kept until the outermost block is left
+            self.assertFalse(self.acquire_in_thread(SerializedWriteLock(self.lock_file)).wait(0.2))
+
+    def test_writes_of_other_processes_wait_for_the_lock(self):
+        # a second lock instance uses its own file descriptor like another worker process
+        lock = SerializedWriteLock(self.lock_file)
+        other_worker = SerializedWriteLock(self.lock_file)
+
+        lock.acquire()
+        acquired = self.acquire_in_thread(other_worker)
+        self.assertFalse(acquired.wait(0.2))
+
+        lock.release()
+        self.assertTrue(acquired.wait(5))
+
+    def test_writes_of_other_threads_wait_for_the_lock(self):
+        lock = SerializedWriteLock()
+
+        lock.acquire()
+        acquired = self.acquire_in_thread(lock)
+        self.assertFalse(acquired.wait(0.2))
+
+        lock.release()
+        self.assertTrue(acquired.wait(5))
+
+
+if __name__ == "__main__":
+    unittest.main()
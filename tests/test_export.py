@@ -0,0 +1,219 @@
+"""
+test cases for the export of the configurations to the file system
+"""
+import hashlib
+import json
+import os
+import unittest
+from unittest.mock import patch
+from app import app, db
+from app.models import RenderedConfiguration
+from app.utils.export import BatchedFileWriter, export_config_template_to_file_system, \
+    export_template_value_sets_to_directories, finalize_config_template_export, get_export_directory, \
+    EXPORT_MANIFEST_FILE
+from tests import BaseFlaskTest
+
+
+class IncrementalExportTest(BaseFlaskTest):
+
+    def setUp(self):
+        super().setUp()
+        self.config_template = self.create_config_template(
+            "hostname ${hostname}\nvlan ${vlan}",
+            hostnames=["sw1", "sw2"],
+            values={"sw1": {"vlan": "10"}, "sw2": {"vlan": "20"}}
+        )
+        self.template_value_sets = dict((tvs.hostname, tvs) for tvs in self.config_template.template_value_sets)
+
+        self.root_folder = app.config["FTP_DIRECTORY"]
+        self.export_dir = get_export_directory(self.root_folder, self.config_template)
+
+    def export(self):
+        return export_config_template_to_file_system(self.config_template, self.root_folder, incremental=True)
+
+    def read_manifest(self):
+        with open(os.path.join(self.export_dir, EXPORT_MANIFEST_FILE)) as f:
+            return json.load(f)
+
+    def read_config(self, hostname):
+        with open(os.path.join(self.export_dir, hostname + "_config.txt"), newline="") as f:
+            return f.read()
+
+    def test_initial_export_writes_manifest(self):
+        result = self.export()
+
+        self.assertEqual((2, 0, 0), (result["written"], result["unchanged"], result["removed"]))
+        self.assertEqual("hostname sw1\r\nvlan 10", self.read_config("sw1"))
+
+        manifest = self.read_manifest()
+        self.assertEqual(["sw1_config.txt", "sw2_config.txt"], sorted(manifest.keys()))
+        for hostname, tvs in self.template_value_sets.items():
+            entry = manifest[hostname + "_config.txt"]
+            self.assertEqual(
+                RenderedConfiguration.create_cache_key(self.config_template, tvs.values_digest),
+                entry["cache_key"]
+            )
+            # the digest is calculated by the checksum sink while the configuration is rendered
+            self.assertEqual(
+                hashlib.sha256(self.read_config(hostname).encode("utf-8")).hexdigest(),
+                entry["digest"]
+            )
+
+    def test_unchanged_configurations_are_skipped(self):
+        self.export()
+        manifest = self.read_manifest()
+
+        result = self.export()
+
+        self.assertEqual((0, 2, 0), (result["written"], result["unchanged"], result["removed"]))
+        self.assertEqual(manifest, self.read_manifest())
+
+    def test_changed_configuration_is_written(self):
+        self.export()
+        manifest = self.read_manifest()
+
+        self.template_value_sets["sw1"].update_variable_value("vlan", "11")
+        result = self.export()
+
+        self.assertEqual((1, 1, 0), (result["written"], result["unchanged"], result["removed"]))
+        self.assertEqual("hostname sw1\r\nvlan 11", self.read_config("sw1"))
+        new_manifest = self.read_manifest()
+        self.assertNotEqual(manifest["sw1_config.txt"], new_manifest["sw1_config.txt"])
+        self.assertEqual(manifest["sw2_config.txt"], new_manifest["sw2_config.txt"])
+
+    def test_missing_file_is_written_again(self):
+        self.export()
+        os.remove(os.path.join(self.export_dir, "sw2_config.txt"))
+
+        result = self.export()
+
+        self.assertEqual((1, 1), (result["written"], result["unchanged"]))
+        self.assertEqual("hostname sw2\r\nvlan 20", self.read_config("sw2"))
+
+    def test_configuration_of_deleted_template_value_set_is_removed(self):
+        self.export()
+
+        db.session.delete(self.template_value_sets["sw2"])
+        db.session.commit()
+        result = self.export()
+
+        self.assertEqual((0, 1, 1), (result["written"], result["unchanged"], result["removed"]))
+        self.assertFalse(os.path.exists(os.path.join(self.export_dir, "sw2_config.txt")))
+        self.assertEqual(["sw1_config.txt"], list(self.read_manifest().keys()))
+
+
+class MultipleTargetExportTest(BaseFlaskTest):
+
+    def setUp(self):
+        super().setUp()
+        self.config_template = self.create_config_template("hostname ${hostname}", hostnames=["sw1", "sw2"])
+
+        self.root_folders = [app.config["FTP_DIRECTORY"], app.config["TFTP_DIRECTORY"]]
+
+    def export(self):
+        result = export_template_value_sets_to_directories(self.config_template, self.root_folders, incremental=True)
+        for root_folder, manifest in zip(self.root_folders, result["manifests"]):
+            finalize_config_template_export(self.config_template, root_folder, manifest)
+        return result
+
+    def get_file_path(self, root_folder, hostname):
+        return os.path.join(get_export_directory(root_folder, self.config_template), hostname + "_config.txt")
+
+    def test_configurations_are_rendered_once(self):
+        result = self.export()
+
+        self.assertEqual((2, 2, 0), (result["written"], result["linked"] + result["copied"], result["unchanged"]))
+        for hostname in ["sw1", "sw2"]:
+            ftp_file, tftp_file = [self.get_file_path(root_folder, hostname) for root_folder in self.root_folders]
+            with open(ftp_file, "rb") as f:
+                self.assertEqual(("hostname %s" % hostname).encode("utf-8"), f.read())
+            with open(tftp_file, "rb") as f:
+                self.assertEqual(("hostname %s" % hostname).encode("utf-8"), f.read())
+        self.assertEqual(result["manifests"][0], result["manifests"][1])
+
+    def test_missing_file_is_restored_within_a_single_target(self):
+        self.export()
+        os.remove(self.get_file_path(self.root_folders[1], "sw1"))
+
+        result = self.export()
+
+        self.assertEqual(0, result["written"])
+        self.assertEqual(1, result["linked"] + result["copied"])
+        self.assertEqual(3, result["unchanged"])
+        self.assertTrue(os.path.exists(self.get_file_path(self.root_folders[1], "sw1")))
+
+
+class BatchedFileWriterTest(BaseFlaskTest):
+
+    def setUp(self):
+        super().setUp()
+        self.ftp_file = os.path.join(self.test_directory, "ftp", "project", "sw1_config.txt")
+        self.tftp_file = os.path.join(self.test_directory, "tftp", "project", "sw1_config.txt")
+
+    def read_file(self, path):
+        with open(path, "rb") as f:
+            return f.read()
+
+    def test_write_and_link(self):
+        with BatchedFileWriter(max_workers=2, fsync=False) as writer:
+            writer.write(self.ftp_file, "hostname sw1", [self.tftp_file])
+
+        self.assertEqual(b"hostname sw1", self.read_file(self.ftp_file))
+        self.assertEqual(b"hostname sw1", self.read_file(self.tftp_file))
+        self.assertEqual((1, 1, len("hostname sw1")), (writer.written, writer.linked + writer.copied,
+                                                       writer.bytes_written))
+        self.assertEqual([], [name for name in os.listdir(os.path.dirname(self.ftp_file)) if name.endswith(".tmp")])
+
+    def test_link_existing_file(self):
+        with BatchedFileWriter(fsync=False) as writer:
+            writer.write(self.ftp_file, b"hostname sw1")
+            writer.flush()
+            writer.link(self.ftp_file, [self.tftp_file])
+
+        self.assertEqual(b"hostname sw1", self.read_file(self.tftp_file))
+        self.assertEqual((1, 1), (writer.written, writer.linked + writer.copied))
+
+    def test_files_are_copied_across_file_systems(self):
+        with patch("app.utils.export.os.link", side_effect=OSError), \
+                patch("app.utils.export._reflink", return_value=False):
+            with BatchedFileWriter(fsync=False) as writer:
+                writer.write(self.ftp_file, "hostname sw1", [self.tftp_file])
+
+        self.assertEqual(b"hostname sw1", self.read_file(self.tftp_file))
+        self.assertEqual((0, 1), (writer.linked, writer.copied))
+
+    def test_files_are_synchronized_per_batch(self):
+        with patch("app.utils.export._fsync_path") as fsync_path:
+            with BatchedFileWriter(batch_size=4, fsync=True) as writer:
+                for i in range(3):
+                    writer.write(os.path.join(self.test_directory, "ftp", "sw%d_config.txt" % i), "hostname")
+                # the batch isn't full yet
+                self.assertEqual(0, fsync_path.call_count)
+
+                writer.write(os.path.join(self.test_directory, "ftp", "sw3_config.txt"), "hostname")
+                # 4 files and the directory
+                self.assertEqual(5, fsync_path.call_count)
+
+                writer.write(os.path.join(self.test_directory, "ftp", "sw4_config.txt"), "hostname")
+
+            # the remaining file is synchronized when the writer is closed
+            self.assertEqual(7, fsync_path.call_count)
+
+    def test_files_are_not_synchronized_without_fsync(self):
+        with patch("app.utils.export._fsync_path") as fsync_path:
+            with BatchedFileWriter(batch_size=1, fsync=False) as writer:
+                writer.write(self.ftp_file, "hostname sw1")
+
+        self.assertEqual(0, fsync_path.call_count)
+
+    def test_write_errors_are_raised(self):
+        with patch("app.utils.export.write_file_atomic", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                with BatchedFileWriter(fsync=False) as writer:
+                    writer.write(self.ftp_file, "hostname sw1")
+
+        self.assertEqual(0, writer.written)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,348 @@
+"""
+test cases for the database models
+"""
+import io
+import unittest
+from unittest.mock import patch
+from app import app, db
+from app.exception import TemplateVariableNotFoundException, TemplateVariableAlreadyExistsException
+from app.models import ConfigTemplate, TemplateValueSet, TemplateValue, TemplateVariable, RenderedConfiguration
+from app.utils.confgen import get_template_digest, get_values_digest
+from tests import BaseFlaskTest
+
+
+class ConfigTemplateTest(BaseFlaskTest):
+
+    def setUp(self):
+        super().setUp()
+        self.config_template = self.create_config_template(
+            "hostname ${hostname}\nvlan ${vlan}",
+            hostnames=["sw1", "sw2"],
+            values={"sw1": {"vlan": "10"}, "sw2": {"vlan": "20"}}
+        )
+
+    def get_variables(self):
+        return dict((var.var_name, var.description) for var in self.config_template.variables.all())
+
+    def test_changed_template_content_synchronizes_variables(self):
+        variable = TemplateVariable.query.filter(TemplateVariable.var_name_slug == "hostname").one()
+        variable.description = "device name"
+        db.session.commit()
+
+        self.config_template.template_content = "hostname ${hostname}\ninterface ${interface}\n! ${comment}"
+        db.session.commit()
+
+        # the unused variable is removed, the description of the existing variable is kept
+        self.assertEqual({"hostname": "device name", "interface": "", "comment": ""}, self.get_variables())
+
+    def test_changed_template_content_deletes_template_value_sets(self):
+        tvs_ids = [tvs.id for tvs in self.config_template.template_value_sets]
+        self.config_template.template_value_sets[0].get_cached_configuration_result()
+
+        self.config_template.template_content = "hostname ${hostname}\n!"
+        db.session.commit()
+
+        self.assertEqual(0, self.config_template.template_value_sets.count())
+        self.assertEqual(0, TemplateValue.query.filter(TemplateValue.template_value_set_id.in_(tvs_ids)).count())
+        self.assertEqual(0, RenderedConfiguration.query.count())
+
+    def test_template_content_with_many_variables_is_saved_with_bulk_statements(self):
+        template_content = "\n".join("var_%d ${var_%d}" % (i, i) for i in range(300))
+
+        def set_template_content():
+            self.config_template.template_content = template_content
+
+        def change_template_content():
+            # all changes are committed within a single transaction
+            self.assertEqual(1, self.count_commits(set_template_content))
+
+        queries = self.count_queries(change_template_content)
+
+        self.assertLessEqual(queries, 10)
+        self.assertEqual(301, self.config_template.variables.count())
+
+    def test_rename_variable_updates_values_snapshots(self):
+        self.config_template.rename_variable("vlan", "mgmt_vlan")
+
+        self.assertEqual(["hostname", "mgmt_vlan"], sorted(self.config_template.get_template_variable_names()))
+        for tvs_id, hostname, values in self.config_template.iter_template_values():
+            tvs = TemplateValueSet.query.get(tvs_id)
+            expected_values = {"hostname": hostname, "mgmt_vlan": {"sw1": "10", "sw2": "20"}[hostname]}
+
+            self.assertEqual(expected_values, values)
+            self.assertEqual(expected_values, tvs.get_values_as_dict())
+            self.assertEqual(
+                TemplateValueSet.create_values_snapshot(expected_values)["values_digest"],
+                tvs.values_digest
+            )
+
+    def test_rename_variable_is_committed_once(self):
+        TemplateValueSet.query.filter(TemplateValueSet.hostname == "sw1").one().get_cached_configuration_result()
+
+        commits = self.count_commits(lambda: self.config_template.rename_variable("vlan", "mgmt vlan"))
+
+        self.assertEqual(1, commits)
+        self.assertEqual(0, TemplateValue.query.filter(TemplateValue.var_name_slug == "vlan").count())
+        self.assertEqual(2, TemplateValue.query.filter(TemplateValue.var_name_slug == "mgmt_vlan").count())
+        # the cached configurations are invalidated
+        self.assertEqual(0, RenderedConfiguration.query.count())
+
+    def test_rename_unknown_variable(self):
+        with self.assertRaises(TemplateVariableNotFoundException):
+            self.config_template.rename_variable("unknown", "mgmt_vlan")
+
+    def test_rename_variable_to_existing_variable(self):
+        self.config_template.template_content = "hostname ${hostname}\nvlan ${vlan}\nvlan ${voice_vlan}"
+        db.session.commit()
+        self.create_template_value_set(self.config_template, "sw1", {"vlan": "10", "voice_vlan": "20"})
+
+        with self.assertRaises(TemplateVariableAlreadyExistsException):
+            self.config_template.rename_variable("vlan", "voice_vlan")
+
+        self.assertEqual(["hostname", "vlan", "voice_vlan"], sorted(self.get_variables().keys()))
+        self.assertEqual({"hostname": "sw1", "vlan": "10", "voice_vlan": "20"},
+                         TemplateValueSet.query.filter(TemplateValueSet.hostname == "sw1").one().get_values_as_dict())
+
+    def test_rename_variable_to_existing_value(self):
+        # a value without a variable (e.g. from a previous template content)
+        TemplateValueSet.query.filter(TemplateValueSet.hostname == "sw2").one().update_variable_value("mgmt_vlan", "1")
+
+        with self.assertRaises(TemplateVariableAlreadyExistsException):
+            self.config_template.rename_variable("vlan", "mgmt_vlan")
+
+        self.assertEqual(2, TemplateValue.query.filter(TemplateValue.var_name_slug == "vlan").count())
+
+    def test_failed_rename_variable_is_rolled_back(self):
+        with patch.object(ConfigTemplate, "_rename_values_snapshot_key", side_effect=ValueError):
+            with self.assertRaises(ValueError):
+                self.config_template.rename_variable("vlan", "mgmt_vlan")
+
+        self.assertEqual(["hostname", "vlan"], sorted(self.config_template.get_template_variable_names()))
+        self.assertEqual(2, TemplateValue.query.filter(TemplateValue.var_name_slug == "vlan").count())
+        self.assertEqual(0, TemplateValue.query.filter(TemplateValue.var_name_slug == "mgmt_vlan").count())
+
+
+class TemplateValueSetTest(BaseFlaskTest):
+
+    def setUp(self):
+        super().setUp()
+        self.config_template = self.create_config_template(
+            "hostname ${hostname}\nvlan ${vlan}\n! ${comment}",
+            hostnames=["sw1"],
+            values={"sw1": {"vlan": "10", "comment": "first"}}
+        )
+        self.tvs = TemplateValueSet.query.filter(TemplateValueSet.hostname == "sw1").one()
+
+    def test_update_variable_values(self):
+        var_names = self.tvs.update_variable_values({"vlan": "11", "new value": "added"})
+
+        self.assertEqual(["new_value", "vlan"], sorted(var_names))
+        expected_values = {"hostname": "sw1", "vlan": "11", "comment": "first", "new_value": "added"}
+        self.assertEqual(expected_values, dict((val.var_name, val.value) for val in self.tvs.values))
+        # the snapshot is updated within the same transaction
+        self.assertEqual(expected_values, self.tvs.get_values_as_dict())
+        self.assertEqual(TemplateValueSet.create_values_snapshot(expected_values)["values_digest"],
+                         self.tvs.values_digest)
+
+    def test_update_variable_values_commits_once(self):
+        commits = self.count_commits(
+            lambda: self.tvs.update_variable_values({"vlan": "11", "comment": "changed", "description": "uplink"})
+        )
+
+        self.assertEqual(1, commits)
+
+    def test_unchanged_values_keep_cached_configuration(self):
+        self.tvs.get_cached_configuration_result()
+        values_digest = self.tvs.values_digest
+
+        self.tvs.update_variable_values({"vlan": "10", "comment": "first"})
+
+        self.assertEqual(values_digest, self.tvs.values_digest)
+        self.assertEqual(1, RenderedConfiguration.query.count())
+
+
+class ContentDigestTest(BaseFlaskTest):
+
+    def setUp(self):
+        super().setUp()
+        self.config_template = self.create_config_template(
+            "hostname ${hostname}\nvlan ${vlan}",
+            hostnames=["sw1", "sw2"],
+            values={"sw1": {"vlan": "10"}}
+        )
+
+    def test_template_digest_is_maintained_by_template_content(self):
+        self.assertEqual(get_template_digest("hostname ${hostname}\nvlan ${vlan}"),
+                         self.config_template.template_digest)
+
+        self.config_template.template_content = "hostname ${hostname}"
+        db.session.commit()
+
+        self.assertEqual(get_template_digest("hostname ${hostname}"), self.config_template.template_digest)
+
+    def test_template_digest_of_existing_config_template_without_digest(self):
+        self.config_template.template_digest = None
+        db.session.commit()
+
+        self.assertEqual(get_template_digest(self.config_template.template_content),
+                         self.config_template.get_template_digest())
+
+    def test_values_digest_is_independent_of_the_order(self):
+        self.assertEqual(get_values_digest({"hostname": "sw1", "vlan": "10"}),
+                         get_values_digest({"vlan": "10", "hostname": "sw1"}))
+        self.assertNotEqual(get_values_digest({"hostname": "sw1", "vlan": "10"}),
+                            get_values_digest({"hostname": "sw1", "vlan": "1", "v": "0"}))
+
+    def test_values_digest_is_maintained_by_the_values(self):
+        tvs = TemplateValueSet.query.filter(TemplateValueSet.hostname == "sw1").one()
+
+        self.assertEqual(get_values_digest({"hostname": "sw1", "vlan": "10"}), tvs.values_digest)
+
+    def test_iter_cache_keys(self):
+        TemplateValueSet.query.filter(TemplateValueSet.hostname == "sw2").update({"values_digest": None})
+        db.session.commit()
+
+        cache_keys = dict((hostname, cache_key) for _, hostname, cache_key in self.config_template.iter_cache_keys())
+
+        self.assertEqual(RenderedConfiguration.create_cache_key(
+            self.config_template,
+            get_values_digest({"hostname": "sw1", "vlan": "10"})
+        ), cache_keys["sw1"])
+        # the values of a Template Value Set without digest must be rendered
+        self.assertIsNone(cache_keys["sw2"])
+
+    def test_content_columns_are_not_indexed(self):
+        indexed_columns = set()
+        for table_name in ["config_template", "template_value", "template_variable"]:
+            for index in db.inspect(db.engine).get_indexes(table_name):
+                indexed_columns.update("%s.%s" % (table_name, column) for column in index["column_names"])
+
+        self.assertNotIn("config_template._template_content", indexed_columns)
+        self.assertNotIn("template_value.value", indexed_columns)
+        self.assertNotIn("template_variable.description", indexed_columns)
+
+
+class RenderedConfigurationTest(BaseFlaskTest):
+
+    def setUp(self):
+        super().setUp()
+        self.config_template = self.create_config_template(
+            "hostname ${hostname}\nvlan ${vlan}",
+            hostnames=["sw1", "sw2"],
+            values={"sw1": {"vlan": "10"}, "sw2": {"vlan": "20"}}
+        )
+        self.tvs = TemplateValueSet.query.filter(TemplateValueSet.hostname == "sw1").one()
+
+    def get_cached(self, tvs):
+        return RenderedConfiguration.query.filter(RenderedConfiguration.template_value_set_id == tvs.id).first()
+
+    def test_cached_configuration_is_reused(self):
+        self.assertEqual("hostname sw1\r\nvlan 10", self.tvs.get_cached_configuration_result())
+
+        cached = self.get_cached(self.tvs)
+        self.assertEqual(RenderedConfiguration.create_cache_key(self.config_template, self.tvs.values_digest),
+                         cached.cache_key)
+        # the configuration is not rendered again
+        cached.content = "cached"
+        db.session.commit()
+        self.assertEqual("cached", self.tvs.get_cached_configuration_result())
+
+    def test_changed_values_invalidate_cached_configuration(self):
+        self.tvs.get_cached_configuration_result()
+
+        self.tvs.update_variable_values({"vlan": "11"})
+
+        self.assertIsNone(self.get_cached(self.tvs))
+        self.assertEqual("hostname sw1\r\nvlan 11", self.tvs.get_cached_configuration_result())
+
+    def test_changed_line_ending_renders_configuration_again(self):
+        self.tvs.get_cached_configuration_result()
+
+        self.config_template.line_ending = "lf"
+        db.session.commit()
+
+        self.assertEqual("hostname sw1\nvlan 10", self.tvs.get_cached_configuration_result())
+        self.assertEqual(1, RenderedConfiguration.query.count())
+
+    def test_oldest_cached_configuration_is_evicted(self):
+        max_size = app.config["RENDERED_CONFIG_CACHE_SIZE"]
+        self.addCleanup(app.config.update, RENDERED_CONFIG_CACHE_SIZE=max_size)
+        app.config["RENDERED_CONFIG_CACHE_SIZE"] = 1
+        other = TemplateValueSet.query.filter(TemplateValueSet.hostname == "sw2").one()
+
+        self.tvs.get_cached_configuration_result()
+        other.get_cached_configuration_result()
+
+        self.assertIsNone(self.get_cached(self.tvs))
+        self.assertIsNotNone(self.get_cached(other))
+
+
+class ConfigTemplateRenderTest(BaseFlaskTest):
+
+    def setUp(self):
+        super().setUp()
+        self.config_template = self.create_config_template(
+            "hostname ${hostname}\n\n%for vlan in vlans.split(','):\nvlan ${vlan}\n%endfor\n! ${comment}",
+            hostnames=["sw%d" % i for i in range(5)],
+            values=dict(
+                ("sw%d" % i, {"vlans": "%d,%d" % (i, i + 100), "comment": "switch %d" % i}) for i in range(5)
+            )
+        )
+
+    def get_expected_configurations(self):
+        return dict(
+            (tvs.hostname, tvs.get_configuration_result()) for tvs in self.config_template.template_value_sets.all()
+        )
+
+    def test_iter_rendered_matches_single_render(self):
+        expected = self.get_expected_configurations()
+
+        self.assertEqual("hostname sw1\r\nvlan 1\r\nvlan 101\r\n! switch 1", expected["sw1"])
+        self.assertEqual(expected, dict(self.config_template.iter_rendered()))
+
+    def test_iter_rendered_with_lf_line_ending(self):
+        self.config_template.line_ending = "lf"
+        db.session.commit()
+
+        rendered = dict(self.config_template.iter_rendered())
+
+        self.assertEqual("hostname sw1\nvlan 1\nvlan 101\n! switch 1", rendered["sw1"])
+
+    def test_iter_rendered_strips_trailing_whitespace(self):
+        self.config_template.strip_trailing_whitespace = True
+        db.session.commit()
+        tvs = TemplateValueSet.query.filter(TemplateValueSet.hostname == "sw1").one()
+        tvs.update_variable_value("comment", "switch 1   ")
+
+        rendered = dict(self.config_template.iter_rendered())
+
+        self.assertEqual("hostname sw1\r\nvlan 1\r\nvlan 101\r\n! switch 1", rendered["sw1"])
+        self.assertEqual(rendered["sw1"], tvs.get_configuration_result())
+
+    def test_cache_key_depends_on_strip_trailing_whitespace(self):
+        tvs = TemplateValueSet.query.filter(TemplateValueSet.hostname == "sw1").one()
+        cache_key = RenderedConfiguration.create_cache_key(self.config_template, tvs.values_digest)
+
+        self.config_template.strip_trailing_whitespace = True
+
+        self.assertNotEqual(cache_key, RenderedConfiguration.create_cache_key(self.config_template, tvs.values_digest))
+
+    def test_iter_renderers_matches_iter_rendered(self):
+        rendered = []
+        for hostname, render in self.config_template.iter_renderers():
+            sink = io.StringIO()
+            render(sink)
+            rendered.append((hostname, sink.getvalue()))
+
+        self.assertEqual(list(self.config_template.iter_rendered()), rendered)
+
+    def test_iter_rendered_subset(self):
+        tvs = TemplateValueSet.query.filter(TemplateValueSet.hostname == "sw3").one()
+
+        self.assertEqual(["sw3"], [hostname for hostname, _ in self.config_template.iter_rendered(
+            template_value_set_ids=[tvs.id]
+        )])
+
+
+if __name__ == "__main__":
+    unittest.main()
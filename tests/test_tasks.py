@@ -0,0 +1,299 @@
+"""
+test cases for the export tasks (executed eagerly within the test process)
+"""
+import json
+import os
+import time
+import unittest
+from unittest.mock import Mock, patch
+from celery import chord, uuid
+from app import app, celery, db
+from app.models import ConfigTemplate, TemplateValueSet
+from app.exception import ConfigurationExportException
+from app.tasks import request_configuration_export, request_appliance_export, export_configuration_chunk, \
+    start_configuration_export, ExportProgress, get_export_progress, EXPORT_PROGRESS_STATE
+from app.utils.export import export_template_value_sets_to_directories, get_export_directory
+from app.utils.export_jobs import get_export_job_registry, get_export_job_key
+from tests import BaseFlaskTest
+
+
+class ExportTaskTest(BaseFlaskTest):
+
+    def setUp(self):
+        super().setUp()
+        self._celery_conf = dict(celery.conf)
+        celery.conf.update(CELERY_ALWAYS_EAGER=True, CELERY_EAGER_PROPAGATES_EXCEPTIONS=True)
+
+        project = self.create_project()
+        self.config_templates = [
+            self.create_config_template("hostname ${hostname}\n!", hostnames=["sw1", "sw2"], name=name, project=project)
+            for name in ["first", "second"]
+        ]
+
+    def tearDown(self):
+        celery.conf.update(self._celery_conf)
+        super().tearDown()
+
+    def get_exported_files(self, target, config_template):
+        export_dir = get_export_directory(app.config["%s_DIRECTORY" % target.upper()], config_template)
+        if not os.path.exists(export_dir):
+            return []
+        return sorted(file_name for file_name in os.listdir(export_dir) if not file_name.startswith("."))
+
+    def register_running_job(self, config_template, target):
+        task_id = uuid()
+        get_export_job_registry().set(
+            get_export_job_key(config_template.id, target),
+            {"task_id": task_id, "data_version": None},
+            60
+        )
+        return task_id
+
+    def add_render_error(self, config_template):
+        config_template.template_content = "hostname ${hostname}\nvlan ${int(vlan)}"
+        db.session.commit()
+        # changing the template content drops the Template Value Sets
+        for hostname in ["sw1", "sw2"]:
+            self.create_template_value_set(config_template, hostname, {"vlan": "abc"})
+
+    def test_export_request(self):
+        config_template = self.config_templates[0]
+
+        result = request_configuration_export(config_template.id, ["ftp", "tftp"])
+
+        self.assertNotIn("error", result.get())
+        self.assertEqual(["sw1_config.txt", "sw2_config.txt"], self.get_exported_files("ftp", config_template))
+        self.assertEqual(["sw1_config.txt", "sw2_config.txt"], self.get_exported_files("tftp", config_template))
+        # the finished job is removed from the registry
+        self.assertIsNone(get_export_job_registry().get(get_export_job_key(config_template.id, "ftp")))
+
+    def test_export_request_without_changes_during_export(self):
+        config_template = self.config_templates[0]
+
+        result = request_configuration_export(config_template.id, ["ftp"]).get()
+
+        self.assertNotIn("follow_up_task_id", result)
+
+    def test_follow_up_export_if_data_changed_during_export(self):
+        config_template = self.config_templates[0]
+        calls = []
+
+        def export_with_change(*args, **kwargs):
+            if not calls:
+                # the Template Value Set is created while the first export is running
+                self.create_template_value_set(config_template, "sw3")
+            calls.append(args)
+            return export_template_value_sets_to_directories(*args, **kwargs)
+
+        with patch("app.tasks.export_template_value_sets_to_directories", side_effect=export_with_change):
+            result = request_configuration_export(config_template.id, ["ftp"]).get()
+
+        # a single follow-up export that exports the changed data
+        self.assertIn("follow_up_task_id", result)
+        self.assertEqual(2, len(calls))
+        self.assertEqual(["sw1_config.txt", "sw2_config.txt", "sw3_config.txt"],
+                         self.get_exported_files("ftp", config_template))
+        self.assertIsNone(get_export_job_registry().get(get_export_job_key(config_template.id, "ftp")))
+
+    def test_follow_up_export_only_for_registered_targets(self):
+        config_template = self.config_templates[0]
+        other_task_id = uuid()
+
+        def export_with_change(*args, **kwargs):
+            self.create_template_value_set(config_template, "sw3")
+            # the tftp target is taken over by another job (e.g. a project wide export)
+            get_export_job_registry().set(
+                get_export_job_key(config_template.id, "tftp"),
+                {"task_id": other_task_id, "data_version": None},
+                60
+            )
+            return export_template_value_sets_to_directories(*args, **kwargs)
+
+        with patch("app.tasks.export_template_value_sets_to_directories", side_effect=export_with_change) as export:
+            request_configuration_export(config_template.id, ["ftp", "tftp"]).get()
+
+        self.assertEqual(2, export.call_count)
+        # the follow-up export renders only the ftp target
+        self.assertEqual(1, len(export.call_args[0][1]))
+        self.assertEqual(other_task_id, get_export_job_registry().get(
+            get_export_job_key(config_template.id, "tftp")
+        )["task_id"])
+
+    def test_export_request_attached_to_running_job(self):
+        config_template = self.config_templates[0]
+        task_id = self.register_running_job(config_template, "ftp")
+
+        result = request_configuration_export(config_template.id, ["ftp"])
+
+        self.assertEqual(task_id, result.id)
+        self.assertEqual([], self.get_exported_files("ftp", config_template))
+
+    def test_export_request_only_exports_targets_without_running_job(self):
+        config_template = self.config_templates[0]
+        task_id = self.register_running_job(config_template, "ftp")
+
+        result = request_configuration_export(config_template.id, ["ftp", "tftp"])
+
+        self.assertNotEqual(task_id, result.id)
+        self.assertEqual([], self.get_exported_files("ftp", config_template))
+        self.assertEqual(["sw1_config.txt", "sw2_config.txt"], self.get_exported_files("tftp", config_template))
+        # the running job is not removed from the registry by the other job
+        self.assertEqual(
+            task_id,
+            get_export_job_registry().get(get_export_job_key(config_template.id, "ftp"))["task_id"]
+        )
+
+    def test_export_is_split_into_chunks(self):
+        config_template = self.config_templates[0]
+        self.create_template_value_set(config_template, "sw3")
+        chunk_size = app.config["EXPORT_TASK_CHUNK_SIZE"]
+        self.addCleanup(app.config.update, EXPORT_TASK_CHUNK_SIZE=chunk_size)
+        app.config["EXPORT_TASK_CHUNK_SIZE"] = 2
+        tvs_ids = [tvs.id for tvs in config_template.template_value_sets.order_by(TemplateValueSet.id)]
+
+        with patch("app.tasks.chord", wraps=chord) as chord_mock:
+            result = start_configuration_export(config_template.id, ["ftp", "tftp"]).get()
+
+        chunks = chord_mock.call_args[0][0]
+        self.assertEqual([tvs_ids[:2], tvs_ids[2:]], [chunk.args[2] for chunk in chunks])
+        # the finalizing task combines the results of the chunks
+        self.assertEqual(3, result["written"])
+        self.assertEqual(3, result["linked"] + result["copied"])
+        self.assertEqual(["sw1_config.txt", "sw2_config.txt", "sw3_config.txt"],
+                         self.get_exported_files("tftp", config_template))
+        self.assertIsNotNone(ConfigTemplate.query.get(config_template.id).last_successful_tftp_export)
+
+    def test_export_removes_deleted_template_value_sets(self):
+        config_template = self.config_templates[0]
+        start_configuration_export(config_template.id, ["ftp"]).get()
+
+        db.session.delete(config_template.template_value_sets.filter(TemplateValueSet.hostname == "sw2").one())
+        db.session.commit()
+        result = start_configuration_export(config_template.id, ["ftp"]).get()
+
+        self.assertEqual(1, result["removed"])
+        self.assertEqual(["sw1_config.txt"], self.get_exported_files("ftp", config_template))
+
+    def test_export_without_template_value_sets(self):
+        config_template = self.config_templates[0]
+        start_configuration_export(config_template.id, ["ftp"]).get()
+
+        for tvs in config_template.template_value_sets:
+            db.session.delete(tvs)
+        db.session.commit()
+        result = start_configuration_export(config_template.id, ["ftp"]).get()
+
+        # no chunk is queued, the finalizing task cleans up the export directory
+        self.assertEqual((0, 2), (result["written"], result["removed"]))
+        self.assertEqual([], self.get_exported_files("ftp", config_template))
+
+    def test_export_chunk_render_error_is_not_retried(self):
+        config_template = self.config_templates[0]
+        self.add_render_error(config_template)
+        tvs_ids = [tvs.id for tvs in config_template.template_value_sets]
+
+        with patch.object(export_configuration_chunk, "retry") as retry:
+            with self.assertRaises(ConfigurationExportException):
+                export_configuration_chunk.apply(args=(config_template.id, ["ftp"], tvs_ids))
+
+        self.assertFalse(retry.called)
+        self.assertEqual([], self.get_exported_files("ftp", config_template))
+
+    def test_export_request_fails_on_render_error(self):
+        config_template = self.config_templates[0]
+        self.add_render_error(config_template)
+
+        with self.assertRaises(ConfigurationExportException):
+            request_configuration_export(config_template.id, ["ftp"])
+
+        self.assertIsNone(ConfigTemplate.query.get(config_template.id).last_successful_ftp_export)
+
+    def test_appliance_export_skips_config_templates_with_running_job(self):
+        first, second = self.config_templates
+        self.register_running_job(first, "ftp")
+        self.register_running_job(first, "tftp")
+
+        result = request_appliance_export(["ftp", "tftp"]).get()
+
+        self.assertEqual([str(second.id)], list(result["templates"].keys()))
+        self.assertEqual([], self.get_exported_files("ftp", first))
+        self.assertEqual(["sw1_config.txt", "sw2_config.txt"], self.get_exported_files("ftp", second))
+        self.assertIsNone(get_export_job_registry().get(get_export_job_key(second.id, "ftp")))
+
+    def test_appliance_export_continues_after_render_error(self):
+        first, second = self.config_templates
+        self.add_render_error(first)
+
+        result = request_appliance_export(["ftp"]).get()
+
+        self.assertEqual([first.id], result["failed"])
+        self.assertIn("error", result["templates"][str(first.id)])
+        self.assertEqual(2, result["templates"][str(second.id)]["written"])
+        self.assertEqual(["sw1_config.txt", "sw2_config.txt"], self.get_exported_files("ftp", second))
+
+
+
+class ExportProgressTest(BaseFlaskTest):
+
+    def create_task(self, task_id="export-task"):
+        task = Mock()
+        task.request.id = task_id
+        return task
+
+    def store_progress(self, task_id, meta):
+        celery.backend.store_result(task_id, meta, EXPORT_PROGRESS_STATE)
+
+    def test_progress_is_published_once_per_interval(self):
+        task = self.create_task()
+        progress = ExportProgress(task, 3, interval=60)
+
+        progress("sw1", 100)
+        progress("sw2", 200)
+        progress("sw3", 300)
+
+        # only the first update is published within the interval
+        self.assertEqual(1, task.update_state.call_count)
+        meta = progress.get_meta()
+        self.assertEqual((3, 3, 600, "sw3"),
+                         (meta["processed"], meta["total"], meta["bytes_written"], meta["hostname"]))
+        self.assertEqual(0, meta["eta_seconds"])
+
+    def test_progress_is_not_published_without_worker(self):
+        task = self.create_task(None)
+        progress = ExportProgress(task, 3, interval=0)
+
+        progress("sw1")
+
+        self.assertFalse(task.update_state.called)
+
+    def test_progress_of_chunked_export(self):
+        started_at = time.time() - 10
+        self.store_progress("chunk-1", {"processed": 2, "bytes_written": 200, "hostname": "sw2",
+                                        "started_at": started_at})
+        celery.backend.store_result("chunk-2", {"processed": 3, "bytes_written": 300, "started_at": started_at},
+                                    "SUCCESS")
+
+        progress = get_export_progress({"chunks": ["chunk-1", "chunk-2", "chunk-3"], "total": 10,
+                                        "started_at": started_at})
+
+        self.assertEqual("exported 5 of 10 configurations", progress["status"])
+        self.assertEqual((5, 10, 500, "sw2"), (progress["processed"], progress["total"], progress["bytes_written"],
+                                                progress["hostname"]))
+        self.assertGreater(progress["configs_per_second"], 0)
+        self.assertGreater(progress["eta_seconds"], 0)
+
+    def test_task_status_json(self):
+        self.store_progress("chunk-1", {"processed": 1, "bytes_written": 100, "hostname": "sw1",
+                                        "started_at": time.time()})
+        self.store_progress("export-task", {"chunks": ["chunk-1"], "total": 2, "started_at": time.time()})
+
+        response = self.client.get("/ncg/task/export-task")
+
+        self.assertEqual(200, response.status_code)
+        data = json.loads(response.data.decode("utf-8"))
+        self.assertEqual(EXPORT_PROGRESS_STATE, data["state"])
+        self.assertEqual((1, 2, "sw1"), (data["processed"], data["total"], data["hostname"]))
+
+
+if __name__ == "__main__":
+    unittest.main()